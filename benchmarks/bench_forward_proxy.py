@@ -0,0 +1,135 @@
+"""
+本地转发代理性能测试 - 对比直连上游代理与经过本地转发代理的吞吐量
+
+在本机启动一个替身上游代理 (支持 CONNECT 和普通 HTTP) 和一个数据源，
+分别测量 CONNECT 隧道的下载吞吐量和普通 HTTP 请求的每秒请求数。
+
+用法:
+    python benchmarks/bench_forward_proxy.py [--megabytes 256] [--requests 2000]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.forward_proxy import ForwardProxy
+
+CHUNK = b'x' * (64 * 1024)
+RESPONSE_BODY = b'ok' * 512
+
+
+async def _source_server(reader, writer):
+    """
+    数据源: 读取一行要发送的字节数，然后发送这么多数据
+    """
+    size = int((await reader.readline()).strip())
+    while size > 0:
+        data = CHUNK[:min(size, len(CHUNK))]
+        writer.write(data)
+        size -= len(data)
+        await writer.drain()
+    writer.close()
+
+
+async def _upstream_proxy(reader, writer):
+    """
+    替身上游代理: CONNECT 建立到目标的隧道，普通请求直接返回固定响应 (保持连接)
+    """
+    while True:
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, ConnectionError):
+            break
+        first_line = head.split(b'\r\n', 1)[0].decode()
+        if first_line.startswith('CONNECT '):
+            host, port = first_line.split()[1].rsplit(':', 1)
+            target_reader, target_writer = await asyncio.open_connection(host, int(port))
+            writer.write(b'HTTP/1.1 200 Connection Established\r\n\r\n')
+
+            async def pipe(src, dst):
+                while True:
+                    data = await src.read(65536)
+                    if not data:
+                        break
+                    dst.write(data)
+                    await dst.drain()
+                if dst.can_write_eof():
+                    dst.write_eof()
+
+            await asyncio.gather(pipe(reader, target_writer), pipe(target_reader, writer), return_exceptions=True)
+            break
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n' % len(RESPONSE_BODY) + RESPONSE_BODY)
+        await writer.drain()
+    writer.close()
+
+
+async def _tunnel_download(proxy_port, source_port, size):
+    reader, writer = await asyncio.open_connection('127.0.0.1', proxy_port)
+    writer.write(f'CONNECT 127.0.0.1:{source_port} HTTP/1.1\r\nHost: 127.0.0.1:{source_port}\r\n\r\n'.encode())
+    await reader.readuntil(b'\r\n\r\n')
+    start = time.perf_counter()
+    writer.write(f'{size}\n'.encode())
+    received = 0
+    while received < size:
+        data = await reader.read(1 << 20)
+        if not data:
+            break
+        received += len(data)
+    elapsed = time.perf_counter() - start
+    writer.close()
+    return received, elapsed
+
+
+async def _http_requests(proxy_port, count, concurrency=8):
+    async def worker(n):
+        reader, writer = await asyncio.open_connection('127.0.0.1', proxy_port)
+        for _ in range(n):
+            writer.write(b'GET http://example.invalid/ HTTP/1.1\r\nHost: example.invalid\r\n\r\n')
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+            await reader.readexactly(length)
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(count // concurrency) for _ in range(concurrency)))
+    return (count // concurrency) * concurrency / (time.perf_counter() - start)
+
+
+async def _main(args):
+    source = await asyncio.start_server(_source_server, '127.0.0.1', 0)
+    upstream = await asyncio.start_server(_upstream_proxy, '127.0.0.1', 0)
+    source_port = source.sockets[0].getsockname()[1]
+    upstream_port = upstream.sockets[0].getsockname()[1]
+
+    forward_proxy = ForwardProxy(listen_port=0)
+    forward_port = forward_proxy.start()
+    forward_proxy.set_upstream('127.0.0.1', upstream_port)
+
+    size = args.megabytes * 1024 * 1024
+    print(f"{'路径':<12}{'隧道吞吐量 (MB/s)':>20}{'HTTP 请求数/秒':>18}")
+    for label, port in (('直连上游', upstream_port), ('本地转发', forward_port)):
+        received, elapsed = await _tunnel_download(port, source_port, size)
+        rps = await _http_requests(port, args.requests)
+        print(f"{label:<12}{received / elapsed / 1024 / 1024:>20.1f}{rps:>18.0f}")
+
+    stats = forward_proxy.get_stats()
+    print(f"本地转发代理已完成连接数: {len(stats['recent'])}")
+    forward_proxy.stop()
+    # 等待替身上游处理完连接池关闭的连接
+    await asyncio.sleep(0.2)
+    source.close()
+    upstream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地转发代理性能测试")
+    parser.add_argument('--megabytes', type=int, default=256, help="隧道下载的数据量 (MB)")
+    parser.add_argument('--requests', type=int, default=2000, help="普通 HTTP 请求数")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
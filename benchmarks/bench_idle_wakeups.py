@@ -0,0 +1,116 @@
+"""
+空闲唤醒次数测试 - 统计程序空闲时核心运行时和界面线程每分钟被唤醒的次数
+
+按界面启动后的空闲状态注册定时任务 (网络监控、适配器表刷新、每秒一次的适配器视图
+刷新及其界面投递、看门狗的心跳检查)，界面线程用一个只模拟 Tk after 定时器的替身代替，
+因此无需显示器即可运行:
+
+    python benchmarks/bench_idle_wakeups.py --seconds 60
+"""
+import os
+import sys
+import time
+import heapq
+import argparse
+import itertools
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.network import MONITOR_INTERVAL
+from src.runtime import CoreRuntime
+from src.tk_watchdog import TkWatchdog
+from src.ui_executor import UITaskExecutor
+
+# 与 AdapterTableWorker 的默认间隔和 gui.ADAPTER_VIEW_REFRESH_MS 相同 (gui 依赖 Tk 和 pystray，这里不导入)
+ADAPTER_TABLE_INTERVAL = 1.0
+ADAPTER_VIEW_INTERVAL = 1.0
+WARMUP = 3.0
+
+
+class StandInRoot:
+    def __init__(self):
+        """
+        在单个线程上按时执行 after 回调的 Tk 根窗口替身，每执行一个回调计一次唤醒
+        """
+        self.wakeups = 0
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+        self.thread = threading.Thread(target=self._loop, name='stand-in-tk', daemon=True)
+        self.thread.start()
+
+    def after(self, delay_ms, func, *args):
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay_ms / 1000, next(self._counter), func, args))
+            self._cond.notify()
+
+    def after_cancel(self, after_id):
+        pass
+
+    def config(self, **kwargs):
+        pass
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.thread.join()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._running and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                if not self._running:
+                    return
+                _, _, func, args = heapq.heappop(self._heap)
+            self.wakeups += 1
+            func(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="统计空闲时每分钟的唤醒次数")
+    parser.add_argument('--seconds', type=float, default=30.0, help="测量时长 (秒)")
+    args = parser.parse_args()
+
+    root = StandInRoot()
+    runtime = CoreRuntime()
+    runtime.start()
+    executor = UITaskExecutor(root)
+    runtime.set_ui_bridge(executor.post)
+    watchdog = TkWatchdog(root, executor=executor)
+    watchdog.start(runtime)
+    timers = [
+        runtime.every(MONITOR_INTERVAL, lambda: None, name='network_monitor'),
+        runtime.every(ADAPTER_TABLE_INTERVAL, lambda: None, name='adapter_table'),
+        runtime.every(ADAPTER_VIEW_INTERVAL, runtime.post_ui, lambda: None, name='adapter_view',
+                      initial_delay=ADAPTER_VIEW_INTERVAL),
+    ]
+
+    # 跳过启动后的快速轮询阶段
+    time.sleep(WARMUP)
+    start_core, start_ui = runtime.scheduler.wakeups, root.wakeups
+    start_checks = runtime.scheduler.get_stats()['tasks']['tk_watchdog']['runs']
+    time.sleep(args.seconds)
+    minutes = args.seconds / 60
+    core = (runtime.scheduler.wakeups - start_core) / minutes
+    ui = (root.wakeups - start_ui) / minutes
+    checks = (runtime.scheduler.get_stats()['tasks']['tk_watchdog']['runs'] - start_checks) / minutes
+
+    for timer in timers:
+        timer.cancel()
+    watchdog.stop()
+    executor.shutdown()
+    runtime.stop()
+    root.stop()
+
+    print(f"测量 {args.seconds:.0f} 秒 (每分钟):")
+    print(f"  核心运行时唤醒  {core:8.1f}  (其中看门狗检查 {checks:.1f} 次)")
+    print(f"  界面线程唤醒    {ui:8.1f}")
+    print(f"  合计            {core + ui:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+接口枚举性能测试 - 对比 netlink / getifaddrs 后端与 psutil 在大量接口下的耗时
+
+创建指定数量的 veth 接口对 (每个带一个IPv4地址)，然后分别测量各后端获取一次
+完整接口表的耗时。psutil 一栏按原来的做法同时调用 net_if_stats 和 net_if_addrs。
+需要 root 权限，建议在独立的网络命名空间中运行，结束后会删除创建的接口:
+
+    sudo unshare -n python benchmarks/bench_interfaces.py --veths 300
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+
+from src.interfaces import NetlinkInterfaceBackend, GetifaddrsInterfaceBackend, PsutilInterfaceBackend
+
+PREFIX = 'ggpmb'
+
+
+def _ip_batch(commands):
+    subprocess.run(['ip', '-batch', '-'], input='\n'.join(commands) + '\n', text=True, check=True)
+
+
+def create_veths(count):
+    commands = []
+    for i in range(count):
+        commands.append(f'link add {PREFIX}{i}a type veth peer name {PREFIX}{i}b')
+        commands.append(f'addr add 10.{100 + i // 250}.{i % 250}.1/24 dev {PREFIX}{i}a')
+        commands.append(f'link set {PREFIX}{i}a up')
+        commands.append(f'link set {PREFIX}{i}b up')
+    _ip_batch(commands)
+
+
+def delete_veths(count):
+    # 删除 veth 的一端会同时删除另一端
+    _ip_batch([f'link del {PREFIX}{i}a' for i in range(count)])
+
+
+def _psutil_baseline():
+    psutil.net_if_stats()
+    psutil.net_if_addrs()
+
+
+def _measure(func, rounds):
+    func()
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口枚举性能测试")
+    parser.add_argument('--veths', type=int, default=0, help="创建的 veth 接口对数量 (需要 root)")
+    parser.add_argument('--rounds', type=int, default=200, help="每个后端的测量次数")
+    args = parser.parse_args()
+
+    if args.veths:
+        create_veths(args.veths)
+    try:
+        print(f"接口数量: {len(psutil.net_if_stats())}")
+        print(f"{'后端':<28}{'中位数 (ms)':>14}{'P95 (ms)':>12}")
+        cases = [('psutil (stats + addrs)', _psutil_baseline),
+                 ('psutil 后端', PsutilInterfaceBackend().snapshot),
+                 ('getifaddrs 后端', GetifaddrsInterfaceBackend().snapshot),
+                 ('netlink 后端', NetlinkInterfaceBackend().snapshot)]
+        for label, func in cases:
+            median, p95 = _measure(func, args.rounds)
+            print(f"{label:<28}{median * 1000:>14.3f}{p95 * 1000:>12.3f}")
+    finally:
+        if args.veths:
+            delete_veths(args.veths)
+
+
+if __name__ == "__main__":
+    main()
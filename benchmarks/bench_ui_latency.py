@@ -0,0 +1,125 @@
+"""
+界面响应延迟测试 - 脚本化地驱动主窗口的各个处理函数，报告事件循环延迟的 p95/p99
+
+依次运行几个场景 (空闲、保存端口、选择适配器、切换主题、大量日志)，每个场景之前
+清空看门狗的数据，结束后读取 TkWatchdog 的统计。配置和 gitconfig 写入临时目录，
+不影响本机设置。需要图形环境，在服务器上用 Xvfb 运行:
+
+    xvfb-run -a python benchmarks/bench_ui_latency.py [--seconds 5]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import gui as gui_module
+from src.config import ConfigManager
+from src.git_proxy import GitProxyManager
+from src.gitconfig import global_config_path
+from src.network import NetworkMonitor
+
+STEP_MS = 50
+LOG_LINES_PER_STEP = 200
+
+
+def _file_state(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return None
+
+
+def _scenarios(gui):
+    adapters = list(gui.adapter_combobox['values']) or [gui.adapter_var.get()]
+    ports = ['7890', '7891']
+    log = logging.getLogger('bench')
+
+    def save_port(i):
+        gui.port_entry.delete(0, 'end')
+        gui.port_entry.insert(0, ports[i % len(ports)])
+        gui.save_port()
+
+    def select_adapter(i):
+        gui.adapter_var.set(adapters[i % len(adapters)])
+        gui.on_adapter_selected()
+
+    def log_flood(i):
+        for n in range(LOG_LINES_PER_STEP):
+            log.info(f"压力测试日志 {i}-{n}")
+
+    return [('空闲', lambda i: None),
+            ('save_port', save_port),
+            ('on_adapter_selected', select_adapter),
+            ('toggle_theme', lambda i: gui.toggle_theme()),
+            ('日志洪水', log_flood)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="界面响应延迟测试")
+    parser.add_argument('--seconds', type=float, default=5, help="每个场景的持续时间 (秒)")
+    args = parser.parse_args()
+
+    # 保存端口时的提示框会阻塞事件循环，测试中不弹出
+    gui_module.messagebox.showinfo = lambda *a, **k: None
+    gui_module.messagebox.showerror = lambda *a, **k: None
+
+    workdir = tempfile.mkdtemp(prefix='ggpm-ui-bench-')
+    gitconfig_path = os.path.join(workdir, 'gitconfig')
+    real_gitconfig = _file_state(global_config_path())
+    # 子进程中的 git 也只能看到临时的全局配置
+    os.environ['GIT_CONFIG_GLOBAL'] = gitconfig_path
+    config_manager = ConfigManager(os.path.join(workdir, 'config'))
+    git_proxy_manager = GitProxyManager(config_path=gitconfig_path)
+    network_monitor = NetworkMonitor(callback=None, config_manager=config_manager)
+    gui = gui_module.GitProxyMonitorGUI(network_monitor, git_proxy_manager, config_manager)
+    root = gui.root
+    results = []
+    scenarios = _scenarios(gui)
+    steps = max(int(args.seconds * 1000 / STEP_MS), 1)
+
+    def run_scenario(index, step):
+        if step == 0:
+            gui.watchdog.reset()
+        name, action = scenarios[index]
+        if step < steps:
+            action(step)
+            root.after(STEP_MS, run_scenario, index, step + 1)
+            return
+        results.append((name, gui.watchdog.get_stats()))
+        if index + 1 < len(scenarios):
+            root.after(STEP_MS, run_scenario, index + 1, 0)
+        else:
+            root.quit()
+
+    # 先等待初始化的后台任务完成
+    root.after(1000, run_scenario, 0, 0)
+    start = time.perf_counter()
+    try:
+        gui.run()
+    finally:
+        gui.stop_monitoring()
+        gui.adapter_table_worker.stop()
+        gui.watchdog.stop()
+        gui.ui_executor.shutdown()
+        if gui.tray_icon:
+            gui.tray_icon.stop()
+        root.destroy()
+
+    print(f"总耗时 {time.perf_counter() - start:.1f}s")
+    print(f"Git 代理写入: {gitconfig_path} -> {git_proxy_manager.read_proxy()[0]}")
+    del os.environ['GIT_CONFIG_GLOBAL']
+    if _file_state(global_config_path()) != real_gitconfig:
+        print(f"警告: 测试期间本机的全局 gitconfig 被修改: {global_config_path()}")
+    print(f"{'场景':<22}{'样本':>8}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'最大 (ms)':>11}{'卡顿':>6}")
+    for name, stats in results:
+        print(f"{name:<22}{stats['samples']:>8}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+              f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>11.1f}{stats['stalls']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,49 @@ import sys
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
-# 导入主模块
-from src.main import main
+from src.single_instance import SingleInstance
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # --trace-summary [文件]: 汇总追踪文件中各阶段的耗时
+    if '--trace-summary' in sys.argv:
+        from src.tracing import main as trace_summary_main
+        sys.exit(trace_summary_main(sys.argv[sys.argv.index('--trace-summary') + 1:]))
+
+    # --write-gitconfig: 服务模式以登记用户身份启动的写入子进程 (打包后的程序使用)
+    if '--write-gitconfig' in sys.argv:
+        from src.gitconfig_writer import main as write_gitconfig_main
+        sys.exit(write_gitconfig_main())
+
+    # --service [--config 配置目录]: 以服务模式运行，为所有登记的用户更新 Git 代理
+    if '--service' in sys.argv:
+        config_dir = 'config'
+        if '--config' in sys.argv[:-1]:
+            config_dir = sys.argv[sys.argv.index('--config') + 1]
+        service_instance = SingleInstance('ggpm-service')
+        if not service_instance.acquire():
+            print("服务模式已在运行")
+            sys.exit(1)
+        from src.service import main as service_main
+        try:
+            sys.exit(service_main(config_dir))
+        finally:
+            service_instance.release()
+
+    # 已有实例在运行时，把参数交给它并立即退出，不加载界面
+    instance = SingleInstance()
+    if not instance.acquire():
+        instance.send(sys.argv[1:] or ['--show'])
+        sys.exit(0)
+
+    # --profile [秒数]: 启动后立即进行一次性能分析
+    profile_duration = None
+    if '--profile' in sys.argv:
+        index = sys.argv.index('--profile') + 1
+        try:
+            profile_duration = float(sys.argv[index])
+        except (IndexError, ValueError):
+            profile_duration = 60
+
+    # 导入主模块
+    from src.main import main
+    main(instance, profile_duration)
@@ -0,0 +1,150 @@
+"""
+适配器分类模块 - 根据系统提供的硬件信息判断网络适配器是有线、无线还是虚拟网卡
+
+Linux 上读取 /sys/class/net/<接口>/ 下的属性:
+    - wireless 目录、phy80211 链接或 uevent 中的 DEVTYPE=wlan/wwan -> 无线
+    - bridge / bonding 目录、tun_flags 文件或虚拟设备的 DEVTYPE      -> 虚拟
+    - 非以太网的 type (没有 device 链接的 ARPHRD_NONE 除外)          -> 虚拟
+    - 存在 device 链接 (背后有真实的总线设备)                        -> 有线
+    - 没有 device 链接也没有 DEVTYPE (veth、dummy 等)               -> 虚拟
+无法读取 sysfs，或者没有 device 链接但 DEVTYPE 未知、type 为 ARPHRD_NONE
+(部分 wwan 和 USB 网卡) 时，按名称关键字猜测。
+分类结果按 (ifindex, 名称) 缓存，接口增删或改名后对应条目失效。
+"""
+import os
+import logging
+import threading
+
+# sysfs 中 type 文件的取值 (linux/if_arp.h)
+ARPHRD_ETHER = 1
+ARPHRD_IEEE80211 = 801
+ARPHRD_IEEE80211_RADIOTAP = 803
+ARPHRD_NONE = 65534
+
+# uevent 中 DEVTYPE 的取值
+WIRELESS_DEVTYPES = ('wlan', 'wwan')
+VIRTUAL_DEVTYPES = ('bridge', 'bond', 'team', 'vlan', 'macvlan', 'macvtap', 'ipvlan', 'vxlan', 'geneve',
+                    'wireguard', 'openvswitch')
+
+VIRTUAL_KEYWORDS = ['vmware', 'virtual', 'vethernet', 'docker', 'vbox', 'vmnet',
+                    'veth', 'virbr', 'containers', 'vpn', 'loopback', 'tunnel',
+                    'wsltty', 'wsl']
+WIRELESS_KEYWORDS = ['wi', 'wlan', 'wireless', 'wifi', 'wwan']
+WIRED_KEYWORDS = ['eth', 'realtek', 'broadcom', 'intel', 'nic']
+
+
+def classify_by_name(iface):
+    """
+    根据名称关键字猜测适配器类型 (最后的手段)
+
+    Args:
+        iface: 适配器名称
+
+    Returns:
+        str: "虚拟", "无线", "有线" 或 "未知类型"
+    """
+    name = iface.lower()
+    if any(vk in name for vk in VIRTUAL_KEYWORDS):
+        return "虚拟"
+    if any(wk in name for wk in WIRELESS_KEYWORDS):
+        return "无线"
+    if any(ek in name for ek in WIRED_KEYWORDS):
+        return "有线"
+    return "未知类型"
+
+
+class AdapterClassifier:
+    def __init__(self, sysfs_root='/sys/class/net'):
+        """
+        初始化适配器分类器
+
+        Args:
+            sysfs_root: sysfs 网络接口目录，可指向伪造的目录树用于测试
+        """
+        self.sysfs_root = sysfs_root
+        self.logger = logging.getLogger('adapter_classifier')
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def classify(self, iface, ifindex=None):
+        """
+        获取适配器类型，优先使用缓存
+
+        Args:
+            iface: 适配器名称
+            ifindex: 接口索引 (可选)，与名称一起作为缓存键
+
+        Returns:
+            str: "虚拟", "无线", "有线" 或 "未知类型"
+        """
+        key = (ifindex, iface)
+        iface_type = self._cache.get(key)
+        if iface_type is None:
+            iface_type = self._classify_sysfs(iface)
+            if iface_type is None:
+                iface_type = classify_by_name(iface)
+            with self._lock:
+                self._cache[key] = iface_type
+        return iface_type
+
+    def sync(self, interfaces):
+        """
+        根据最新的接口表清理缓存，已删除或改名的接口对应的条目失效
+
+        Args:
+            interfaces: interfaces.InterfaceTable 实例
+        """
+        live = set(zip(interfaces.indexes, interfaces.names))
+        with self._lock:
+            stale = [key for key in self._cache if key[0] is not None and key not in live]
+            for key in stale:
+                del self._cache[key]
+        if stale:
+            self.logger.debug(f"接口已变化，清除分类缓存: {[name for _, name in stale]}")
+
+    def invalidate(self):
+        """
+        清空全部缓存
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def _classify_sysfs(self, iface):
+        path = os.path.join(self.sysfs_root, iface)
+        if not os.path.isdir(path):
+            return None
+        try:
+            with open(os.path.join(path, 'type')) as f:
+                arp_type = int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+        devtype = self._devtype(path)
+        if (os.path.isdir(os.path.join(path, 'wireless')) or os.path.exists(os.path.join(path, 'phy80211'))
+                or arp_type in (ARPHRD_IEEE80211, ARPHRD_IEEE80211_RADIOTAP) or devtype in WIRELESS_DEVTYPES):
+            return "无线"
+        if (os.path.isdir(os.path.join(path, 'bridge')) or os.path.isdir(os.path.join(path, 'bonding'))
+                or os.path.exists(os.path.join(path, 'tun_flags')) or devtype in VIRTUAL_DEVTYPES):
+            return "虚拟"
+        has_device = os.path.exists(os.path.join(path, 'device'))
+        if arp_type == ARPHRD_NONE and not has_device:
+            # 纯 IP 的 wwan 等设备也使用 ARPHRD_NONE，无法据此判断
+            return None
+        if arp_type != ARPHRD_ETHER:
+            return "虚拟"
+        if has_device:
+            return "有线"
+        if devtype:
+            # 有 DEVTYPE 说明驱动声明了设备类型，但不是已知的虚拟设备
+            return None
+        return "虚拟"
+
+    def _devtype(self, path):
+        try:
+            with open(os.path.join(path, 'uevent')) as f:
+                for line in f:
+                    if line.startswith('DEVTYPE='):
+                        return line.strip().split('=', 1)[1]
+        except OSError:
+            pass
+        return None
@@ -0,0 +1,235 @@
+"""
+适配器表模块 - 缓存网络适配器信息并在后台统计实时吞吐量
+"""
+import time
+import math
+import threading
+import logging
+from collections import namedtuple
+
+import psutil
+
+# 适配器表中的一行: 名称, 类型, IPv4地址元组, 是否启用, 是否可供选择, 接收速率, 发送速率 (字节/秒)
+AdapterRow = namedtuple('AdapterRow', ['name', 'type', 'ips', 'is_up', 'selectable', 'rx_rate', 'tx_rate'])
+
+# 低于该速率的流量 (后台的零星报文) 记为 0
+RATE_NOISE_FLOOR = 100
+# 速率保留的有效数字位数
+RATE_SIGNIFICANT_DIGITS = 2
+
+
+def round_rate(rate):
+    """
+    将速率舍入到有限的精度，速率的微小波动不会使行内容变化
+
+    Args:
+        rate: 速率 (字节/秒)
+
+    Returns:
+        float: 舍入后的速率
+    """
+    if rate < RATE_NOISE_FLOOR:
+        return 0.0
+    return float(round(rate, RATE_SIGNIFICANT_DIGITS - 1 - int(math.floor(math.log10(rate)))))
+
+
+class AdapterTableModel:
+    def __init__(self):
+        """
+        初始化适配器表模型
+
+        每一行都带有修改时的版本号，视图只需要拉取某个版本之后的差异即可。
+        删除记录只保留到所有视图都已同步过的版本为止。
+        """
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._row_versions = {}
+        self._removed = {}
+        # {视图标识: 该视图最近一次请求差异时持有的版本号}
+        self._viewer_versions = {}
+        self.version = 0
+
+    def upsert(self, row):
+        """
+        插入或更新一行，内容未变化时不增加版本号
+
+        Args:
+            row: AdapterRow 实例
+
+        Returns:
+            bool: 该行是否发生变化
+        """
+        with self._lock:
+            if self._rows.get(row.name) == row:
+                return False
+            self.version += 1
+            self._rows[row.name] = row
+            self._row_versions[row.name] = self.version
+            self._removed.pop(row.name, None)
+            return True
+
+    def retain(self, names):
+        """
+        删除不在给定名称集合中的行
+
+        Args:
+            names: 仍然存在的适配器名称集合
+        """
+        with self._lock:
+            for name in [n for n in self._rows if n not in names]:
+                self.version += 1
+                del self._rows[name]
+                del self._row_versions[name]
+                self._removed[name] = self.version
+            self._trim_removed()
+
+    def get_row(self, name):
+        """
+        获取指定适配器的缓存行
+
+        Args:
+            name: 适配器名称
+
+        Returns:
+            AdapterRow: 缓存行，不存在时返回 None
+        """
+        with self._lock:
+            return self._rows.get(name)
+
+    def rows(self):
+        """
+        获取所有缓存行
+
+        Returns:
+            list: 按名称排序的 AdapterRow 列表
+        """
+        with self._lock:
+            return [self._rows[name] for name in sorted(self._rows)]
+
+    def selectable_names(self):
+        """
+        获取可供用户选择的适配器名称
+
+        Returns:
+            list: 适配器名称列表
+        """
+        return [row.name for row in self.rows() if row.selectable]
+
+    def diff_since(self, version, viewer=None):
+        """
+        获取指定版本之后的变化
+
+        Args:
+            version: 视图上一次同步到的版本号
+            viewer: 视图标识 (可选)，有多个视图时各自使用不同的标识
+
+        Returns:
+            tuple: (当前版本号, 变化的行列表, 被删除的适配器名称列表)
+        """
+        with self._lock:
+            changed = [self._rows[name] for name, v in self._row_versions.items() if v > version]
+            removed = [name for name, v in self._removed.items() if v > version]
+            # 视图可能同步失败后用同一版本重试，所以按它传入的版本而不是返回的版本清理
+            self._viewer_versions[viewer] = version
+            self._trim_removed()
+            return self.version, changed, removed
+
+    def _trim_removed(self):
+        # 还没有视图时，首次同步从版本 0 开始，不需要任何删除记录
+        oldest = min(self._viewer_versions.values(), default=self.version)
+        for name in [n for n, v in self._removed.items() if v <= oldest]:
+            del self._removed[name]
+
+
+class AdapterTableWorker:
+    def __init__(self, model, network_monitor, interval=1.0, runtime=None):
+        """
+        初始化适配器表后台刷新线程
+
+        Args:
+            model: AdapterTableModel 实例
+            network_monitor: 网络监控器实例，用于判断适配器类型
+            interval: 刷新间隔 (秒)
+            runtime: 核心运行时 (可选)，提供时由其定时器驱动刷新，不再单独创建线程
+        """
+        self.model = model
+        self.network_monitor = network_monitor
+        self.interval = interval
+        self.is_running = False
+        self.worker_thread = None
+        self.runtime = runtime
+        self._timer = None
+        self._stop_event = threading.Event()
+        self._last_counters = {}
+        self._last_sample_time = None
+        self.logger = logging.getLogger('adapter_table')
+
+    def start(self):
+        """
+        启动后台刷新线程
+        """
+        if self.is_running:
+            return
+        self.is_running = True
+        if self.runtime:
+            self._timer = self.runtime.every(self.interval, self.refresh_once, name='adapter_table')
+            return
+        self._stop_event.clear()
+        self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self.worker_thread.start()
+
+    def stop(self):
+        """
+        停止后台刷新线程
+        """
+        if not self.is_running:
+            return
+        self.is_running = False
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._stop_event.set()
+        if self.worker_thread:
+            self.worker_thread.join(timeout=1)
+            self.worker_thread = None
+
+    def refresh_once(self):
+        """
+        采样一次所有接口并逐行写入模型
+        """
+        interfaces = self.network_monitor.snapshot_interfaces()
+        counters = psutil.net_io_counters(pernic=True)
+        now = time.monotonic()
+        elapsed = now - self._last_sample_time if self._last_sample_time else 0
+
+        for iface in interfaces:
+            is_up = interfaces.is_up(iface)
+            ips = tuple(address for address in interfaces.ipv4(iface) if not address.startswith('127.'))
+            iface_type = self.network_monitor.classify_adapter(iface, interfaces.index(iface))
+
+            rx_rate = tx_rate = 0.0
+            current = counters.get(iface)
+            previous = self._last_counters.get(iface)
+            if current and previous and elapsed > 0:
+                # 计数器可能因为网卡重置而回绕，此时本轮速率记为0
+                rx_rate = max(current.bytes_recv - previous.bytes_recv, 0) / elapsed
+                tx_rate = max(current.bytes_sent - previous.bytes_sent, 0) / elapsed
+
+            selectable = is_up and bool(ips) and iface_type in ("有线", "无线")
+            self.model.upsert(AdapterRow(iface, iface_type, ips, is_up, selectable,
+                                         round_rate(rx_rate), round_rate(tx_rate)))
+
+        self.model.retain(set(interfaces))
+        self._last_counters = counters
+        self._last_sample_time = now
+
+    def _worker_loop(self):
+        """
+        刷新循环
+        """
+        while self.is_running:
+            try:
+                self.refresh_once()
+            except Exception as e:
+                self.logger.error(f"刷新适配器表失败: {e}")
+            self._stop_event.wait(self.interval)
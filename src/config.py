@@ -2,8 +2,11 @@
 配置管理模块 - 保存和读取配置
 """
 import os
+import json
 import logging
 
+from src import tracing
+
 class ConfigManager:
     def __init__(self, config_dir='config'):
         """
@@ -35,6 +38,49 @@ class ConfigManager:
             except Exception as e:
                 self.logger.error(f"创建配置目录失败: {e}")
                 
+    def load_json(self, filename, default=None):
+        """
+        读取配置目录下的 JSON 配置文件
+
+        Args:
+            filename: 文件名
+            default: 文件不存在或解析失败时的返回值
+
+        Returns:
+            object: 解析后的数据
+        """
+        path = os.path.join(self.config_dir, filename)
+        if not os.path.exists(path):
+            return default
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.error(f"读取配置文件 {filename} 失败: {e}")
+            return default
+
+    def save_json(self, filename, data):
+        """
+        原子地保存 JSON 配置文件 (先写临时文件再替换)
+
+        Args:
+            filename: 文件名
+            data: 要保存的数据
+
+        Returns:
+            bool: 是否成功保存
+        """
+        path = os.path.join(self.config_dir, filename)
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            self.logger.error(f"保存配置文件 {filename} 失败: {e}")
+            return False
+
     def get_proxy_port(self, default_port='7890'):
         """
         获取代理端口
@@ -102,14 +148,15 @@ class ConfigManager:
         Returns:
             bool: 是否成功保存
         """
-        try:
-            with open(self.ip_file, 'w') as f:
-                f.write(str(ip))
-            self.logger.info(f"保存最新IP: {ip}")
-            return True
-        except Exception as e:
-            self.logger.error(f"保存IP文件失败: {e}")
-            return False
+        with tracing.span('config.save_last_ip'):
+            try:
+                with open(self.ip_file, 'w') as f:
+                    f.write(str(ip))
+                self.logger.info(f"保存最新IP: {ip}")
+                return True
+            except Exception as e:
+                self.logger.error(f"保存IP文件失败: {e}")
+                return False
             
     def get_selected_adapter(self):
         """
@@ -0,0 +1,420 @@
+"""
+代理发现模块 - 在局域网中查找运行代理的主机
+
+校园网等环境中代理常运行在同一网段的另一台机器上，IP 变化时:
+    - 用限速的 asyncio 扫描器并行探测本网段所有主机的代理端口
+    - 同时发送 mDNS/DNS-SD 查询并监听服务通告 (默认 _http-proxy._tcp.local)
+    - 按 TCP 握手延迟对候选排序，结果按网络指纹缓存，同一网络再次出现时先验证缓存的候选
+"""
+import time
+import socket
+import struct
+import asyncio
+import ipaddress
+import threading
+import logging
+from collections import namedtuple
+
+from src import tracing
+from src.profiles import collect_fingerprint
+
+DEFAULT_CONCURRENCY = 256
+DEFAULT_RATE = 2000
+DEFAULT_TIMEOUT = 0.5
+DEFAULT_CACHE_TTL = 600
+MAX_SCAN_HOSTS = 1024
+MDNS_GROUP = '224.0.0.251'
+MDNS_PORT = 5353
+MDNS_LISTEN_TIME = 1.0
+DEFAULT_SERVICE_TYPES = ('_http-proxy._tcp.local',)
+
+_DNS_A = 1
+_DNS_PTR = 12
+_DNS_SRV = 33
+_QU_CLASS = 0x8001  # IN 类，并要求单播回复
+
+# 候选代理: 主机, 端口, 握手延迟 (秒), 来源 ('scan' | 'mdns')
+ProxyCandidate = namedtuple('ProxyCandidate', ['host', 'port', 'latency', 'source'])
+
+
+class _RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(self._next, now)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def probe(host, port, timeout):
+    """
+    测量到指定端口的 TCP 握手延迟
+
+    Args:
+        host: 主机地址
+        port: 端口
+        timeout: 超时时间 (秒)
+
+    Returns:
+        float: 延迟 (秒)，无法连接时返回 None
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    latency = loop.time() - start
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return latency
+
+
+async def scan_subnet(hosts, ports, timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE):
+    """
+    并行探测一组主机的代理端口
+
+    Args:
+        hosts: 主机地址列表
+        ports: 端口列表
+        timeout: 单次连接超时 (秒)
+        concurrency: 同时进行的连接数上限
+        rate: 每秒发起的连接数上限
+
+    Returns:
+        list: 可以连接的 ProxyCandidate 列表
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = _RateLimiter(rate)
+
+    async def check(host, port):
+        async with semaphore:
+            await limiter.acquire()
+            latency = await probe(host, port, timeout)
+        return ProxyCandidate(host, port, latency, 'scan') if latency is not None else None
+
+    results = await asyncio.gather(*(check(host, port) for host in hosts for port in ports))
+    return [candidate for candidate in results if candidate]
+
+
+def _encode_name(name):
+    return b''.join(bytes([len(label)]) + label.encode() for label in name.strip('.').split('.')) + b'\0'
+
+
+def build_mdns_query(service_types):
+    """
+    构造 DNS-SD 的 PTR 查询报文
+
+    Args:
+        service_types: 服务类型列表，例如 "_http-proxy._tcp.local"
+
+    Returns:
+        bytes: 报文
+    """
+    header = struct.pack('!6H', 0, 0, len(service_types), 0, 0, 0)
+    return header + b''.join(_encode_name(name) + struct.pack('!2H', _DNS_PTR, _QU_CLASS) for name in service_types)
+
+
+def _read_name(data, offset):
+    labels = []
+    end = None
+    for _ in range(128):
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            # 压缩指针
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        if length == 0:
+            return '.'.join(labels).lower(), end if end is not None else offset + 1
+        labels.append(data[offset + 1:offset + 1 + length].decode('utf-8', 'replace'))
+        offset += 1 + length
+    raise ValueError("DNS 名称过长或存在循环指针")
+
+
+def parse_mdns_response(data, service_types=DEFAULT_SERVICE_TYPES):
+    """
+    从 mDNS 响应或通告中提取代理服务的地址
+
+    Args:
+        data: 报文
+        service_types: 关心的服务类型
+
+    Returns:
+        list: [(主机名, 端口, IPv4地址或 None)]
+    """
+    wanted = {name.strip('.').lower() for name in service_types}
+    _, _, qdcount, ancount, nscount, arcount = struct.unpack_from('!6H', data)
+    offset = 12
+    for _ in range(qdcount):
+        _, offset = _read_name(data, offset)
+        offset += 4
+    instances, services, addresses = set(), {}, {}
+    for _ in range(ancount + nscount + arcount):
+        name, offset = _read_name(data, offset)
+        rtype, _, _, rdlength = struct.unpack_from('!2HIH', data, offset)
+        offset += 10
+        rdata = offset
+        offset += rdlength
+        if rtype == _DNS_PTR and name in wanted:
+            instances.add(_read_name(data, rdata)[0])
+        elif rtype == _DNS_SRV:
+            port = struct.unpack_from('!H', data, rdata + 4)[0]
+            services[name] = (_read_name(data, rdata + 6)[0], port)
+        elif rtype == _DNS_A and rdlength == 4:
+            addresses[name] = socket.inet_ntoa(data[rdata:rdata + 4])
+    # 只有 SRV 记录的通告 (实例名属于关心的服务类型) 也算
+    for name in services:
+        if any(name.endswith('.' + service) for service in wanted):
+            instances.add(name)
+    return [(target, port, addresses.get(target)) for name, (target, port) in services.items() if name in instances]
+
+
+class _MdnsProtocol(asyncio.DatagramProtocol):
+    def __init__(self, service_types):
+        self.service_types = service_types
+        self.found = {}
+
+    def datagram_received(self, data, addr):
+        try:
+            for target, port, address in parse_mdns_response(data, self.service_types):
+                # 没有附带 A 记录时使用发送方地址
+                self.found[(address or addr[0], port)] = target
+        except (ValueError, struct.error, IndexError):
+            pass
+
+
+def _open_mdns_socket(local_ip):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, 'SO_REUSEPORT'):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        except OSError:
+            pass
+    try:
+        # 绑定 5353 并加入组播组才能收到其他主机的通告；端口被占用时只能收到对查询的单播回复
+        sock.bind(('', MDNS_PORT))
+        membership = socket.inet_aton(MDNS_GROUP) + socket.inet_aton(local_ip or '0.0.0.0')
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+    except OSError:
+        sock.close()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.bind(('', 0))
+    if local_ip:
+        try:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(local_ip))
+        except OSError:
+            pass
+    sock.setblocking(False)
+    return sock
+
+
+async def browse_mdns(service_types=DEFAULT_SERVICE_TYPES, local_ip=None, duration=MDNS_LISTEN_TIME,
+                      target=(MDNS_GROUP, MDNS_PORT)):
+    """
+    发送 DNS-SD 查询并在一段时间内收集回复和通告
+
+    Args:
+        service_types: 服务类型列表
+        local_ip: 发送查询使用的本机地址 (可选)
+        duration: 收集时间 (秒)
+        target: 查询发送的目标地址
+
+    Returns:
+        list: [(地址, 端口)]
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        sock = _open_mdns_socket(local_ip)
+    except OSError as e:
+        logging.getLogger('discovery').debug(f"无法打开 mDNS 套接字: {e}")
+        return []
+    transport, protocol = await loop.create_datagram_endpoint(lambda: _MdnsProtocol(service_types), sock=sock)
+    try:
+        transport.sendto(build_mdns_query(list(service_types)), target)
+        await asyncio.sleep(duration)
+    except OSError as e:
+        logging.getLogger('discovery').debug(f"发送 mDNS 查询失败: {e}")
+    finally:
+        transport.close()
+    return list(protocol.found)
+
+
+def scan_hosts(ip, prefix, max_hosts=MAX_SCAN_HOSTS):
+    """
+    获取本网段内要扫描的主机地址，网段过大时只扫描本机附近的 max_hosts 个地址
+
+    Args:
+        ip: 本机地址
+        prefix: 前缀长度
+        max_hosts: 主机数上限
+
+    Returns:
+        tuple: (网段, 主机地址列表)
+    """
+    network = ipaddress.ip_interface(f'{ip}/{prefix}').network
+    if network.num_addresses - 2 > max_hosts:
+        # 缩小到包含本机的、不超过上限的网段
+        new_prefix = 32 - max(max_hosts + 2, 4).bit_length() + 1
+        network = ipaddress.ip_interface(f'{ip}/{max(new_prefix, prefix)}').network
+    return network, [str(host) for host in network.hosts()]
+
+
+class ProxyDiscovery:
+    def __init__(self, ports, timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+                 mdns=True, service_types=DEFAULT_SERVICE_TYPES, cache_ttl=DEFAULT_CACHE_TTL,
+                 max_hosts=MAX_SCAN_HOSTS, runtime=None, fingerprint=collect_fingerprint):
+        """
+        初始化代理发现
+
+        Args:
+            ports: 额外扫描的端口列表 (当前设置的端口总是会被扫描)
+            timeout: 单次连接超时 (秒)
+            concurrency: 同时进行的连接数上限
+            rate: 每秒发起的连接数上限
+            mdns: 是否同时使用 mDNS/DNS-SD 查找
+            service_types: DNS-SD 服务类型
+            cache_ttl: 缓存的有效期 (秒)
+            max_hosts: 单次扫描的主机数上限
+            runtime: 核心运行时 (可选)，提供时在其事件循环上执行扫描
+            fingerprint: 计算网络指纹的函数 fingerprint(ip, adapter_name)
+        """
+        self.ports = [int(port) for port in ports]
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.rate = rate
+        self.mdns = mdns
+        self.service_types = tuple(service_types)
+        self.cache_ttl = cache_ttl
+        self.max_hosts = max_hosts
+        self.runtime = runtime
+        self.fingerprint = fingerprint
+        self.logger = logging.getLogger('discovery')
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def discover(self, ip, adapter_name, port=None, prefix=24):
+        """
+        在本网段中查找代理 (阻塞调用，不要在事件循环线程中调用)
+
+        Args:
+            ip: 本机IP地址
+            adapter_name: 适配器名称
+            port: 当前设置的代理端口 (可选)
+            prefix: 本机地址的前缀长度
+
+        Returns:
+            list: 按握手延迟排序的 ProxyCandidate 列表
+        """
+        ports = list(dict.fromkeys(([int(port)] if port else []) + self.ports))
+        network, hosts = scan_hosts(ip, prefix, self.max_hosts)
+        try:
+            key = (self.fingerprint(ip, adapter_name), str(network), tuple(ports))
+        except Exception as e:
+            self.logger.debug(f"获取网络指纹失败: {e}")
+            key = (adapter_name, str(network), tuple(ports))
+
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl and cached[1]:
+            candidates = self._run(self._verify(cached[1]))
+            if candidates:
+                self.logger.info(f"使用缓存的代理发现结果 ({network}): {self._describe(candidates)}")
+                return candidates
+
+        start = time.perf_counter()
+        candidates = self._run(self._discover(ip, hosts, ports))
+        with self._lock:
+            self._cache[key] = (time.monotonic(), candidates)
+        self.logger.info(f"扫描 {network} 的端口 {ports} 用时 {time.perf_counter() - start:.2f}s，"
+                         f"发现 {len(candidates)} 个代理: {self._describe(candidates)}")
+        return candidates
+
+    def best(self, ip, adapter_name, port=None, prefix=24):
+        """
+        查找延迟最低的代理
+
+        Returns:
+            tuple: (主机, 端口)，没有找到时返回 None
+        """
+        with tracing.span('discovery.best', prefix=prefix):
+            candidates = self.discover(ip, adapter_name, port, prefix)
+        return (candidates[0].host, candidates[0].port) if candidates else None
+
+    def invalidate(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def _run(self, coro):
+        if self.runtime and self.runtime.is_running:
+            return self.runtime.submit(coro).result()
+        return asyncio.run(coro)
+
+    async def _discover(self, ip, hosts, ports):
+        tasks = [scan_subnet(hosts, ports, self.timeout, self.concurrency, self.rate)]
+        if self.mdns:
+            tasks.append(browse_mdns(self.service_types, ip))
+        results = await asyncio.gather(*tasks)
+        candidates = {(c.host, c.port): c for c in results[0]}
+        if self.mdns:
+            # mDNS 发现的服务可能不在扫描的端口或网段内，单独测量握手延迟
+            extra = [endpoint for endpoint in results[1] if endpoint not in candidates]
+            latencies = await asyncio.gather(*(probe(host, port, self.timeout) for host, port in extra))
+            for (host, port), latency in zip(extra, latencies):
+                if latency is not None:
+                    candidates[(host, port)] = ProxyCandidate(host, port, latency, 'mdns')
+        return sorted(candidates.values(), key=lambda c: c.latency)
+
+    async def _verify(self, candidates):
+        latencies = await asyncio.gather(*(probe(c.host, c.port, self.timeout) for c in candidates))
+        alive = [c._replace(latency=latency) for c, latency in zip(candidates, latencies) if latency is not None]
+        return sorted(alive, key=lambda c: c.latency)
+
+    def _describe(self, candidates):
+        return ', '.join(f"{c.host}:{c.port} ({c.latency * 1000:.1f}ms)" for c in candidates[:5]) or "无"
+
+
+def create_proxy_discovery(config_manager, runtime=None, filename='discovery.json'):
+    """
+    根据配置创建代理发现
+
+    配置文件格式::
+
+        {"enabled": true, "ports": [7890, 1080], "timeout": 0.5, "concurrency": 256, "rate": 2000,
+         "mdns": true, "service_types": ["_http-proxy._tcp.local"], "cache_ttl": 600}
+
+    Args:
+        config_manager: 配置管理器实例
+        runtime: 核心运行时 (可选)
+        filename: 配置目录下的配置文件名
+
+    Returns:
+        ProxyDiscovery: 未启用时返回 None
+    """
+    config = config_manager.load_json(filename, default={}) or {}
+    if not config.get('enabled'):
+        return None
+    return ProxyDiscovery(config.get('ports', []),
+                          timeout=float(config.get('timeout', DEFAULT_TIMEOUT)),
+                          concurrency=int(config.get('concurrency', DEFAULT_CONCURRENCY)),
+                          rate=float(config.get('rate', DEFAULT_RATE)),
+                          mdns=bool(config.get('mdns', True)),
+                          service_types=config.get('service_types') or DEFAULT_SERVICE_TYPES,
+                          cache_ttl=float(config.get('cache_ttl', DEFAULT_CACHE_TTL)),
+                          max_hosts=int(config.get('max_hosts', MAX_SCAN_HOSTS)),
+                          runtime=runtime)
@@ -0,0 +1,348 @@
+"""
+代理故障转移模块 - 按顺序在检测到的代理、备用代理和直连之间切换
+
+后台健康检查每隔一段时间用协程并行探测链上所有代理的端口，当前代理不可用时
+立即切换到下一个可用的条目；全部不可用时删除 Git 代理设置改为直连。
+更靠前的条目需要连续多次探测成功才会切回，避免来回抖动。
+"""
+import time
+import asyncio
+import threading
+import logging
+from collections import Counter, deque
+
+from src.git_proxy import DEFAULT_PROXY_TARGETS
+from src.state_store import HEALTH_OK, HEALTH_BACKUP, HEALTH_DIRECT
+
+DIRECT = 'direct'
+HISTORY_SIZE = 100
+
+
+def parse_proxy(text):
+    """
+    解析 "ip:port" 形式的代理地址
+
+    Args:
+        text: 代理地址，可带 http:// 前缀
+
+    Returns:
+        tuple: (ip, port)
+    """
+    text = text.strip()
+    if '://' in text:
+        text = text.split('://', 1)[1]
+    host, port = text.rstrip('/').rsplit(':', 1)
+    return host.strip('[]'), int(port)
+
+
+async def probe_proxy(proxy, timeout):
+    """
+    探测代理端口是否可以建立 TCP 连接 (协程)
+
+    Args:
+        proxy: (ip, port)
+        timeout: 超时时间 (秒)
+
+    Returns:
+        bool: 是否可用
+    """
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(*proxy), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+
+async def probe_all(proxies, timeout):
+    """
+    并行探测多个代理
+
+    Args:
+        proxies: [(ip, port)]
+        timeout: 单次探测超时 (秒)
+
+    Returns:
+        dict: {(ip, port): 是否可用}
+    """
+    results = await asyncio.gather(*(probe_proxy(proxy, timeout) for proxy in proxies))
+    return dict(zip(proxies, results))
+
+
+class FailoverChain:
+    def __init__(self, git_proxy_manager, backups=(), forward_proxy=None, interval=1.0, timeout=0.8,
+                 recover_after=2, state_store=None):
+        """
+        初始化故障转移链
+
+        Args:
+            git_proxy_manager: Git代理管理器实例
+            backups: 备用代理列表 [(ip, port)]，排在检测到的代理之后、直连之前
+            forward_proxy: 本地转发代理实例 (可选)，启用时代理条目只切换其上游
+            interval: 健康检查间隔 (秒)
+            timeout: 单次探测超时 (秒)
+            recover_after: 更靠前的条目连续成功多少次后才切回
+            state_store: 状态存储 (可选)，切换后发布代理健康状态
+        """
+        self.git_proxy_manager = git_proxy_manager
+        self.backups = [tuple(proxy) for proxy in backups]
+        self.forward_proxy = forward_proxy
+        self.interval = interval
+        self.timeout = timeout
+        self.recover_after = recover_after
+        self.state_store = state_store
+        self.targets = None
+        self.logger = logging.getLogger('failover')
+        self.active = None
+        self.transitions = 0
+        self.transition_counts = Counter()
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self._detected = None
+        self._has_detected = False
+        self._successes = Counter()
+        self._git_direct = False
+        self._dirty = False
+        # 上次成功写入的目标键 (None 表示默认键)，目标变化后需要删除旧的键
+        self._written_targets = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._timer = None
+        self.runtime = None
+        self._check_lock = threading.Lock()
+
+    def chain(self):
+        """
+        获取当前的故障转移顺序
+
+        Returns:
+            list: [(ip, port), ..., DIRECT]
+        """
+        with self._lock:
+            detected = [self._detected] if self._detected else []
+        return detected + [proxy for proxy in self.backups if proxy not in detected] + [DIRECT]
+
+    def add_listener(self, callback):
+        """
+        注册切换监听器，每次成功切换后在执行切换的线程上 (有核心运行时时为其写入通道) 调用 callback(entry)
+
+        Args:
+            callback: 回调函数，entry 为 (ip, port) 或 DIRECT
+        """
+        self._listeners.append(callback)
+
+    def set_detected(self, ip, port, targets=None):
+        """
+        设置检测到的代理 (链上的第一项)，并立即触发一次检查
+
+        Args:
+            ip: 代理IP地址
+            port: 代理端口
+            targets: 写入代理地址的 Git 配置键 (可选)，默认为 http.proxy 和 https.proxy
+        """
+        with self._lock:
+            self._detected = (ip, int(port)) if ip else None
+            self._has_detected = True
+            if targets != self.targets:
+                self.targets = targets
+                self._dirty = self.active is not None
+        if self._thread:
+            self._wakeup.set()
+        elif self._timer:
+            self.runtime.submit(self.check_async())
+        else:
+            self.check_once()
+
+    def start(self, runtime=None):
+        """
+        启动后台健康检查
+
+        Args:
+            runtime: 核心运行时 (可选)，提供时探测在其事件循环上进行，写入经由其写入通道，不再单独创建线程
+        """
+        if self._thread or self._timer:
+            return
+        if runtime:
+            self.runtime = runtime
+            self._timer = runtime.every(self.interval, self.check_async, name='failover')
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._check_loop, name='failover', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止后台健康检查
+        """
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def check_once(self):
+        """
+        并行探测链上所有代理，并切换到第一个可用的条目 (在没有运行事件循环的线程中调用)
+        """
+        if not self._has_detected:
+            # 首次检测到代理之前不改动现有设置
+            return
+        chain = self.chain()
+        self._select(chain, asyncio.run(probe_all([entry for entry in chain if entry != DIRECT], self.timeout)))
+
+    async def check_async(self):
+        """
+        与 check_once 相同，但在核心运行时的事件循环上探测，切换经由写入通道执行
+        """
+        if not self._has_detected:
+            return
+        chain = self.chain()
+        healthy = await probe_all([entry for entry in chain if entry != DIRECT], self.timeout)
+        await self.runtime.run_write(self._select, chain, healthy)
+
+    def _select(self, chain, healthy):
+        # 定时检查和 set_detected 触发的检查可能同时到达，依次执行
+        with self._check_lock:
+            self._check(chain, healthy)
+
+    def _check(self, chain, healthy):
+        self._successes = Counter({proxy: self._successes[proxy] + 1 for proxy, ok in healthy.items() if ok})
+
+        active = self.active
+        if active is not None and active not in chain:
+            active = None
+        target = DIRECT
+        for entry in chain:
+            if entry == DIRECT or entry == active:
+                target = entry
+                if entry == active and not healthy.get(entry, True):
+                    # 当前条目已失效，继续寻找它之后第一个可用的条目
+                    target = next((e for e in chain[chain.index(entry) + 1:] if e == DIRECT or healthy[e]), DIRECT)
+                break
+            # 排在当前条目之前的条目，恢复后需要连续成功若干次才切回
+            needed = 1 if active is None else self.recover_after
+            if healthy[entry] and self._successes[entry] >= needed:
+                target = entry
+                break
+
+        if target != self.active:
+            if self.active is None:
+                reason = "初始选择"
+            elif not healthy.get(self.active, True):
+                reason = "当前条目不可用"
+            else:
+                reason = "更优先的条目可用"
+            self._switch(target, reason)
+        elif self._dirty:
+            # 条目未变但写入目标变了 (例如切换了代理方案)，只重写不计入切换
+            self._apply(target)
+
+    def _describe(self, entry):
+        return "直连" if entry == DIRECT else f"{entry[0]}:{entry[1]}" if entry else "无"
+
+    def _apply(self, entry):
+        self._dirty = False
+        retarget = self.targets != self._written_targets
+        stale_keys = set(self._written_targets or DEFAULT_PROXY_TARGETS)
+        if entry == DIRECT:
+            applied = self.git_proxy_manager.clear_proxy(sorted(stale_keys | set(self.targets or DEFAULT_PROXY_TARGETS)))
+            self._git_direct = applied
+        elif self.forward_proxy:
+            self.forward_proxy.set_upstream(*entry)
+            applied = True
+            if self._git_direct or retarget:
+                applied = self.git_proxy_manager.apply_proxy('127.0.0.1', self.forward_proxy.listen_port,
+                                                             self.targets, stale_keys)
+                self._git_direct = not applied
+        else:
+            applied = self.git_proxy_manager.apply_proxy(entry[0], entry[1], self.targets, stale_keys)
+        if applied:
+            self._written_targets = self.targets
+        return applied
+
+    def _switch(self, entry, reason):
+        if not self._apply(entry):
+            self.logger.error(f"切换到 {self._describe(entry)} 失败，将在下次检查时重试")
+            return
+
+        previous, self.active = self.active, entry
+        transition = f"{self._describe(previous)} -> {self._describe(entry)}"
+        self.transitions += 1
+        self.transition_counts[transition] += 1
+        self.history.append((time.time(), self._describe(previous), self._describe(entry), reason))
+        self.logger.warning(f"代理故障转移: {transition} ({reason}，累计切换 {self.transitions} 次)")
+        if self.state_store:
+            with self._lock:
+                detected = self._detected
+            health = HEALTH_DIRECT if entry == DIRECT else HEALTH_OK if entry == detected else HEALTH_BACKUP
+            self.state_store.update(health=health)
+        for callback in list(self._listeners):
+            try:
+                callback(entry)
+            except Exception as e:
+                self.logger.error(f"故障转移监听器执行失败: {e}")
+
+    def get_stats(self):
+        """
+        获取故障转移统计信息
+
+        Returns:
+            dict: 当前条目、切换次数和最近的切换记录
+        """
+        return {
+            'active': self._describe(self.active),
+            'chain': [self._describe(entry) for entry in self.chain()],
+            'transitions': self.transitions,
+            'transition_counts': dict(self.transition_counts),
+            'history': list(self.history),
+        }
+
+    def _check_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.check_once()
+            except Exception as e:
+                self.logger.error(f"代理健康检查失败: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+
+def create_failover_chain(config_manager, git_proxy_manager, forward_proxy=None, filename='failover.json',
+                          state_store=None):
+    """
+    根据配置创建故障转移链
+
+    配置文件格式::
+
+        {"enabled": true, "backups": ["10.0.0.5:3128", "192.168.1.2:7890"],
+         "interval": 1, "timeout": 0.8, "recover_after": 2}
+
+    Args:
+        config_manager: 配置管理器实例
+        git_proxy_manager: Git代理管理器实例
+        forward_proxy: 本地转发代理实例 (可选)
+        filename: 配置目录下的配置文件名
+        state_store: 状态存储 (可选)，切换后发布代理健康状态
+
+    Returns:
+        FailoverChain: 未启用时返回 None
+    """
+    config = config_manager.load_json(filename, default={}) or {}
+    if not config.get('enabled'):
+        return None
+    backups = []
+    for text in config.get('backups', []):
+        try:
+            backups.append(parse_proxy(text))
+        except ValueError:
+            logging.getLogger('failover').warning(f"忽略无效的备用代理: {text}")
+    return FailoverChain(git_proxy_manager, backups, forward_proxy,
+                         interval=float(config.get('interval', 1)),
+                         timeout=float(config.get('timeout', 0.8)),
+                         recover_after=int(config.get('recover_after', 2)),
+                         state_store=state_store)
@@ -0,0 +1,475 @@
+"""
+本地转发代理模块 - 在固定的 127.0.0.1 端口上转发到可热切换的上游代理
+
+Git 只需指向本地端口一次，IP 变化时只替换上游地址，正在进行的克隆不受影响。
+支持 HTTP CONNECT 隧道和普通 HTTP 请求，普通请求的上游连接会被复用。
+"""
+import time
+import asyncio
+import threading
+import itertools
+import logging
+
+DEFAULT_LISTEN_PORT = 17890
+# 每个上游地址保留的空闲连接数
+POOL_SIZE = 8
+# 空闲连接的最长保留时间 (秒)
+POOL_IDLE_TIMEOUT = 30
+BUFFER_SIZE = 64 * 1024
+
+
+def create_forward_proxy(config_manager, filename='forward_proxy.json', runtime=None):
+    """
+    根据配置创建本地转发代理
+
+    配置文件格式: {"enabled": true, "listen_port": 17890}
+
+    Args:
+        config_manager: 配置管理器实例
+        filename: 配置目录下的配置文件名
+        runtime: 核心运行时 (可选)，提供时代理运行在其事件循环上
+
+    Returns:
+        ForwardProxy: 未启用时返回 None
+    """
+    config = config_manager.load_json(filename, default={}) or {}
+    if not config.get('enabled'):
+        return None
+    return ForwardProxy(listen_port=int(config.get('listen_port', DEFAULT_LISTEN_PORT)), runtime=runtime)
+
+
+class ConnectionStats:
+    def __init__(self, conn_id, client, upstream):
+        """
+        单个连接的统计信息
+
+        Args:
+            conn_id: 连接编号
+            client: 客户端地址
+            upstream: 建立连接时使用的上游地址 (ip, port)
+        """
+        self.conn_id = conn_id
+        self.client = client
+        self.upstream = upstream
+        self.target = ""
+        self.bytes_up = 0
+        self.bytes_down = 0
+        self.started = time.monotonic()
+        self.connect_latency = None
+        self.closed = None
+
+    def as_dict(self):
+        return {
+            'id': self.conn_id,
+            'client': self.client,
+            'upstream': f"{self.upstream[0]}:{self.upstream[1]}" if self.upstream else None,
+            'target': self.target,
+            'bytes_up': self.bytes_up,
+            'bytes_down': self.bytes_down,
+            'connect_latency_ms': round(self.connect_latency * 1000, 2) if self.connect_latency is not None else None,
+            'duration_s': round((self.closed or time.monotonic()) - self.started, 3),
+        }
+
+
+class _UpstreamPool:
+    def __init__(self):
+        self._idle = {}
+
+    def take(self, upstream):
+        """
+        取出一个仍然可用的空闲连接
+        """
+        idle = self._idle.get(upstream, [])
+        now = time.monotonic()
+        while idle:
+            reader, writer, since = idle.pop()
+            if now - since < POOL_IDLE_TIMEOUT and not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    def put(self, upstream, reader, writer):
+        idle = self._idle.setdefault(upstream, [])
+        if len(idle) >= POOL_SIZE or writer.is_closing():
+            writer.close()
+            return
+        idle.append((reader, writer, time.monotonic()))
+
+    def drop(self, keep=None):
+        """
+        关闭除 keep 之外所有上游的空闲连接
+        """
+        for upstream in [u for u in self._idle if u != keep]:
+            for _, writer, _ in self._idle.pop(upstream):
+                writer.close()
+
+
+async def _read_head(reader):
+    """
+    读取 HTTP 报文头，返回 (首行, 头部列表)；连接已关闭时返回 (None, None)
+    """
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        return None, None
+    lines = head.decode('latin-1').split('\r\n')
+    headers = []
+    for line in lines[1:]:
+        if ':' in line:
+            name, _, value = line.partition(':')
+            headers.append((name.strip(), value.strip()))
+    return lines[0], headers
+
+
+def _header(headers, name, default=None):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return default
+
+
+def _status(status_line):
+    parts = status_line.split()
+    return int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+
+
+def _encode_head(first_line, headers):
+    return (first_line + '\r\n' + ''.join(f'{k}: {v}\r\n' for k, v in headers) + '\r\n').encode('latin-1')
+
+
+class ForwardProxy:
+    def __init__(self, listen_host='127.0.0.1', listen_port=DEFAULT_LISTEN_PORT, runtime=None):
+        """
+        初始化本地转发代理
+
+        Args:
+            listen_host: 监听地址
+            listen_port: 监听端口，0 表示随机端口
+            runtime: 核心运行时 (可选)，提供时在其事件循环上运行，不再单独创建线程
+        """
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.runtime = runtime
+        self.logger = logging.getLogger('forward_proxy')
+        self._upstream = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._pool = _UpstreamPool()
+        self._ids = itertools.count(1)
+        self._active = {}
+        self._finished = []
+        self._tasks = set()
+
+    @property
+    def upstream(self):
+        return self._upstream
+
+    def set_upstream(self, ip, port):
+        """
+        热切换上游代理地址
+
+        元组赋值是原子的，新连接立即使用新地址；已建立的隧道继续使用旧地址直至结束。
+
+        Args:
+            ip: 上游IP地址
+            port: 上游端口
+        """
+        upstream = (ip, int(port))
+        if upstream == self._upstream:
+            return
+        previous, self._upstream = self._upstream, upstream
+        self.logger.info(f"本地转发代理上游已切换: {previous} -> {upstream}")
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._pool.drop, upstream)
+
+    def start(self):
+        """
+        启动代理，有核心运行时时运行在其事件循环上，否则在后台线程中运行
+
+        Returns:
+            int: 实际监听的端口，启动失败时返回 None
+        """
+        if self._loop:
+            return self.listen_port
+        if self.runtime:
+            try:
+                self.runtime.submit(self._start_server()).result(5)
+            except Exception as e:
+                self.logger.error(f"本地转发代理启动失败: {e}")
+                return None
+            self._loop = self.runtime.loop
+            return self.listen_port
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name='forward-proxy', daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        if self._loop is None:
+            self._thread = None
+            return None
+        return self.listen_port
+
+    def stop(self, drain_timeout=5.0):
+        """
+        停止接受新连接，等待现有隧道在超时时间内结束后关闭
+
+        Args:
+            drain_timeout: 等待现有连接结束的最长时间 (秒)
+        """
+        if not self._loop:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(drain_timeout), self._loop)
+        try:
+            future.result(drain_timeout + 1)
+        except Exception as e:
+            self.logger.error(f"关闭本地转发代理失败: {e}")
+        if self._thread:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=1)
+            self._thread = None
+        self._loop = None
+
+    def get_stats(self):
+        """
+        获取连接统计
+
+        Returns:
+            dict: 活动连接和最近结束的连接列表
+        """
+        return {
+            'upstream': f"{self._upstream[0]}:{self._upstream[1]}" if self._upstream else None,
+            'active': [s.as_dict() for s in list(self._active.values())],
+            'recent': [s.as_dict() for s in list(self._finished)],
+        }
+
+    async def _start_server(self):
+        self._server = await asyncio.start_server(self._handle_client, self.listen_host, self.listen_port)
+        self.listen_port = self._server.sockets[0].getsockname()[1]
+        self.logger.info(f"本地转发代理已启动: {self.listen_host}:{self.listen_port}")
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._start_server())
+        except OSError as e:
+            self.logger.error(f"本地转发代理启动失败: {e}")
+            self._loop.close()
+            self._loop = None
+            self._ready.set()
+            return
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _shutdown(self, drain_timeout):
+        # 只停止接受新连接；wait_closed 会等待所有连接结束，因此放到排空之后
+        self._server.close()
+        if self._tasks:
+            self.logger.info(f"等待 {len(self._tasks)} 个连接结束")
+            _, pending = await asyncio.wait(list(self._tasks), timeout=drain_timeout)
+            for task in pending:
+                task.cancel()
+        self._pool.drop()
+        await self._server.wait_closed()
+
+    async def _handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        stats = ConnectionStats(next(self._ids), '%s:%s' % writer.get_extra_info('peername')[:2], self._upstream)
+        self._active[stats.conn_id] = stats
+        try:
+            first_line, headers = await _read_head(reader)
+            if first_line is None:
+                return
+            if self._upstream is None:
+                writer.write(b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n')
+                return
+            if first_line.upper().startswith('CONNECT '):
+                await self._tunnel(first_line, headers, reader, writer, stats)
+            else:
+                await self._forward_requests(first_line, headers, reader, writer, stats)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError) as e:
+            self.logger.debug(f"连接 {stats.conn_id} 异常结束: {e}")
+        finally:
+            stats.closed = time.monotonic()
+            del self._active[stats.conn_id]
+            self._finished.append(stats)
+            del self._finished[:-100]
+            self._tasks.discard(task)
+            writer.close()
+
+    async def _open_upstream(self, upstream, stats):
+        start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(*upstream)
+        stats.connect_latency = time.perf_counter() - start
+        return reader, writer
+
+    async def _tunnel(self, first_line, headers, reader, writer, stats):
+        """
+        CONNECT 隧道：把请求原样交给上游代理，之后双向转发字节
+        """
+        upstream = stats.upstream = self._upstream
+        stats.target = first_line.split()[1]
+        up_reader, up_writer = await self._open_upstream(upstream, stats)
+        try:
+            up_writer.write(_encode_head(first_line, headers))
+            await asyncio.gather(
+                self._pipe(reader, up_writer, stats, 'bytes_up'),
+                self._pipe(up_reader, writer, stats, 'bytes_down'))
+        finally:
+            up_writer.close()
+
+    async def _pipe(self, reader, writer, stats, counter):
+        try:
+            while True:
+                data = await reader.read(BUFFER_SIZE)
+                if not data:
+                    break
+                setattr(stats, counter, getattr(stats, counter) + len(data))
+                writer.write(data)
+                await writer.drain()
+        finally:
+            if writer.can_write_eof() and not writer.is_closing():
+                try:
+                    writer.write_eof()
+                except OSError:
+                    pass
+
+    async def _forward_requests(self, first_line, headers, reader, writer, stats):
+        """
+        普通 HTTP 请求：逐个转发请求，上游连接在请求之间复用
+        """
+        while first_line is not None:
+            upstream = stats.upstream = self._upstream
+            stats.target = first_line.split()[1] if len(first_line.split()) > 1 else ''
+            chunked = (_header(headers, 'Transfer-Encoding', '') or '').lower() == 'chunked'
+            body_length = int(_header(headers, 'Content-Length', '0') or 0)
+            body = None
+
+            # 复用的空闲连接可能恰好被上游关闭，此时在新连接上重发一次；分块的请求体边读边转发，无法重发，总是使用新连接
+            for attempt in range(2):
+                connection = self._pool.take(upstream) if attempt == 0 and not chunked else None
+                reused = connection is not None
+                if connection is None:
+                    connection = await self._open_upstream(upstream, stats)
+                up_reader, up_writer = connection
+
+                try:
+                    up_writer.write(_encode_head(first_line, headers))
+                    if chunked:
+                        # git 推送超过 http.postBuffer 时以分块方式发送请求体
+                        await self._relay_chunked(reader, up_writer, stats, 'bytes_up')
+                    elif body_length:
+                        if body is None:
+                            body = await reader.readexactly(body_length)
+                            stats.bytes_up += body_length
+                        up_writer.write(body)
+                    await up_writer.drain()
+                    status_line, response_headers = await self._read_final_head(up_reader, writer)
+                except ConnectionError:
+                    if not reused:
+                        raise
+                    status_line = None
+                if status_line is not None or not reused:
+                    break
+                up_writer.close()
+                self.logger.debug(f"连接 {stats.conn_id} 复用的上游连接已关闭，在新连接上重发请求")
+
+            if status_line is None:
+                up_writer.close()
+                return
+            writer.write(_encode_head(status_line, response_headers))
+            if _status(status_line) == 101:
+                # 协议升级 (如 WebSocket)，之后双向转发字节
+                try:
+                    await asyncio.gather(
+                        self._pipe(reader, up_writer, stats, 'bytes_up'),
+                        self._pipe(up_reader, writer, stats, 'bytes_down'))
+                finally:
+                    up_writer.close()
+                return
+            reusable = await self._relay_body(status_line, response_headers, first_line, up_reader, writer, stats)
+            await writer.drain()
+
+            if reusable and (_header(response_headers, 'Connection', '') or '').lower() != 'close':
+                self._pool.put(upstream, up_reader, up_writer)
+            else:
+                up_writer.close()
+
+            if (_header(headers, 'Connection', '') or _header(headers, 'Proxy-Connection', '') or '').lower() == 'close':
+                return
+            first_line, headers = await _read_head(reader)
+
+    async def _read_final_head(self, up_reader, writer):
+        """
+        读取上游的最终响应头；100 Continue 等中间响应原样转给客户端后继续读取
+
+        Returns:
+            tuple: (状态行, 头部列表)，上游已关闭时返回 (None, None)；101 也作为最终响应返回
+        """
+        while True:
+            status_line, headers = await _read_head(up_reader)
+            if status_line is None:
+                return None, None
+            status = _status(status_line)
+            if 100 <= status < 200 and status != 101:
+                writer.write(_encode_head(status_line, headers))
+                await writer.drain()
+                continue
+            return status_line, headers
+
+    async def _relay_chunked(self, reader, writer, stats, counter):
+        """
+        原样转发一个分块编码的消息体 (包括结尾的 trailer)
+        """
+        while True:
+            size_line = await reader.readuntil(b'\r\n')
+            writer.write(size_line)
+            size = int(size_line.split(b';')[0], 16)
+            if size == 0:
+                # 0 长度块之后可能有 trailer，读到空行为止
+                while True:
+                    line = await reader.readuntil(b'\r\n')
+                    writer.write(line)
+                    if line == b'\r\n':
+                        return
+            writer.write(await reader.readexactly(size + 2))
+            setattr(stats, counter, getattr(stats, counter) + size)
+            await writer.drain()
+
+    async def _relay_body(self, status_line, headers, request_line, up_reader, writer, stats):
+        """
+        转发响应体
+
+        Returns:
+            bool: 上游连接能否继续复用
+        """
+        status = _status(status_line)
+        if request_line.upper().startswith('HEAD ') or status in (204, 304):
+            return True
+        if (_header(headers, 'Transfer-Encoding', '') or '').lower() == 'chunked':
+            await self._relay_chunked(up_reader, writer, stats, 'bytes_down')
+            return True
+        length = _header(headers, 'Content-Length')
+        if length is not None:
+            remaining = int(length)
+            while remaining:
+                data = await up_reader.read(min(remaining, BUFFER_SIZE))
+                if not data:
+                    return False
+                remaining -= len(data)
+                stats.bytes_down += len(data)
+                writer.write(data)
+                await writer.drain()
+            return True
+        # 没有长度信息，读到上游关闭为止
+        while True:
+            data = await up_reader.read(BUFFER_SIZE)
+            if not data:
+                return False
+            stats.bytes_down += len(data)
+            writer.write(data)
+            await writer.drain()
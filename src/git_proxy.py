@@ -1,15 +1,30 @@
 """
 Git代理操作模块 - 更新Git代理设置
 """
-import subprocess
+import threading
 import logging
 
+from src import tracing
+from src.gitconfig import GitConfigFile, global_config_path
+
+# 默认写入代理地址的 Git 配置键
+DEFAULT_PROXY_TARGETS = ['http.proxy', 'https.proxy']
+
 class GitProxyManager:
-    def __init__(self):
+    def __init__(self, config_path=None, rule_engine=None, state_store=None):
         """
         初始化Git代理管理器
+        
+        Args:
+            config_path: gitconfig 文件路径，默认为全局配置文件
+            rule_engine: 代理规则引擎 (可选)，其规则会与代理地址在同一次写入中更新
+            state_store: 状态存储 (可选)，每次写入后发布实际的 http.proxy 和 https.proxy
         """
         self.logger = logging.getLogger('git_proxy_manager')
+        self.config_path = config_path
+        self.rule_engine = rule_engine
+        self.state_store = state_store
+        self._lock = threading.Lock()
         
     def update_proxy(self, ip, port):
         """
@@ -19,68 +34,113 @@ class GitProxyManager:
             ip: IP地址
             port: 端口号
             
+        Returns:
+            bool: 是否成功更新代理
+        """
+        with tracing.span('git.update_proxy', ip=ip or '', port=str(port)):
+            return self._update_proxy(ip, port)
+
+    def _update_proxy(self, ip, port):
+        # 与规则和方案写入走同一个原子写入路径，遵循 config_path，不再启动 git 进程
+        return self.apply_proxy(ip, port)
+
+    def apply_settings(self, changes):
+        """
+        在一次原子写入中批量修改 gitconfig
+
+        Args:
+            changes: {键: 值} 字典，值为 None 表示删除该键
+
+        Returns:
+            bool: 是否成功
+        """
+        with tracing.span('git.apply_settings', keys=len(changes)):
+            return self._apply_settings(changes)
+
+    def _apply_settings(self, changes):
+        try:
+            with self._lock:
+                gitconfig = GitConfigFile(self.config_path or global_config_path())
+                if gitconfig.apply(changes):
+                    gitconfig.save()
+            if self.state_store:
+                self.state_store.update(git_proxy=(gitconfig.get('http.proxy'), gitconfig.get('https.proxy')))
+            return True
+        except Exception as e:
+            self.logger.error(f"写入Git配置失败: {e}")
+            return False
+
+    def apply_proxy(self, ip, port, targets=None, stale_keys=()):
+        """
+        将代理地址原子地写入一组目标键，并删除不再使用的键
+
+        Args:
+            ip: IP地址
+            port: 端口号
+            targets: 要写入的配置键列表，默认为 http.proxy 和 https.proxy
+            stale_keys: 需要删除的配置键 (例如其他方案使用过的目标)
+
         Returns:
             bool: 是否成功更新代理
         """
         if not ip:
             self.logger.error("IP地址为空，无法更新Git代理")
             return False
-            
-        try:
-            # 设置HTTP代理
-            subprocess.run(
-                ['git', 'config', '--global', 'http.proxy', f'http://{ip}:{port}'],
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            
-            # 设置HTTPS代理
-            subprocess.run(
-                ['git', 'config', '--global', 'https.proxy', f'http://{ip}:{port}'],
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            
-            self.logger.info(f"Git代理已更新为: http://{ip}:{port}")
-            return True
-        except subprocess.CalledProcessError as e:
-            self.logger.error(f"更新Git代理失败: {e}")
+
+        targets = targets or DEFAULT_PROXY_TARGETS
+        proxy = f'http://{ip}:{port}'
+        changes = {key: None for key in stale_keys if key not in targets}
+        changes.update({key: proxy for key in targets})
+        rule_changes = self.rule_engine.build_changes(proxy) if self.rule_engine else {}
+        changes.update(rule_changes)
+        if not self.apply_settings(changes):
             return False
-        except Exception as e:
-            self.logger.error(f"发生未知错误: {e}")
+        if self.rule_engine:
+            self.rule_engine.commit(rule_changes)
+        self.logger.info(f"Git代理已更新为: {proxy} (目标: {', '.join(targets)})")
+        return True
+
+    def clear_proxy(self, targets=None):
+        """
+        删除代理设置，使 Git 直连；按地址的代理规则同时改为直连
+
+        Args:
+            targets: 要删除的配置键列表，默认为 http.proxy 和 https.proxy
+
+        Returns:
+            bool: 是否成功
+        """
+        targets = targets or DEFAULT_PROXY_TARGETS
+        changes = {key: None for key in targets}
+        rule_changes = self.rule_engine.build_changes('') if self.rule_engine else {}
+        changes.update(rule_changes)
+        if not self.apply_settings(changes):
             return False
-            
-    def get_current_proxy(self):
+        if self.rule_engine:
+            self.rule_engine.commit(rule_changes)
+        self.logger.info(f"Git代理已删除，改为直连 (目标: {', '.join(targets)})")
+        return True
+
+    def read_proxy(self):
         """
-        获取当前Git代理设置
-        
+        直接读取 gitconfig 中的代理设置 (不启动 git 进程)
+
         Returns:
-            tuple: (http代理, https代理)
+            tuple: (http代理, https代理)，未设置的项为 None
         """
         try:
-            http_proxy = subprocess.run(
-                ['git', 'config', '--global', 'http.proxy'],
-                check=False,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            ).stdout.strip()
-            
-            https_proxy = subprocess.run(
-                ['git', 'config', '--global', 'https.proxy'],
-                check=False,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            ).stdout.strip()
-            
-            return http_proxy, https_proxy
+            gitconfig = GitConfigFile(self.config_path or global_config_path())
+            return gitconfig.get('http.proxy'), gitconfig.get('https.proxy')
         except Exception as e:
-            self.logger.error(f"获取Git代理设置失败: {e}")
-            return None, None 
\ No newline at end of file
+            self.logger.error(f"读取Git配置失败: {e}")
+            return None, None
+
+    def get_current_proxy(self):
+        """
+        获取当前Git代理设置
+
+        Returns:
+            tuple: (http代理, https代理)，未设置的项为空字符串
+        """
+        http_proxy, https_proxy = self.read_proxy()
+        return http_proxy or '', https_proxy or ''
@@ -0,0 +1,324 @@
+"""
+Git配置文件模块 - 直接解析和修改 gitconfig 文件
+
+与逐条调用 `git config` 相比，这里在内存中修改后一次性原子写回，
+多个键的修改要么全部生效，要么全部不生效。
+"""
+import os
+import re
+import tempfile
+import logging
+
+_SECTION_RE = re.compile(r'^\s*\[\s*([A-Za-z0-9.-]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+_ENTRY_RE = re.compile(r'^\s*([A-Za-z][A-Za-z0-9-]*)\s*(=\s*(.*))?$')
+_ESCAPES = {'n': '\n', 't': '\t', 'b': '\b', '"': '"', '\\': '\\'}
+
+
+def global_config_path(home=None):
+    """
+    获取全局 gitconfig 文件路径 (与 `git config --global` 使用的文件一致)
+
+    Args:
+        home: 用户主目录，默认为当前用户
+
+    Returns:
+        str: 配置文件路径
+    """
+    if home is None:
+        override = os.environ.get('GIT_CONFIG_GLOBAL')
+        if override:
+            return override
+        home = os.path.expanduser('~')
+    dotfile = os.path.join(home, '.gitconfig')
+    if os.path.exists(dotfile):
+        return dotfile
+    xdg_home = os.environ.get('XDG_CONFIG_HOME') if home == os.path.expanduser('~') else None
+    xdg_file = os.path.join(xdg_home or os.path.join(home, '.config'), 'git', 'config')
+    if os.path.exists(xdg_file):
+        return xdg_file
+    return dotfile
+
+
+def split_key(key):
+    """
+    将配置键拆分为 (节, 子节, 名称)，节和名称不区分大小写
+
+    Args:
+        key: 形如 "http.proxy" 或 "http.https://example.com/.proxy" 的键
+
+    Returns:
+        tuple: (section, subsection, name)，无子节时 subsection 为 None
+    """
+    section, _, rest = key.partition('.')
+    subsection, _, name = rest.rpartition('.')
+    if not section or not name:
+        raise ValueError(f"无效的配置键: {key}")
+    return section.lower(), (subsection or None), name.lower()
+
+
+def _parse_value(text, continuation=False):
+    """
+    解析配置值 (处理引号、转义和行尾注释)
+
+    Args:
+        text: 等号之后的文本或续行的整行文本
+        continuation: 是否为续行，续行的行首空白需要保留
+
+    Returns:
+        tuple: (值, 是否以续行符结尾)
+    """
+    value = []
+    in_quotes = False
+    pending_space = ''
+    started = continuation
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c == '\\':
+            if i + 1 >= len(text) or text[i + 1] in '\r\n':
+                return ''.join(value) + pending_space, True
+            value.append(pending_space + _ESCAPES.get(text[i + 1], text[i + 1]))
+            pending_space = ''
+            started = True
+            i += 2
+            continue
+        if c == '"':
+            in_quotes = not in_quotes
+        elif c in '\r\n':
+            pass
+        elif not in_quotes and c in '#;':
+            break
+        elif not in_quotes and c in ' \t':
+            if started:
+                pending_space += c
+        else:
+            value.append(pending_space + c)
+            pending_space = ''
+            started = True
+        i += 1
+    return ''.join(value), False
+
+
+def _format_value(value):
+    """
+    将值格式化为 gitconfig 中的写法，必要时加引号
+    """
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\t', '\\t')
+    if not value or value[0] in ' \t' or value[-1] in ' \t' or '#' in value or ';' in value:
+        return f'"{escaped}"'
+    return escaped
+
+
+def _format_header(section, subsection):
+    if subsection is None:
+        return f'[{section}]\n'
+    escaped = subsection.replace('\\', '\\\\').replace('"', '\\"')
+    return f'[{section} "{escaped}"]\n'
+
+
+class GitConfigFile:
+    def __init__(self, path):
+        """
+        初始化 gitconfig 文件对象
+
+        Args:
+            path: 配置文件路径
+        """
+        self.path = path
+        self.lines = []
+        self.logger = logging.getLogger('gitconfig')
+        self.load()
+
+    def load(self):
+        """
+        从磁盘读取配置文件，文件不存在时视为空配置
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.lines = f.readlines()
+        except FileNotFoundError:
+            self.lines = []
+        self._parse()
+
+    def _parse(self):
+        """
+        解析所有行，记录每个节头和配置项所在的行
+        """
+        self._headers = []
+        self._entries = []
+        section, subsection = None, None
+        i = 0
+        while i < len(self.lines):
+            line = self.lines[i]
+            match = _SECTION_RE.match(line)
+            if match:
+                section = match.group(1).lower()
+                subsection = match.group(2)
+                if subsection is not None:
+                    subsection = re.sub(r'\\(.)', r'\1', subsection)
+                elif '.' in section:
+                    # 旧式写法 [section.subsection]
+                    section, _, subsection = section.partition('.')
+                self._headers.append((section, subsection, i))
+                i += 1
+                continue
+            match = _ENTRY_RE.match(line)
+            if section is not None and match and not line.lstrip().startswith(('#', ';')):
+                start = i
+                if match.group(2) is None:
+                    value = 'true'
+                else:
+                    value, continued = _parse_value(match.group(3))
+                    while continued and i + 1 < len(self.lines):
+                        i += 1
+                        more, continued = _parse_value(self.lines[i], continuation=True)
+                        value += more
+                self._entries.append((section, subsection, match.group(1).lower(), value, start, i))
+            i += 1
+
+    def get(self, key, default=None):
+        """
+        获取配置值，多值键返回最后一个值 (与 git 行为一致)
+
+        Args:
+            key: 配置键
+            default: 键不存在时的默认值
+
+        Returns:
+            str: 配置值
+        """
+        target = split_key(key)
+        for section, subsection, name, value, _, _ in reversed(self._entries):
+            if (section, subsection, name) == target:
+                return value
+        return default
+
+    def items(self):
+        """
+        获取所有配置项
+
+        Returns:
+            list: (键, 值) 列表，按文件中出现的顺序
+        """
+        result = []
+        for section, subsection, name, value, _, _ in self._entries:
+            key = f"{section}.{subsection}.{name}" if subsection is not None else f"{section}.{name}"
+            result.append((key, value))
+        return result
+
+    def set(self, key, value):
+        """
+        设置配置值，已有的同名键 (包括多值) 会被替换为一个
+
+        Args:
+            key: 配置键
+            value: 配置值
+        """
+        section, subsection, name = split_key(key)
+        new_line = f'\t{name} = {_format_value(str(value))}\n'
+        matches = [e for e in self._entries if e[:3] == (section, subsection, name)]
+        if matches:
+            last = matches[-1]
+            for entry in reversed(matches[:-1]):
+                del self.lines[entry[4]:entry[5] + 1]
+            removed = sum(e[5] - e[4] + 1 for e in matches[:-1])
+            self.lines[last[4] - removed:last[5] - removed + 1] = [new_line]
+        else:
+            headers = [h for h in self._headers if h[:2] == (section, subsection)]
+            if headers:
+                insert_at = self._section_end(headers[-1][2])
+                self.lines.insert(insert_at, new_line)
+            else:
+                if self.lines and not self.lines[-1].endswith('\n'):
+                    self.lines[-1] += '\n'
+                self.lines.append(_format_header(section, subsection))
+                self.lines.append(new_line)
+        self._parse()
+
+    def unset(self, key):
+        """
+        删除配置键的所有值，节变为空时一并删除节头
+
+        Args:
+            key: 配置键
+
+        Returns:
+            bool: 是否删除了任何内容
+        """
+        target = split_key(key)
+        matches = [e for e in self._entries if e[:3] == target]
+        if not matches:
+            return False
+        for entry in reversed(matches):
+            del self.lines[entry[4]:entry[5] + 1]
+        self._parse()
+        self._drop_empty_section(target[0], target[1])
+        return True
+
+    def apply(self, changes):
+        """
+        批量修改配置
+
+        Args:
+            changes: {键: 值} 字典，值为 None 表示删除该键
+
+        Returns:
+            bool: 内容是否发生变化
+        """
+        changed = False
+        for key, value in changes.items():
+            if value is None:
+                changed = self.unset(key) or changed
+            elif self.get(key) != str(value):
+                self.set(key, value)
+                changed = True
+        return changed
+
+    def save(self):
+        """
+        原子地写回配置文件 (先写临时文件再替换)
+        """
+        path = os.path.realpath(self.path)
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.gitconfig.', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.writelines(self.lines)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(path):
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _section_end(self, header_index):
+        """
+        获取节的插入位置 (下一个节头之前，跳过末尾空行)
+        """
+        end = len(self.lines)
+        for _, _, index in self._headers:
+            if index > header_index:
+                end = index
+                break
+        while end > header_index + 1 and not self.lines[end - 1].strip():
+            end -= 1
+        if end > 0 and not self.lines[end - 1].endswith('\n'):
+            self.lines[end - 1] += '\n'
+        return end
+
+    def _drop_empty_section(self, section, subsection):
+        """
+        删除不再包含任何配置项或注释的节头
+        """
+        for position in range(len(self._headers) - 1, -1, -1):
+            h_section, h_subsection, index = self._headers[position]
+            if (h_section, h_subsection) != (section, subsection):
+                continue
+            end = self._headers[position + 1][2] if position + 1 < len(self._headers) else len(self.lines)
+            if all(not line.strip() for line in self.lines[index + 1:end]):
+                del self.lines[index:end]
+        self._parse()
@@ -0,0 +1,116 @@
+"""
+Git配置写入模块 - 在文件锁内修改一个 gitconfig，服务模式以登记用户的身份在子进程中运行它
+
+子进程从标准输入读取 {"path": 文件路径, "changes": {键: 值或 null}}，
+退出码 1 表示内容已修改，0 表示无变化，2 表示失败 (错误信息写到标准错误)::
+
+    python -m src.gitconfig_writer < request.json
+
+该模块只依赖标准库和 gitconfig 模块，子进程无需加载服务的其他部分。
+"""
+import os
+import sys
+import stat
+import json
+import time
+
+from src.gitconfig import GitConfigFile
+
+LOCK_TIMEOUT = 5.0
+LOCK_RETRY_INTERVAL = 0.05
+
+EXIT_UNCHANGED = 0
+EXIT_CHANGED = 1
+EXIT_FAILED = 2
+
+
+class GitConfigLock:
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        """
+        gitconfig 文件锁，与 git 一样通过独占创建 "<文件>.lock" 实现
+
+        Args:
+            path: 配置文件路径
+            timeout: 等待锁的时间 (秒)
+        """
+        self.lock_path = os.path.realpath(path) + '.lock'
+        self.timeout = timeout
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                os.close(os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600))
+                return self
+            except FileExistsError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"等待文件锁超时: {self.lock_path}")
+                time.sleep(LOCK_RETRY_INTERVAL)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            os.remove(self.lock_path)
+        except OSError:
+            pass
+
+
+def check_target(path):
+    """
+    检查要写入的 gitconfig: 只接受当前有效用户拥有的普通文件 (不跟随符号链接)，或尚不存在的文件
+
+    Args:
+        path: 配置文件路径
+
+    Raises:
+        PermissionError: 是符号链接、不是普通文件或不属于当前用户
+    """
+    try:
+        stat_result = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise PermissionError(f"拒绝写入符号链接或非普通文件: {path}")
+    if hasattr(os, 'geteuid') and stat_result.st_uid != os.geteuid():
+        raise PermissionError(f"拒绝写入不属于该用户的文件 (uid {stat_result.st_uid}): {path}")
+
+
+def write_gitconfig(path, changes):
+    """
+    在文件锁内读取、修改并写回一个 gitconfig
+
+    Args:
+        path: 配置文件路径
+        changes: {键: 值}，值为 None 表示删除该键
+
+    Returns:
+        bool: 内容是否发生变化
+    """
+    check_target(path)
+    with GitConfigLock(path):
+        # 持有锁后再检查一次，避免检查与打开之间文件被替换
+        check_target(path)
+        gitconfig = GitConfigFile(path)
+        changed = gitconfig.apply(changes)
+        if changed:
+            gitconfig.save()
+    return changed
+
+
+def main():
+    """
+    子进程入口: 按标准输入中的请求写入，并以退出码报告结果
+
+    Returns:
+        int: 退出码
+    """
+    try:
+        request = json.load(sys.stdin)
+        changed = write_gitconfig(request['path'], request['changes'])
+    except Exception as e:
+        sys.stderr.write(str(e)[:4096])
+        return EXIT_FAILED
+    return EXIT_CHANGED if changed else EXIT_UNCHANGED
+
+
+if __name__ == '__main__':
+    sys.exit(main())
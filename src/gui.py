@@ -9,8 +9,16 @@ import sys
 import logging
 import threading
 import pystray
+import psutil
 from PIL import Image, ImageTk
 import platform # For OS detection
+import time
+
+from src.adapter_table import AdapterTableModel, AdapterTableWorker
+from src.ui_executor import UITaskExecutor
+from src.tk_watchdog import TkWatchdog
+from src.log_store import LogRecordStore, LogStoreHandler, LogArchive, LogSearch
+from src import tracing
 try:
     import winreg # For reading Windows registry
     WINDOWS_REGISTRY_AVAILABLE = True
@@ -41,6 +49,14 @@ TITLE_FONT_SIZE = 11
 BUTTON_FONT_SIZE = 10
 LOG_FONT_FAMILY = 'Consolas' # Keep for logs
 LOG_FONT_SIZE = 9
+ADAPTER_VIEW_REFRESH_MS = 1000 # 适配器表视图的节流刷新间隔
+PROXY_UPDATE_DEBOUNCE = 0.3 # 短时间内多次IP变化只按最后一次更新代理 (秒)
+LOG_FILTER_DELAY_MS = 150 # 输入搜索关键字后延迟多久执行查询
+LOG_VIEW_LIMIT = 2000 # 筛选结果最多显示的条数
+# 记录存储保留 DEBUG 日志，默认只显示 INFO 及以上 (选择 DEBUG 时显示全部)
+LOG_LEVEL_CHOICES = {'DEBUG': logging.DEBUG, 'INFO': logging.INFO,
+                     'WARNING': logging.WARNING, 'ERROR': logging.ERROR}
+DEFAULT_LOG_LEVEL = 'INFO'
 
 LIGHT_THEME = {
     "root_bg": "#ECECEC",
@@ -83,7 +99,10 @@ DARK_THEME = {
 }
 
 class GitProxyMonitorGUI:
-    def __init__(self, network_monitor, git_proxy_manager, config_manager):
+    def __init__(self, network_monitor, git_proxy_manager, config_manager, profile_manager=None,
+                 system_proxy_manager=None, forward_proxy=None, pac_server=None,
+                 route_selector=None, profiler=None, failover=None, runtime=None, hooks=None,
+                 discovery=None):
         """
         初始化GUI
         
@@ -91,6 +110,16 @@ class GitProxyMonitorGUI:
             network_monitor: 网络监控器实例
             git_proxy_manager: Git代理管理器实例
             config_manager: 配置管理器实例
+            profile_manager: 代理方案管理器实例 (可选)
+            system_proxy_manager: 系统代理管理器实例 (可选)
+            forward_proxy: 本地转发代理实例 (可选)，启用后 IP 变化只切换其上游，不再修改 Git 配置
+            pac_server: PAC 服务实例 (可选)
+            route_selector: 路由选择器实例 (可选)，按测量结果为各主机选择直连或代理
+            profiler: 运行时性能分析器实例 (可选)
+            failover: 代理故障转移链 (可选)，启用后由它决定 Git 实际使用的代理
+            runtime: 核心运行时 (可选)，提供时代理更新经由其写入通道按顺序执行并防抖
+            hooks: 钩子执行器 (可选)，代理更新后提交 IP 变化钩子
+            discovery: 代理发现 (可选)，启用后代理地址使用在本网段中发现的主机，而不是本机IP
         """
         self.root = tk.Tk()
         self.root.overrideredirect(True) # <--- 移除标准窗口边框和标题栏
@@ -111,8 +140,36 @@ class GitProxyMonitorGUI:
         self.network_monitor = network_monitor
         self.git_proxy_manager = git_proxy_manager
         self.config_manager = config_manager
+        self.profile_manager = profile_manager
+        self.system_proxy_manager = system_proxy_manager
+        self.forward_proxy = forward_proxy
+        self.pac_server = pac_server
+        self.route_selector = route_selector
+        self.profiler = profiler
+        self.failover = failover
+        self.runtime = runtime
+        self.hooks = hooks
+        self.discovery = discovery
+        # 当前IP、适配器、端口等状态都从网络监控器的状态存储读取
+        self.state_store = network_monitor.state_store
+        self._state_token = None
         self.is_monitoring = False
         self.logger = logging.getLogger('gui')
+
+        # 适配器表由后台线程填充，视图只按节流定时器拉取差异
+        self.adapter_table = AdapterTableModel()
+        self.adapter_table_worker = AdapterTableWorker(self.adapter_table, network_monitor, runtime=runtime)
+        self._adapter_view_version = 0
+        self._adapter_view_timer = None
+
+        # 阻塞操作 (枚举网卡、git 调用) 统一交给后台线程池，结果通过 after 回到主线程
+        self.ui_executor = UITaskExecutor(self.root)
+        # 测量事件循环延迟 (借用执行器的轮询)，主线程卡住时记录调用栈
+        self.watchdog = TkWatchdog(self.root, executor=self.ui_executor)
+        if self.runtime:
+            self.runtime.set_ui_bridge(self.ui_executor.post)
+        if self.profiler:
+            self.profiler.add_dispatcher('tk', lambda func, name: self.root.after(0, func, name))
         
         self.style = ttk.Style(self.root)
 
@@ -238,21 +295,21 @@ class GitProxyMonitorGUI:
         traffic_light_frame.grid(row=0, column=2, sticky="e", padx=5)
 
         # Order: Minimize (Yellow), Maximize (Green), Close (Red) - from left to right
-        minimize_button = ttk.Button(traffic_light_frame, text=" ", command=self.hide_window, style='Minimize.TButton', width=1)
+        minimize_button = ttk.Button(traffic_light_frame, text=" ", command=self.ui_executor.instrument(self.hide_window), style='Minimize.TButton', width=1)
         minimize_button.pack(side=tk.LEFT, padx=(0,3))
         
-        maximize_button = ttk.Button(traffic_light_frame, text=" ", command=self.toggle_maximize, style='Maximize.TButton', width=1)
+        maximize_button = ttk.Button(traffic_light_frame, text=" ", command=self.ui_executor.instrument(self.toggle_maximize), style='Maximize.TButton', width=1)
         maximize_button.pack(side=tk.LEFT, padx=3)
 
-        close_button = ttk.Button(traffic_light_frame, text=" ", command=self.on_close, style='Close.TButton', width=1)
+        close_button = ttk.Button(traffic_light_frame, text=" ", command=self.ui_executor.instrument(self.on_close), style='Close.TButton', width=1)
         close_button.pack(side=tk.LEFT, padx=3)
         
         title_bar_frame.grid_propagate(False) 
 
         current_row = 1 
         content_container.columnconfigure(1, weight=1)
-        content_container.rowconfigure(current_row + 5, weight=3) # Log area row (original row 6, now row 1+5=6)
-        content_container.rowconfigure(current_row + 6, weight=0) # Button area row
+        content_container.rowconfigure(current_row + 6, weight=3) # Log area row (adapter table inserted above, now row 1+6=7)
+        content_container.rowconfigure(current_row + 7, weight=0) # Button area row
 
         # 状态标签
         self.status_label = ttk.Label(content_container, text="等待检测 IP 地址变化...", anchor="w")
@@ -275,7 +332,24 @@ class GitProxyMonitorGUI:
         self.adapter_var = tk.StringVar()
         self.adapter_combobox = ttk.Combobox(content_container, textvariable=self.adapter_var, state='readonly', width=35)
         self.adapter_combobox.grid(row=current_row, column=1, columnspan=2, padx=5, pady=(5,10), sticky="ew")
-        self.adapter_combobox.bind("<<ComboboxSelected>>", self.on_adapter_selected)
+        self.adapter_combobox.bind("<<ComboboxSelected>>", self.ui_executor.instrument(self.on_adapter_selected))
+        current_row += 1
+
+        # 适配器表 (类型、IP、状态、实时速率)
+        self.adapter_tree = ttk.Treeview(content_container, columns=("type", "ips", "state", "rx", "tx"), height=4)
+        self.adapter_tree.heading("#0", text="适配器")
+        self.adapter_tree.heading("type", text="类型")
+        self.adapter_tree.heading("ips", text="IPv4 地址")
+        self.adapter_tree.heading("state", text="状态")
+        self.adapter_tree.heading("rx", text="接收")
+        self.adapter_tree.heading("tx", text="发送")
+        self.adapter_tree.column("#0", width=200)
+        self.adapter_tree.column("type", width=70, anchor="center")
+        self.adapter_tree.column("ips", width=220)
+        self.adapter_tree.column("state", width=60, anchor="center")
+        self.adapter_tree.column("rx", width=100, anchor="e")
+        self.adapter_tree.column("tx", width=100, anchor="e")
+        self.adapter_tree.grid(row=current_row, column=0, columnspan=3, padx=5, pady=(0, 10), sticky="ew")
         current_row += 1
         
         # 端口设置
@@ -283,13 +357,32 @@ class GitProxyMonitorGUI:
         port_label.grid(row=current_row, column=0, padx=5, pady=(5, 5), sticky="w")
         self.port_entry = ttk.Entry(content_container, width=15)
         self.port_entry.grid(row=current_row, column=1, padx=5, pady=(5,5), sticky="w")
-        self.save_port_btn = ttk.Button(content_container, text="保存端口", command=self.save_port)
+        self.save_port_btn = ttk.Button(content_container, text="保存端口", command=self.ui_executor.instrument(self.save_port))
         self.save_port_btn.grid(row=current_row, column=2, padx=(10, 5), pady=(5,5), sticky="e")
         current_row += 1
         
         # 日志文本框
         log_label = ttk.Label(content_container, text="日志:", anchor="w")
-        log_label.grid(row=current_row, column=0, columnspan=3, padx=5, pady=(10, 0), sticky="w")
+        log_label.grid(row=current_row, column=0, padx=5, pady=(10, 0), sticky="w")
+        # 日志搜索和级别筛选
+        log_filter_frame = ttk.Frame(content_container, style='Content.TFrame')
+        log_filter_frame.grid(row=current_row, column=1, columnspan=2, padx=5, pady=(10, 0), sticky="e")
+        self.log_search_var = tk.StringVar()
+        self.log_search_var.trace_add('write', lambda *args: self._schedule_log_filter())
+        self.log_search_entry = ttk.Entry(log_filter_frame, textvariable=self.log_search_var, width=18)
+        self.log_search_entry.grid(row=0, column=0, padx=(0, 5))
+        self.log_level_var = tk.StringVar(value=DEFAULT_LOG_LEVEL)
+        self.log_level_combobox = ttk.Combobox(log_filter_frame, textvariable=self.log_level_var, width=8,
+                                               values=list(LOG_LEVEL_CHOICES), state="readonly")
+        self.log_level_combobox.grid(row=0, column=1, padx=(0, 5))
+        self.log_level_combobox.bind("<<ComboboxSelected>>", lambda event: self._schedule_log_filter())
+        self.log_history_var = tk.BooleanVar(value=False)
+        self.log_history_check = ttk.Checkbutton(log_filter_frame, text="历史日志", variable=self.log_history_var,
+                                                 command=self._schedule_log_filter)
+        self.log_history_check.grid(row=0, column=2)
+        self._log_filter_after_id = None
+        self._log_filter_generation = 0
+        self._log_filter = ('', LOG_LEVEL_CHOICES[DEFAULT_LOG_LEVEL])
         current_row += 1
         
         self.log_frame = ttk.Frame(content_container, style="Log.TFrame") 
@@ -307,9 +400,9 @@ class GitProxyMonitorGUI:
         button_frame.columnconfigure(0, weight=1)
         button_frame.columnconfigure(1, weight=0) 
         button_frame.columnconfigure(2, weight=1)
-        self.start_stop_btn = ttk.Button(button_frame, text="开始监控", command=self.toggle_monitoring)
+        self.start_stop_btn = ttk.Button(button_frame, text="开始监控", command=self.ui_executor.instrument(self.toggle_monitoring))
         self.start_stop_btn.grid(row=0, column=0, sticky="w")
-        self.theme_switch_btn = ttk.Button(button_frame, text="切换主题", command=self.toggle_theme)
+        self.theme_switch_btn = ttk.Button(button_frame, text="切换主题", command=self.ui_executor.instrument(self.toggle_theme))
         self.theme_switch_btn.grid(row=0, column=1, sticky="ns")
         self.exit_btn = ttk.Button(button_frame, text="退出", command=self.exit_app)
         self.exit_btn.grid(row=0, column=2, sticky="e")
@@ -335,10 +428,75 @@ class GitProxyMonitorGUI:
         handler = TextHandler(self.log_text)
         formatter = logging.Formatter('%(asctime)s - %(message)s', '%H:%M:%S')
         handler.setFormatter(formatter)
+        # 筛选生效时只追加满足条件的新日志
+        handler.addFilter(self._log_record_visible)
+        
+        # 所有日志同时写入带索引的记录存储，供搜索和级别筛选使用
+        self.log_store = LogRecordStore()
+        self.log_search = LogSearch(self.log_store, LogArchive.from_root_logger())
         
         root_logger = logging.getLogger()
+        root_logger.addHandler(LogStoreHandler(self.log_store, logging.DEBUG))
         root_logger.addHandler(handler)
-        root_logger.setLevel(logging.INFO)
+        root_logger.setLevel(logging.DEBUG)
+        
+    def _log_record_visible(self, record):
+        """
+        判断新日志是否满足当前的筛选条件
+
+        Args:
+            record: 日志记录
+
+        Returns:
+            bool: 是否显示
+        """
+        text, min_level = self._log_filter
+        if record.levelno < min_level:
+            return False
+        return not text or text in record.getMessage().lower()
+
+    def _schedule_log_filter(self):
+        """
+        搜索条件变化后延迟执行查询，连续输入时只查询最后一次
+        """
+        if self._log_filter_after_id is not None:
+            self.root.after_cancel(self._log_filter_after_id)
+        self._log_filter_after_id = self.root.after(LOG_FILTER_DELAY_MS, self.apply_log_filter)
+
+    def apply_log_filter(self):
+        """
+        按搜索框和级别筛选重新填充日志文本框
+        """
+        self._log_filter_after_id = None
+        text = self.log_search_var.get().strip().lower()
+        min_level = LOG_LEVEL_CHOICES.get(self.log_level_var.get(), logging.INFO)
+        include_history = self.log_history_var.get()
+        self._log_filter = (text, min_level)
+        # 较早的查询可能晚于较新的查询完成，只显示最新一次的结果
+        self._log_filter_generation += 1
+        generation = self._log_filter_generation
+        # 首次搜索历史日志时需要解析轮转文件，放到后台执行
+        self.ui_executor.submit(self.log_search.search, text, min_level, include_history, LOG_VIEW_LIMIT,
+                                on_done=lambda entries: self._show_log_entries(entries, generation),
+                                name='log_search')
+
+    def _show_log_entries(self, entries, generation):
+        """
+        在主线程上显示日志查询结果
+
+        Args:
+            entries: LogEntry 列表
+            generation: 发起查询时的序号
+        """
+        if generation != self._log_filter_generation:
+            return
+        lines = [f"{time.strftime('%H:%M:%S', time.localtime(entry.created))} - {entry.message}\n"
+                 for entry in entries]
+        self.log_text.config(state=tk.NORMAL)
+        self.log_text.delete('1.0', tk.END)
+        self.log_text.insert(tk.END, ''.join(lines))
+        self.log_text.see(tk.END)
+        self.log_text.config(state=tk.DISABLED)
         
     def create_tray_icon(self):
         """
@@ -349,10 +507,11 @@ class GitProxyMonitorGUI:
             icon_path = os.path.join(base_dir, "res", "icon.ico")
             if os.path.exists(icon_path):
                 image = Image.open(icon_path)
-                menu = (
-                    pystray.MenuItem('显示窗口', self.show_window, default=True),
-                    pystray.MenuItem('退出', self.exit_app)
-                )
+                menu = [pystray.MenuItem('显示窗口', self.show_window, default=True)]
+                if self.profiler:
+                    menu.append(pystray.MenuItem('性能分析', self.toggle_profiling,
+                                                 checked=lambda item: self.profiler.running))
+                menu.append(pystray.MenuItem('退出', self.exit_app))
                 self.tray_icon = pystray.Icon("git_proxy_monitor", image, "Git代理IP监视器", menu)
                 threading.Thread(target=self.tray_icon.run, daemon=True).start()
             else:
@@ -365,15 +524,37 @@ class GitProxyMonitorGUI:
         初始化配置
         """
         # 加载配置端口
-        port = self.config_manager.get_proxy_port()
+        port = self.state_store.state.port
         self.port_entry.insert(0, port)
+
+        # IP 检测结果变化时更新显示 (订阅回调在检测线程中调用，交给主线程处理)
+        self._state_token = self.state_store.subscribe(
+            lambda state, old: self.ui_executor.post(self._show_ip, (state.ip, state.adapter_name, state.adapter_type)),
+            fields=('ip', 'adapter_name', 'adapter_type'))
+
+        # 热启动: 先显示快照中的状态，再在后台读取实际的 Git 代理并检测IP
+        state = self.state_store.state
+        if not state.verified:
+            self._show_ip((state.ip, state.adapter_name, state.adapter_type))
+            if state.selected_adapter:
+                self.adapter_var.set(state.selected_adapter)
+            self.ui_executor.submit(self._verify_warm_state, on_done=lambda result: self._finish_warm_state(state, result),
+                                    name='verify_warm_state')
+
+        self.watchdog.start(self.runtime)
+
+        # 启动适配器表后台刷新，并开始节流刷新视图；有核心运行时时由其调度器触发，与其他定时任务合并唤醒
+        self.adapter_table_worker.start()
+        if self.runtime:
+            self._adapter_view_timer = self.runtime.every(ADAPTER_VIEW_REFRESH_MS / 1000, self.runtime.post_ui,
+                                                          self.refresh_adapter_view, name='adapter_view',
+                                                          initial_delay=ADAPTER_VIEW_REFRESH_MS / 1000)
+        else:
+            self.ui_executor.after(ADAPTER_VIEW_REFRESH_MS, self.refresh_adapter_view)
         
-        # 加载并设置网络适配器
+        # 加载并设置网络适配器 (完成后会获取当前IP)
         self.load_and_set_adapters()
         
-        # 获取当前IP
-        self.update_ip_display()
-        
         # 更新网络监控回调
         self.network_monitor.callback = self.on_ip_changed
         
@@ -384,16 +565,64 @@ class GitProxyMonitorGUI:
             self.network_monitor.config_manager = self.config_manager 
             self.logger.info("为 NetworkMonitor 实例设置了 config_manager")
         
+    def _verify_warm_state(self):
+        """
+        读取实际的 Git 代理并检测一次IP (在后台线程运行)，IP 与快照不同时由监控回调更新代理
+
+        Returns:
+            tuple: (Git 代理, check_once 的结果)
+        """
+        return self.git_proxy_manager.read_proxy(), self.network_monitor.check_once()
+
+    def _finish_warm_state(self, snapshot, result):
+        """
+        根据验证结果确认快照中的状态
+
+        Args:
+            snapshot: 从快照恢复的状态
+            result: _verify_warm_state 的结果
+        """
+        git_proxy, (ip, adapter_name, adapter_type) = result
+        if not ip or ip != snapshot.ip:
+            # IP 已变化，代理由监控回调更新
+            self.state_store.update(verified=True)
+            return
+        self.state_store.update(git_proxy=git_proxy, verified=True)
+        port = self.state_store.state.port or "7890"
+        if git_proxy == snapshot.git_proxy:
+            self.logger.info(f"已验证快照: IP {ip} 和 Git 代理均未变化，跳过写入")
+            self._submit_proxy_update(ip, adapter_name, port, write_git=False)
+        else:
+            self.logger.info(f"已验证快照: IP {ip} 未变化，但 Git 代理已被修改，重新写入")
+            self._submit_proxy_update(ip, adapter_name, port)
+
     def update_ip_display(self):
         """
         更新IP显示
         """
-        selected_adapter = self.config_manager.get_selected_adapter()
-        if not selected_adapter and self.adapter_var.get():
-            selected_adapter = self.adapter_var.get()
+        state = self.state_store.state
+        selected_adapter = state.selected_adapter or self.adapter_var.get()
         
         self.logger.info(f"更新IP显示，使用适配器: {selected_adapter if selected_adapter else '自动'}")
-        ip, adapter_name, adapter_type = self.network_monitor.get_current_ip(selected_adapter_name=selected_adapter)
+        row = self.adapter_table.get_row(selected_adapter) if selected_adapter else None
+        if row is not None and row.selectable:
+            # 直接使用后台线程缓存的结果，无需在界面线程上重新枚举接口
+            self._show_ip((row.ips[0], row.name, row.type))
+        elif state.ip and state.adapter_name == selected_adapter:
+            self._show_ip((state.ip, state.adapter_name, state.adapter_type))
+        else:
+            self.ip_label.config(text="当前 IP: 检测中...")
+            self.ui_executor.submit(self.network_monitor.detect,
+                                    on_done=self._show_ip, busy_widgets=(self.adapter_combobox,))
+
+    def _show_ip(self, result):
+        """
+        在主线程上显示IP检测结果
+
+        Args:
+            result: get_current_ip 返回的 (ip地址, 适配器名称, 适配器类型描述)
+        """
+        ip, adapter_name, adapter_type = result
         if ip:
             self.ip_label.config(text=f"当前 IP: {ip}")
             self.adapter_label.config(text=f"网络适配器: {adapter_name} {adapter_type}")
@@ -407,16 +636,9 @@ class GitProxyMonitorGUI:
             adapter_name: 适配器名称
             adapter_type: 适配器类型
         """
-        # 更新IP显示
-        self.ip_label.config(text=f"当前 IP: {ip}")
-        self.adapter_label.config(text=f"网络适配器: {adapter_name} {adapter_type}")
-        
-        # 更新Git代理
-        port = self.port_entry.get().strip() or "7890"
-        self.git_proxy_manager.update_proxy(ip, port)
-        
-        # 保存最新IP
-        self.config_manager.save_last_ip(ip)
+        # IP显示由状态存储的订阅更新，这里只需更新Git代理并保存最新IP
+        port = self.state_store.state.port or "7890"
+        self._submit_proxy_update(ip, adapter_name, port)
         
     def on_adapter_selected(self, event=None):
         """
@@ -426,18 +648,74 @@ class GitProxyMonitorGUI:
         if selected_adapter:
             self.logger.info(f"用户选择适配器: {selected_adapter}")
             self.config_manager.save_selected_adapter(selected_adapter)
+            self.network_monitor.select_adapter(selected_adapter)
             self.update_ip_display()
             if self.is_monitoring:
-                self.logger.info("监控正在运行，新的适配器选择将在下次手动刷新或重启监控时完全应用于监控循环。")
+                self.logger.info("监控正在运行，新的适配器选择将在下一次检测时生效。")
             
+    def refresh_adapter_view(self):
+        """
+        按节流定时器将适配器表的差异同步到视图
+        """
+        try:
+            version, changed, removed = self.adapter_table.diff_since(self._adapter_view_version)
+            if version != self._adapter_view_version:
+                for name in removed:
+                    if self.adapter_tree.exists(name):
+                        self.adapter_tree.delete(name)
+                for row in changed:
+                    values = (row.type, ", ".join(row.ips), "启用" if row.is_up else "停用",
+                              self._format_rate(row.rx_rate), self._format_rate(row.tx_rate))
+                    if self.adapter_tree.exists(row.name):
+                        self.adapter_tree.item(row.name, values=values)
+                    else:
+                        self.adapter_tree.insert("", tk.END, iid=row.name, text=row.name, values=values)
+
+                selectable = self.adapter_table.selectable_names()
+                if list(self.adapter_combobox['values']) != selectable:
+                    self.adapter_combobox['values'] = selectable
+                self._adapter_view_version = version
+        except tk.TclError as e:
+            self.logger.debug(f"刷新适配器表视图失败: {e}")
+        if not self.runtime:
+            self.ui_executor.after(ADAPTER_VIEW_REFRESH_MS, self.refresh_adapter_view)
+
+    @staticmethod
+    def _format_rate(rate):
+        """
+        格式化传输速率
+
+        Args:
+            rate: 速率 (字节/秒)
+
+        Returns:
+            str: 带单位的速率文本
+        """
+        if rate < 1024:
+            return f"{rate:.0f} B/s"
+        for unit in ("KB/s", "MB/s"):
+            rate /= 1024
+            if rate < 1024:
+                return f"{rate:.1f} {unit}"
+        return f"{rate / 1024:.1f} GB/s"
+
     def load_and_set_adapters(self):
         """
         加载可用网络适配器并设置Combobox
         """
-        available_adapters = self.network_monitor.get_available_adapters()
+        self.ui_executor.submit(self.network_monitor.get_available_adapters,
+                                on_done=self._set_adapters, busy_widgets=(self.adapter_combobox,))
+
+    def _set_adapters(self, available_adapters):
+        """
+        在主线程上设置Combobox并获取当前IP
+
+        Args:
+            available_adapters: 可用适配器名称列表
+        """
         if available_adapters:
             self.adapter_combobox['values'] = available_adapters
-            saved_adapter = self.config_manager.get_selected_adapter()
+            saved_adapter = self.state_store.state.selected_adapter
             if saved_adapter and saved_adapter in available_adapters:
                 self.adapter_var.set(saved_adapter)
                 self.logger.info(f"加载已保存的适配器: {saved_adapter}")
@@ -445,6 +723,7 @@ class GitProxyMonitorGUI:
                 self.adapter_var.set(available_adapters[0])
                 self.logger.info(f"默认选择第一个可用适配器: {available_adapters[0]}")
                 self.config_manager.save_selected_adapter(available_adapters[0])
+                self.network_monitor.select_adapter(available_adapters[0])
             else:
                 self.logger.warning("没有可用的网络适配器!")
                 self.adapter_var.set("")
@@ -452,6 +731,9 @@ class GitProxyMonitorGUI:
             self.logger.warning("未能获取到可用网络适配器列表。")
             self.adapter_combobox['values'] = []
             self.adapter_var.set("")
+
+        # 获取当前IP
+        self.update_ip_display()
         
     def toggle_monitoring(self):
         """
@@ -492,16 +774,170 @@ class GitProxyMonitorGUI:
             return
             
         if self.config_manager.save_proxy_port(port):
-            messagebox.showinfo("成功", f"代理端口已更新为: {port}")
+            self.network_monitor.set_port(port)
+            # 不用模态对话框，避免在主线程上阻塞事件处理
+            self.status_label.config(text=f"代理端口已更新为: {port} ({time.strftime('%H:%M:%S')})")
             
-            # 如果正在监控，使用新端口更新Git代理
+            # 如果正在监控，在后台使用新端口更新Git代理
             if self.is_monitoring:
-                ip, _, _ = self.network_monitor.get_current_ip()
-                if ip:
-                    self.git_proxy_manager.update_proxy(ip, port)
+                self.ui_executor.submit(self._apply_port, port, busy_widgets=(self.save_port_btn,))
         else:
             messagebox.showerror("错误", "保存端口失败！")
             
+    def _apply_port(self, port):
+        """
+        使用状态存储中的当前IP和新端口更新Git代理 (在后台线程运行)
+
+        Args:
+            port: 端口号
+        """
+        state = self.state_store.state
+        if state.ip:
+            self._submit_proxy_update(state.ip, state.adapter_name, port)
+
+    def _submit_proxy_update(self, ip, adapter_name, port, write_git=True):
+        """
+        提交一次代理更新；有核心运行时时经由其写入通道按顺序执行并防抖
+
+        Args:
+            ip: IP地址
+            adapter_name: 适配器名称
+            port: 端口号
+            write_git: 是否写入 Git 配置，热启动确认其未变化时为 False
+        """
+        if self.runtime:
+            self.runtime.debounce('update_proxies', PROXY_UPDATE_DEBOUNCE,
+                                  self._commit_proxy_update, ip, adapter_name, port, write_git)
+        else:
+            self._commit_proxy_update(ip, adapter_name, port, write_git)
+
+    def _commit_proxy_update(self, ip, adapter_name, port, write_git=True):
+        """
+        更新代理并保存最新IP
+        """
+        with tracing.span('proxy_update', write_git=write_git):
+            proxy_host = None
+            if self.discovery:
+                interfaces = self.state_store.state.interfaces
+                prefixes = dict(interfaces.ipv4_prefixes(adapter_name)) if interfaces else {}
+                found = self.discovery.best(ip, adapter_name, port, prefixes.get(ip, 24))
+                if found:
+                    proxy_host, port = found[0], str(found[1])
+            self._update_proxies(ip, adapter_name, port, proxy_host, write_git)
+            self.config_manager.save_last_ip(ip)
+            if self.hooks:
+                # 钩子在自己的线程池中执行，这里只提交
+                self.hooks.notify(ip, adapter_name, port)
+        # 在界面线程上显示结果 (携带当前追踪的上下文)
+        self.ui_executor.post(self._show_proxy_updated, proxy_host or ip, port)
+
+    def _show_proxy_updated(self, host, port):
+        """
+        在主线程上显示最近一次代理更新
+
+        Args:
+            host: 代理主机
+            port: 端口号
+        """
+        with tracing.span('gui.update'):
+            if self.is_monitoring:
+                self.status_label.config(text=f"代理已更新为 {host}:{port} ({time.strftime('%H:%M:%S')})，正在监控...")
+
+    def _update_proxies(self, ip, adapter_name, port, proxy_host=None, write_git=True):
+        """
+        更新Git代理，配置了代理方案时按网络指纹选择方案；启用了系统代理和 PAC 服务时一并同步。
+        启用本地转发代理时 Git 始终指向本地端口，这里只切换转发代理的上游
+
+        Args:
+            ip: IP地址
+            adapter_name: 适配器名称
+            port: 界面中设置的端口号，或在 proxy_host 上发现的端口
+            proxy_host: 代理所在的主机 (可选)，默认为本机IP；指定时端口不再被方案覆盖
+            write_git: 是否写入 Git 配置，为 False 时只同步其他组件
+        """
+        host = proxy_host or ip
+        if self.failover or self.forward_proxy or not write_git:
+            profile = self.profile_manager.match(ip, adapter_name) if self.profile_manager else None
+            port = self._profile_port(profile, port, proxy_host)
+            if self.failover:
+                # 检测到的代理只是故障转移链的第一项，实际写入由健康检查决定
+                self.failover.set_detected(host, port, targets=profile.targets if profile else None)
+            elif self.forward_proxy:
+                self.forward_proxy.set_upstream(host, port)
+        elif self.profile_manager:
+            self.profile_manager.apply(ip, adapter_name, port, self.git_proxy_manager, proxy_host)
+            port = self._profile_port(self.profile_manager.active_profile, port, proxy_host)
+        else:
+            self.git_proxy_manager.update_proxy(host, port)
+
+        if self.system_proxy_manager:
+            self.system_proxy_manager.apply(host, port)
+        if self.pac_server:
+            self.pac_server.update(host, port)
+        if self.route_selector:
+            git_proxy = f'http://127.0.0.1:{self.forward_proxy.listen_port}' if self.forward_proxy else None
+            self.route_selector.set_proxy(host, port, git_proxy=git_proxy)
+            
+    @staticmethod
+    def _profile_port(profile, port, proxy_host):
+        """
+        确定实际使用的端口: 方案指定了端口时使用方案端口，但在其他主机上发现的端口优先
+
+        Args:
+            profile: 匹配的代理方案，可以为 None
+            port: 界面中设置的端口号，或在 proxy_host 上发现的端口
+            proxy_host: 代理所在的主机，可以为 None
+
+        Returns:
+            str: 端口号
+        """
+        if profile and profile.port and not proxy_host:
+            return profile.port
+        return port
+
+    def force_refresh(self):
+        """
+        立即重新检测IP并更新代理
+        """
+        port = self.port_entry.get().strip() or "7890"
+        self.ui_executor.submit(self._refresh_proxies, port, on_done=self._show_ip)
+
+    def _refresh_proxies(self, port):
+        """
+        重新检测IP并更新代理 (在后台线程运行)
+
+        Returns:
+            tuple: get_current_ip 的结果
+        """
+        result = self.network_monitor.detect()
+        ip, adapter_name, _ = result
+        if ip:
+            self._submit_proxy_update(ip, adapter_name, port)
+        return result
+
+    def handle_instance_args(self, args):
+        """
+        处理再次启动时转交过来的参数 (在后台线程中调用)
+
+        Args:
+            args: 参数列表，支持 --show、--refresh 和 --profile [秒数]
+        """
+        if '--show' in args:
+            self.root.after(0, self.show_window)
+        if '--refresh' in args:
+            self.root.after(0, self.force_refresh)
+        if '--profile' in args:
+            index = args.index('--profile') + 1
+            duration = float(args[index]) if index < len(args) and args[index].replace('.', '', 1).isdigit() else None
+            self.toggle_profiling(duration=duration)
+
+    def toggle_profiling(self, icon=None, item=None, duration=None):
+        """
+        开始或提前结束运行时性能分析
+        """
+        if self.profiler:
+            self.profiler.toggle(duration)
+
     def show_window(self, icon=None, item=None):
         """
         显示主窗口
@@ -531,6 +967,18 @@ class GitProxyMonitorGUI:
         """
         # 停止监控
         self.stop_monitoring()
+        if self._state_token is not None:
+            self.state_store.unsubscribe(self._state_token)
+        self.adapter_table_worker.stop()
+        if self._adapter_view_timer:
+            self._adapter_view_timer.cancel()
+        self.watchdog.stop()
+        stats = self.watchdog.get_stats()
+        self.logger.info(f"界面事件循环延迟: p95 {stats['p95_ms']:.1f}ms, p99 {stats['p99_ms']:.1f}ms, "
+                         f"最大 {stats['max_ms']:.0f}ms, 卡顿 {stats['stalls']} 次")
+        poll_stats = self.ui_executor.get_stats()
+        self.logger.info(f"界面轮询: 每分钟 {poll_stats['polls_per_minute']:.0f} 次")
+        self.ui_executor.shutdown()
         
         # 停止系统托盘图标
         if self.tray_icon:
@@ -547,6 +995,11 @@ class GitProxyMonitorGUI:
         """
         # 自动启动监控
         self.start_monitoring()
+        try:
+            elapsed = time.time() - psutil.Process().create_time()
+            self.logger.info(f"从启动到开始监控耗时 {elapsed * 1000:.0f}ms")
+        except psutil.Error:
+            pass
         
         # 开始主循环
         self.root.mainloop() 
@@ -644,6 +1097,16 @@ class GitProxyMonitorGUI:
                        fieldbackground=[('readonly', theme_colors["entry_bg"])],
                        foreground=[('readonly', theme_colors["entry_fg"])])
 
+        self.style.configure('Treeview',
+                             font=(current_font_family, DEFAULT_FONT_SIZE),
+                             background=theme_colors["entry_bg"],
+                             fieldbackground=theme_colors["entry_bg"],
+                             foreground=theme_colors["entry_fg"])
+        self.style.configure('Treeview.Heading',
+                             font=(current_font_family, DEFAULT_FONT_SIZE),
+                             background=theme_colors["button_bg"],
+                             foreground=theme_colors["button_fg"])
+
         self.style.configure("Log.TFrame", 
                              background=theme_colors["root_bg"], 
                              relief="solid", borderwidth=1)
@@ -0,0 +1,375 @@
+"""
+钩子模块 - IP 或端口变化时并行执行用户配置的命令和 Python 入口函数
+
+每个钩子都会收到旧的和新的 IP、适配器以及端口:
+    - 命令钩子: 参数中的 {old_ip}、{new_ip}、{adapter}、{port} 等占位符会被替换 (其他花括号原样保留，
+      例如 awk 的 '{print $1}' 或 JSON 参数)，同时通过 GGPM_OLD_IP、GGPM_NEW_IP、GGPM_ADAPTER、GGPM_PORT 等环境变量传入
+    - 入口函数钩子: "模块:函数" 形式，以同名关键字参数调用 (函数应接受 **kwargs)
+
+钩子并行执行 (有核心运行时时命令作为其事件循环上的异步子进程运行，否则使用有界线程池)，
+同时执行的数量有上限，各自有超时时间，输出记录到日志。
+提交钩子不会等待其执行，较慢的钩子不会延迟 Git 代理的更新。
+"""
+import os
+import re
+import time
+import shlex
+import asyncio
+import threading
+import importlib
+import subprocess
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 10.0
+MAX_OUTPUT_CHARS = 4000
+
+_PLACEHOLDER = re.compile(r'\{(\w+)\}')
+_CREATE_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+
+def expand_args(args, context):
+    """
+    替换命令参数中的占位符，不认识的占位符和其他花括号原样保留
+
+    Args:
+        args: 参数列表
+        context: {占位符名称: 值}
+
+    Returns:
+        list: 替换后的参数列表
+    """
+    return [_PLACEHOLDER.sub(lambda m: context.get(m.group(1), m.group(0)), arg) for arg in args]
+
+# 一次执行的结果: 钩子名称, 是否成功, 是否超时, 退出码 (入口函数钩子为 None), 耗时 (秒)
+HookResult = namedtuple('HookResult', ['name', 'ok', 'timed_out', 'returncode', 'elapsed'])
+
+
+class Hook:
+    def __init__(self, name, command=None, entry_point=None, timeout=DEFAULT_TIMEOUT):
+        """
+        初始化钩子
+
+        Args:
+            name: 钩子名称
+            command: 命令，字符串或参数列表 (与 entry_point 二选一)
+            entry_point: "模块:函数" 形式的 Python 入口函数
+            timeout: 超时时间 (秒)
+        """
+        if bool(command) == bool(entry_point):
+            raise ValueError(f"钩子 {name} 需要且只能配置 command 或 entry_point 之一")
+        self.name = name
+        self.command = shlex.split(command) if isinstance(command, str) else list(command or [])
+        self.entry_point = entry_point
+        self.timeout = timeout
+        self._func = None
+
+    def resolve(self):
+        """
+        导入入口函数 (首次调用时导入)
+
+        Returns:
+            callable: 入口函数
+        """
+        if self._func is None:
+            module_name, _, attr = self.entry_point.partition(':')
+            func = importlib.import_module(module_name)
+            for part in attr.split('.'):
+                func = getattr(func, part)
+            self._func = func
+        return self._func
+
+
+class HookRunner:
+    def __init__(self, hooks, max_workers=DEFAULT_WORKERS, last_ip='', runtime=None):
+        """
+        初始化钩子执行器
+
+        Args:
+            hooks: Hook 列表
+            max_workers: 同时执行的钩子数量上限
+            last_ip: 启动前最后使用的IP，作为第一次通知的旧IP
+            runtime: 核心运行时 (可选)，提供时钩子在其事件循环上执行，不再创建线程池
+        """
+        self.hooks = list(hooks)
+        self.max_workers = max_workers
+        self.runtime = runtime
+        self.logger = logging.getLogger('hooks')
+        self._pool = None if runtime else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hook')
+        # 在事件循环上首次使用时创建
+        self._slots = None
+        self._lock = threading.Lock()
+        self._last = (last_ip, '', None)
+        self._stats = {hook.name: {'runs': 0, 'successes': 0, 'failures': 0, 'timeouts': 0,
+                                   'total_time': 0.0, 'max_time': 0.0, 'last_error': ''}
+                       for hook in self.hooks}
+
+    def notify(self, ip, adapter_name, port):
+        """
+        通知当前的 IP、适配器和端口；与上次通知的不同时提交所有钩子，不等待其执行
+
+        Args:
+            ip: IP地址
+            adapter_name: 适配器名称
+            port: 端口号
+
+        Returns:
+            list: 各钩子的 Future，没有变化时为空列表
+        """
+        with self._lock:
+            old_ip, old_adapter, old_port = self._last
+            if (ip, adapter_name, port) == self._last:
+                return []
+            self._last = (ip, adapter_name, port)
+        context = {
+            'old_ip': old_ip or '',
+            'new_ip': ip or '',
+            'old_adapter': old_adapter or '',
+            'adapter': adapter_name or '',
+            'old_port': '' if old_port is None else str(old_port),
+            'port': '' if port is None else str(port),
+        }
+        self.logger.info(f"IP 变化 {context['old_ip'] or '无'} -> {context['new_ip']}，执行 {len(self.hooks)} 个钩子")
+        futures = []
+        for hook in self.hooks:
+            try:
+                if self.runtime:
+                    futures.append(self.runtime.submit(self._run_async(hook, context)))
+                else:
+                    futures.append(self._pool.submit(self._run, hook, context))
+            except RuntimeError:
+                # 执行器已关闭 (程序正在退出)
+                break
+        return futures
+
+    def stop(self):
+        """
+        停止执行器，丢弃尚未开始的钩子，并记录统计信息
+        """
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        for name, stats in self.get_stats().items():
+            if stats['runs']:
+                self.logger.info(f"钩子 {name}: 执行 {stats['runs']} 次，成功 {stats['successes']} 次，"
+                                 f"超时 {stats['timeouts']} 次，平均耗时 {stats['avg_ms']:.0f}ms，"
+                                 f"最长 {stats['max_ms']:.0f}ms")
+
+    def get_stats(self):
+        """
+        获取各钩子的统计信息
+
+        Returns:
+            dict: {钩子名称: 执行、成功、失败、超时次数，平均和最长耗时 (毫秒)，最近的错误}
+        """
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                runs = stats['runs']
+                result[name] = {
+                    'runs': runs,
+                    'successes': stats['successes'],
+                    'failures': stats['failures'],
+                    'timeouts': stats['timeouts'],
+                    'avg_ms': stats['total_time'] / runs * 1000 if runs else 0.0,
+                    'max_ms': stats['max_time'] * 1000,
+                    'last_error': stats['last_error'],
+                }
+            return result
+
+    def _run(self, hook, context):
+        start = time.perf_counter()
+        try:
+            if hook.command:
+                outcome = self._command_outcome(*self._run_command(hook, context))
+            else:
+                outcome = self._run_entry_point(hook, context)
+        except Exception as e:
+            outcome = (False, False, None, str(e))
+        return self._finish(hook, start, outcome)
+
+    async def _run_async(self, hook, context):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        async with self._slots:
+            start = time.perf_counter()
+            try:
+                if hook.command:
+                    outcome = self._command_outcome(*await self._run_command_async(hook, context))
+                else:
+                    outcome = await self._run_entry_point_async(hook, context)
+            except Exception as e:
+                outcome = (False, False, None, str(e))
+            return self._finish(hook, start, outcome)
+
+    def _command_outcome(self, returncode, timed_out):
+        ok = returncode == 0 and not timed_out
+        error = '' if ok else "超时" if timed_out else f"退出码 {returncode}"
+        return ok, timed_out, returncode, error
+
+    def _finish(self, hook, start, outcome):
+        """
+        记录一次执行的结果
+
+        Args:
+            hook: 钩子
+            start: 开始时间 (perf_counter)
+            outcome: (是否成功, 是否超时, 退出码, 错误信息)
+
+        Returns:
+            HookResult: 执行结果
+        """
+        ok, timed_out, returncode, error = outcome
+        elapsed = time.perf_counter() - start
+        result = HookResult(hook.name, ok, timed_out, returncode, elapsed)
+        self._record(result, error)
+        if ok:
+            self.logger.info(f"钩子 {hook.name} 执行成功，耗时 {elapsed * 1000:.0f}ms")
+        else:
+            self.logger.warning(f"钩子 {hook.name} 执行失败 ({error})，耗时 {elapsed * 1000:.0f}ms")
+        return result
+
+    def _command_env(self, context):
+        env = dict(os.environ)
+        env.update({f'GGPM_{key.upper()}': value for key, value in context.items()})
+        return env
+
+    def _run_command(self, hook, context):
+        args = expand_args(hook.command, context)
+        try:
+            completed = subprocess.run(args, capture_output=True, text=True, errors='replace',
+                                       env=self._command_env(context), timeout=hook.timeout,
+                                       stdin=subprocess.DEVNULL, creationflags=_CREATE_NO_WINDOW)
+        except subprocess.TimeoutExpired as e:
+            # subprocess.run 超时后会结束子进程，这里只记录已有的输出
+            self._log_output(hook.name, e.stdout, e.stderr)
+            return None, True
+        self._log_output(hook.name, completed.stdout, completed.stderr)
+        return completed.returncode, False
+
+    async def _run_command_async(self, hook, context):
+        args = expand_args(hook.command, context)
+        process = await asyncio.create_subprocess_exec(*args, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                                       stdin=subprocess.DEVNULL, env=self._command_env(context),
+                                                       creationflags=_CREATE_NO_WINDOW)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), hook.timeout)
+        except asyncio.TimeoutError:
+            # 与 subprocess.run 相同: 超时后结束子进程，只记录已有的输出
+            process.kill()
+            stdout, stderr = await process.communicate()
+            self._log_output(hook.name, stdout, stderr)
+            return None, True
+        self._log_output(hook.name, stdout, stderr)
+        return process.returncode, False
+
+    def _run_entry_point(self, hook, context):
+        func = hook.resolve()
+        outcome = {}
+
+        def target():
+            try:
+                func(**context)
+                outcome['ok'] = True
+            except Exception as e:
+                outcome['error'] = str(e)
+
+        # 入口函数无法被强制结束，放在单独的线程中执行，超时后释放线程池的名额
+        thread = threading.Thread(target=target, name=f'hook-{hook.name}', daemon=True)
+        thread.start()
+        thread.join(hook.timeout)
+        if thread.is_alive():
+            return False, True, None, "超时"
+        return outcome.get('ok', False), False, None, outcome.get('error', '')
+
+    async def _run_entry_point_async(self, hook, context):
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def finish(result):
+            if not done.done():
+                done.set_result(result)
+
+        def target():
+            try:
+                hook.resolve()(**context)
+                result = (True, '')
+            except Exception as e:
+                result = (False, str(e))
+            try:
+                loop.call_soon_threadsafe(finish, result)
+            except RuntimeError:
+                # 事件循环已关闭 (程序正在退出)
+                pass
+
+        # 入口函数无法被强制结束，放在单独的线程中执行，超时后不再等待
+        threading.Thread(target=target, name=f'hook-{hook.name}', daemon=True).start()
+        try:
+            ok, error = await asyncio.wait_for(asyncio.shield(done), hook.timeout)
+        except asyncio.TimeoutError:
+            return False, True, None, "超时"
+        return ok, False, None, error
+
+    def _log_output(self, name, stdout, stderr):
+        for stream, level in ((stdout, logging.INFO), (stderr, logging.WARNING)):
+            if isinstance(stream, bytes):
+                stream = stream.decode('utf-8', 'replace')
+            stream = (stream or '').strip()
+            if not stream:
+                continue
+            if len(stream) > MAX_OUTPUT_CHARS:
+                stream = stream[:MAX_OUTPUT_CHARS] + ' ...'
+            for line in stream.splitlines():
+                self.logger.log(level, f"[{name}] {line}")
+
+    def _record(self, result, error):
+        with self._lock:
+            stats = self._stats[result.name]
+            stats['runs'] += 1
+            stats['successes' if result.ok else 'failures'] += 1
+            stats['timeouts'] += result.timed_out
+            stats['total_time'] += result.elapsed
+            stats['max_time'] = max(stats['max_time'], result.elapsed)
+            if error:
+                stats['last_error'] = error
+
+
+def create_hook_runner(config_manager, filename='hooks.json', runtime=None):
+    """
+    根据配置创建钩子执行器
+
+    配置文件格式::
+
+        {"enabled": true, "max_workers": 4, "timeout": 10,
+         "hooks": [
+             {"name": "ssh", "command": ["python", "update_ssh.py", "{new_ip}", "{port}"], "timeout": 5},
+             {"name": "sync", "command": "systemctl --user restart sync-agent"},
+             {"name": "ping", "entry_point": "my_hooks:ping_endpoint", "timeout": 3}
+         ]}
+
+    Args:
+        config_manager: 配置管理器实例
+        filename: 配置目录下的配置文件名
+        runtime: 核心运行时 (可选)
+
+    Returns:
+        HookRunner: 未启用或没有有效的钩子时返回 None
+    """
+    config = config_manager.load_json(filename, default={}) or {}
+    if not config.get('enabled'):
+        return None
+    logger = logging.getLogger('hooks')
+    default_timeout = float(config.get('timeout', DEFAULT_TIMEOUT))
+    hooks = []
+    for index, item in enumerate(config.get('hooks', [])):
+        name = item.get('name') or f'hook{index + 1}'
+        try:
+            hooks.append(Hook(name, item.get('command'), item.get('entry_point'),
+                              float(item.get('timeout', default_timeout))))
+        except ValueError as e:
+            logger.warning(f"忽略无效的钩子: {e}")
+    if not hooks:
+        return None
+    return HookRunner(hooks, max_workers=int(config.get('max_workers', DEFAULT_WORKERS)),
+                      last_ip=config_manager.get_last_ip(), runtime=runtime)
@@ -0,0 +1,436 @@
+"""
+接口轨迹模块 - 录制真实机器上的接口快照和路由查找结果，并加速回放给网络监控器
+
+只在特定网络上出现的选择逻辑问题，可以先在现场录制一段轨迹，再在任何机器 (包括
+Linux CI) 上确定性地重现:
+    - 录制: 定期采集接口表、每个接口的分类结果、默认路由查找结果，以及当时的
+      get_current_ip 选择；只有与上一帧不同的帧才写入，整个文件以 gzip 压缩
+    - 回放: 回放后端、分类器和路由查找都从轨迹中读取，由虚拟时钟按录制间隔驱动
+      NetworkMonitor.check_once；速度只影响节奏 (1 倍到 1000 倍，或不限速)，结果完全确定
+    - 校验: IP 变化时经 GitProxyManager 写入临时的 gitconfig，写入的代理地址和端口与录制时的
+      选择推导出的序列比较，也可以指定期望的 IP 序列
+
+用法::
+
+    python -m src.iftrace record 轨迹.json.gz [--duration 秒] [--interval 秒] [--backend psutil]
+    python -m src.iftrace replay 轨迹.json.gz [--speed 倍数|max] [--adapter 名称] [--expect ip1,ip2] [--port 7890]
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import bisect
+import shutil
+import socket
+import struct
+import logging
+import platform
+import tempfile
+from collections import namedtuple
+
+from src.interfaces import InterfaceTable, get_interface_backend
+from src.adapter_classifier import AdapterClassifier
+from src.git_proxy import GitProxyManager
+from src.network import NetworkMonitor, lookup_default_route_ip
+from src.state_store import StateStore
+
+TRACE_FORMAT = 'ggpm-iftrace'
+TRACE_VERSION = 1
+DEFAULT_RECORD_INTERVAL = 1.0
+MAX_SPEED = 1000.0
+DEFAULT_PORT = '7890'
+
+# 一帧: 相对录制开始的时间 (秒), 接口列表, 地址列表, {接口: 分类}, 默认路由本机IP, 录制时选择的 (IP, 适配器)
+TraceFrame = namedtuple('TraceFrame', ['t', 'links', 'addresses', 'types', 'route', 'selected'])
+
+# 回放中的一次 Git 更新: 虚拟时间, IP, 适配器名称, 是否写入成功, 写入后 gitconfig 中的 http.proxy 和 https.proxy
+GitUpdate = namedtuple('GitUpdate', ['t', 'ip', 'adapter', 'written', 'http_proxy', 'https_proxy'])
+
+
+def _ip_to_int(address):
+    return struct.unpack('!I', socket.inet_aton(address))[0]
+
+
+def _int_to_ip(value):
+    return socket.inet_ntoa(struct.pack('!I', value))
+
+
+def _encode_frame(t, interfaces, types, route, selected):
+    links, addresses = interfaces.rows()
+    return {
+        't': round(t, 3),
+        'links': [[index, name, int(up)] for index, name, up in links],
+        'addrs': [[index, _int_to_ip(value), prefix] for index, value, prefix in addresses],
+        'types': types,
+        'route': route,
+        'selected': list(selected),
+    }
+
+
+def _decode_frame(data):
+    return TraceFrame(
+        float(data['t']),
+        [(index, name, bool(up)) for index, name, up in data['links']],
+        [(index, _ip_to_int(address), prefix) for index, address, prefix in data['addrs']],
+        data.get('types', {}),
+        data.get('route'),
+        tuple(data.get('selected') or (None, None)),
+    )
+
+
+def load_trace(path):
+    """
+    读取轨迹文件
+
+    Args:
+        path: 轨迹文件路径，以 .gz 结尾时按 gzip 读取，否则按 JSON Lines 文本读取
+
+    Returns:
+        tuple: (头部字典, TraceFrame 列表, 录制时长)
+
+    Raises:
+        ValueError: 文件格式不正确
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get('format') != TRACE_FORMAT:
+        raise ValueError(f"不是接口轨迹文件: {path}")
+    header = lines[0]
+    if header.get('version') != TRACE_VERSION:
+        raise ValueError(f"不支持的轨迹版本: {header.get('version')}")
+    frames = [_decode_frame(line) for line in lines[1:] if 'links' in line]
+    ends = [line['t'] for line in lines[1:] if line.get('end')]
+    duration = ends[-1] if ends else (frames[-1].t if frames else 0.0)
+    return header, frames, duration
+
+
+class TraceRecorder:
+    def __init__(self, path, interval=DEFAULT_RECORD_INTERVAL, backend=None, selected_adapter=None):
+        """
+        初始化轨迹录制器
+
+        Args:
+            path: 输出文件路径 (gzip 压缩的 JSON Lines)
+            interval: 采样间隔 (秒)
+            backend: 接口枚举后端名称 (可选)，如 psutil，默认自动选择
+            selected_adapter: 录制时按哪个适配器做选择 (可选)，默认自动选择
+        """
+        self.path = path
+        self.interval = interval
+        self.backend = get_interface_backend(backend)
+        self.classifier = AdapterClassifier()
+        self.selected_adapter = selected_adapter or None
+        self.logger = logging.getLogger('iftrace')
+        self._route = None
+        # 录制时的选择使用与回放相同的输入 (同一次采集的接口表和路由查找结果)
+        self._monitor = NetworkMonitor(interface_backend=self.backend, classifier=self.classifier,
+                                       route_lookup=lambda: self._lookup_recorded_route(),
+                                       state_store=StateStore())
+
+    def _lookup_recorded_route(self):
+        if self._route is None:
+            raise OSError("没有默认路由")
+        return self._route
+
+    def sample(self):
+        """
+        采集一帧
+
+        Returns:
+            tuple: (接口表, {接口: 分类}, 默认路由本机IP, (选择的IP, 适配器))
+        """
+        interfaces = self.backend.snapshot()
+        self.classifier.sync(interfaces)
+        types = {name: self.classifier.classify(name, interfaces.index(name)) for name in interfaces}
+        try:
+            self._route = lookup_default_route_ip()
+        except OSError:
+            self._route = None
+        ip, adapter_name, _ = self._monitor.get_current_ip(self.selected_adapter, interfaces=interfaces)
+        return interfaces, types, self._route, (ip, adapter_name if ip else None)
+
+    def record(self, duration, stop_event=None):
+        """
+        录制一段轨迹
+
+        Args:
+            duration: 录制时长 (秒)
+            stop_event: threading.Event (可选)，设置后提前结束
+
+        Returns:
+            tuple: (采样次数, 写入的帧数)
+        """
+        header = {'format': TRACE_FORMAT, 'version': TRACE_VERSION, 'interval': self.interval,
+                  'started': time.time(), 'host': platform.node(), 'platform': platform.platform(),
+                  'backend': getattr(self.backend, 'name', ''), 'selected_adapter': self.selected_adapter or ''}
+        samples = written = 0
+        previous = None
+        start = time.monotonic()
+        with gzip.open(self.path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps(header, ensure_ascii=False) + '\n')
+            while True:
+                t = time.monotonic() - start
+                if t > duration:
+                    break
+                frame = _encode_frame(t, *self.sample())
+                samples += 1
+                content = {key: value for key, value in frame.items() if key != 't'}
+                if content != previous:
+                    f.write(json.dumps(frame, ensure_ascii=False) + '\n')
+                    written += 1
+                    previous = content
+                next_sample = start + samples * self.interval
+                delay = next_sample - time.monotonic()
+                if delay > 0 and (stop_event.wait(delay) if stop_event else time.sleep(delay)):
+                    break
+            f.write(json.dumps({'t': round(time.monotonic() - start, 3), 'end': True}) + '\n')
+        self.logger.info(f"已录制 {samples} 次采样，写入 {written} 帧: {self.path}")
+        return samples, written
+
+
+class TraceReplay:
+    def __init__(self, path):
+        """
+        从轨迹文件回放接口状态
+
+        回放对象按虚拟时钟 (now) 给出当时的接口表、分类和路由查找结果，
+        可以分别作为 NetworkMonitor 的 interface_backend、classifier 和 route_lookup。
+
+        Args:
+            path: 轨迹文件路径
+        """
+        self.header, self.frames, self.duration = load_trace(path)
+        if not self.frames:
+            raise ValueError(f"轨迹中没有帧: {path}")
+        self.interval = float(self.header.get('interval', DEFAULT_RECORD_INTERVAL))
+        self.now = 0.0
+        self._times = [frame.t for frame in self.frames]
+        self._tables = {}
+
+    # 回放后端的名称，与 interfaces.BACKENDS 中的后端一致
+    name = 'replay'
+
+    def frame(self):
+        """
+        当前虚拟时间对应的帧
+
+        Returns:
+            TraceFrame: 帧
+        """
+        position = max(bisect.bisect_right(self._times, self.now) - 1, 0)
+        return self.frames[position]
+
+    def snapshot(self):
+        """
+        接口枚举后端接口: 返回当前帧的接口表
+
+        Returns:
+            InterfaceTable: 接口表
+        """
+        frame = self.frame()
+        table = self._tables.get(frame.t)
+        if table is None:
+            table = self._tables[frame.t] = InterfaceTable(frame.links, frame.addresses)
+        return table
+
+    def classify(self, iface, ifindex=None):
+        """
+        分类器接口: 返回录制时的分类
+        """
+        return self.frame().types.get(iface, "未知类型")
+
+    def sync(self, interfaces):
+        pass
+
+    def invalidate(self):
+        pass
+
+    def route_lookup(self):
+        """
+        路由查找接口: 返回录制时的默认路由本机IP
+
+        Raises:
+            OSError: 录制时没有默认路由
+        """
+        route = self.frame().route
+        if route is None:
+            raise OSError("没有默认路由 (录制时)")
+        return route
+
+    def poll_times(self, interval=None):
+        """
+        回放时检测的虚拟时间点
+
+        Args:
+            interval: 检测间隔 (秒)，默认为录制间隔
+
+        Returns:
+            list: 时间点列表
+        """
+        interval = interval or self.interval
+        count = int(self.duration / interval) + 1
+        return [i * interval for i in range(count)]
+
+    def expected_updates(self, interval=None):
+        """
+        按录制时的选择推导出的 Git 更新 IP 序列 (与 check_once 的触发规则相同: IP 非空且与上次不同)
+
+        Args:
+            interval: 检测间隔 (秒)，默认为录制间隔
+
+        Returns:
+            list: IP 列表
+        """
+        expected = []
+        last_ip = ''
+        saved_now = self.now
+        for t in self.poll_times(interval):
+            self.now = t
+            ip = self.frame().selected[0]
+            if ip and ip != last_ip:
+                expected.append(ip)
+                last_ip = ip
+        self.now = saved_now
+        return expected
+
+    def run(self, speed=1.0, interval=None, selected_adapter=None, port=DEFAULT_PORT, gitconfig_path=None):
+        """
+        用轨迹驱动一个网络监控器，IP 变化时经 GitProxyManager 写入 gitconfig，并记录写入结果
+
+        Args:
+            speed: 回放速度倍数 (不超过 MAX_SPEED)，为 None 时不限速
+            interval: 检测间隔 (秒)，默认为录制间隔
+            selected_adapter: 指定的适配器 (可选)，默认使用录制时的设置
+            port: 写入的代理端口
+            gitconfig_path: 写入的 gitconfig 路径 (可选)，默认写入临时目录并在结束后删除
+
+        Returns:
+            tuple: (GitUpdate 列表, 检测次数, 实际耗时秒数)
+        """
+        if speed is not None and not 0 < speed <= MAX_SPEED:
+            raise ValueError(f"回放速度须在 (0, {MAX_SPEED:g}] 之间")
+        workdir = None
+        if gitconfig_path is None:
+            workdir = tempfile.mkdtemp(prefix='ggpm-iftrace-')
+            gitconfig_path = os.path.join(workdir, 'gitconfig')
+        git_proxy_manager = GitProxyManager(config_path=gitconfig_path)
+        updates = []
+
+        def on_ip_change(ip, adapter_name, adapter_type):
+            written = git_proxy_manager.update_proxy(ip, port)
+            http_proxy, https_proxy = git_proxy_manager.read_proxy()
+            updates.append(GitUpdate(self.now, ip, adapter_name, written, http_proxy, https_proxy))
+
+        monitor = NetworkMonitor(callback=on_ip_change, interface_backend=self, classifier=self,
+                                 route_lookup=self.route_lookup, state_store=StateStore())
+        monitor.select_adapter(selected_adapter if selected_adapter is not None
+                               else self.header.get('selected_adapter', ''))
+        polls = self.poll_times(interval)
+        start = time.monotonic()
+        try:
+            for t in polls:
+                if speed is not None:
+                    delay = start + t / speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.now = t
+                monitor.check_once()
+        finally:
+            if workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+        return updates, len(polls), time.monotonic() - start
+
+
+def check_updates(updates, expected, port=DEFAULT_PORT):
+    """
+    校验回放中的 Git 更新: IP 序列与期望一致，且每次都把 http://IP:端口 写入了 http.proxy 和 https.proxy
+
+    Args:
+        updates: TraceReplay.run 返回的 GitUpdate 列表
+        expected: 期望的 IP 序列
+        port: 期望的端口
+
+    Returns:
+        list: 不一致之处的说明，为空表示全部一致
+    """
+    problems = []
+    actual = [update.ip for update in updates]
+    if actual != list(expected):
+        problems.append(f"更新的 IP 序列不一致: 期望 {list(expected)}，实际 {actual}")
+    for update in updates:
+        proxy = f'http://{update.ip}:{port}'
+        if not update.written or update.http_proxy != proxy or update.https_proxy != proxy:
+            problems.append(f"{update.t:.2f}s 写入的代理不正确: 期望 {proxy}，"
+                            f"http.proxy={update.http_proxy} https.proxy={update.https_proxy}")
+    return problems
+
+
+def main(argv=None):
+    """
+    命令行入口: record 录制轨迹，replay 回放并校验 Git 更新序列
+
+    Args:
+        argv: 参数列表
+
+    Returns:
+        int: 退出码，回放结果与期望不一致时为 1
+    """
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m src.iftrace', description='录制和回放网络接口轨迹')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help='录制轨迹')
+    record.add_argument('path')
+    record.add_argument('--duration', type=float, default=60.0, help='录制时长 (秒)')
+    record.add_argument('--interval', type=float, default=DEFAULT_RECORD_INTERVAL, help='采样间隔 (秒)')
+    record.add_argument('--backend', default=None, help='接口枚举后端 (netlink / getifaddrs / psutil)')
+    record.add_argument('--adapter', default=None, help='按指定的适配器做选择')
+    replay = commands.add_parser('replay', help='回放轨迹并校验 Git 更新序列')
+    replay.add_argument('path')
+    replay.add_argument('--speed', default='max', help=f'回放速度倍数 (不超过 {MAX_SPEED:g})，max 表示不限速')
+    replay.add_argument('--interval', type=float, default=None, help='检测间隔 (秒)，默认为录制间隔')
+    replay.add_argument('--adapter', default=None, help='指定的适配器，默认使用录制时的设置')
+    replay.add_argument('--expect', default=None, help='期望的 Git 更新 IP 序列 (逗号分隔)，默认按录制时的选择推导')
+    replay.add_argument('--port', default=DEFAULT_PORT, help='写入的代理端口')
+    replay.add_argument('--gitconfig', default=None, help='写入的 gitconfig 路径，默认使用临时文件')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    # 回放时每次检测的警告 (如录制时没有默认路由) 会按检测次数重复，只输出错误
+    logging.basicConfig(level=logging.WARNING if args.command == 'record' else logging.ERROR,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == 'record':
+        samples, written = TraceRecorder(args.path, args.interval, args.backend, args.adapter).record(args.duration)
+        print(f"已录制 {samples} 次采样，写入 {written} 帧，文件大小 {os.path.getsize(args.path)} 字节")
+        return 0
+
+    trace = TraceReplay(args.path)
+    try:
+        speed = None if args.speed == 'max' else float(args.speed)
+        updates, polls, elapsed = trace.run(speed, args.interval, args.adapter, args.port, args.gitconfig)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.expect:
+        expected = args.expect.split(',')
+    elif args.adapter is None or args.adapter == trace.header.get('selected_adapter', ''):
+        expected = trace.expected_updates(args.interval)
+    else:
+        # 录制时的选择基于另一个适配器，无法推导期望序列
+        expected = None
+    print(f"回放 {trace.duration:.1f}s 的轨迹: 检测 {polls} 次，耗时 {elapsed * 1000:.0f}ms "
+          f"(平均 {elapsed / max(polls, 1) * 1e6:.0f}us/次)")
+    for update in updates:
+        print(f"  {update.t:9.2f}s  {update.ip} ({update.adapter}) -> http.proxy={update.http_proxy} "
+              f"https.proxy={update.https_proxy}")
+    if expected is None:
+        print("指定的适配器与录制时不同，未校验 (可用 --expect 指定期望的序列)")
+        return 0
+    problems = check_updates(updates, expected, args.port)
+    if problems:
+        print("Git 更新与期望不一致:\n  " + "\n  ".join(problems))
+        return 1
+    print(f"Git 更新与期望一致 ({len(updates)} 次)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
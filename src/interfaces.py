@@ -0,0 +1,361 @@
+"""
+网络接口枚举模块 - 一次性获取所有接口的名称、启用状态和IPv4地址
+
+Linux 上优先通过 netlink 直接向内核查询 (RTM_GETLINK + RTM_GETADDR)，
+其次通过 ctypes 调用 getifaddrs，其他平台或两者都不可用时回退到 psutil。
+结果保存在紧凑的数组结构 InterfaceTable 中，只包含监控需要的信息。
+"""
+import os
+import sys
+import socket
+import struct
+import ctypes
+import ctypes.util
+import logging
+from array import array
+
+import psutil
+
+IFF_UP = 0x1
+IFF_RUNNING = 0x40
+
+# netlink 常量 (linux/netlink.h, linux/rtnetlink.h)
+NETLINK_ROUTE = 0
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+IFLA_IFNAME = 3
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+
+_NLMSGHDR = struct.Struct('=IHHII')
+_IFINFOMSG = struct.Struct('=BxHiII')
+_IFADDRMSG = struct.Struct('=BBBBI')
+_RTATTR = struct.Struct('=HH')
+
+
+class InterfaceTable:
+    __slots__ = ('names', 'indexes', 'up', '_rows', '_addresses', '_prefixes', '_offsets')
+
+    def __init__(self, links, addresses):
+        """
+        由接口列表和地址列表构建紧凑的接口表
+
+        Args:
+            links: [(ifindex, 名称, 是否启用)] 列表
+            addresses: [(ifindex, IPv4地址整数, 前缀长度)] 列表
+        """
+        self.names = [name for _, name, _ in links]
+        self.indexes = array('I', (index for index, _, _ in links))
+        self.up = bytearray(bool(is_up) for _, _, is_up in links)
+        self._rows = {name: row for row, name in enumerate(self.names)}
+        row_of_index = {index: row for row, index in enumerate(self.indexes)}
+
+        # 地址按所属行排序存放，_offsets[row]:_offsets[row + 1] 即该行的地址
+        owned = sorted((row_of_index[index], value, prefix) for index, value, prefix in addresses
+                       if index in row_of_index)
+        self._addresses = array('I', (value for _, value, _ in owned))
+        self._prefixes = bytes(prefix for _, _, prefix in owned)
+        self._offsets = array('I', [0] * (len(self.names) + 1))
+        for row, _, _ in owned:
+            self._offsets[row + 1] += 1
+        for row in range(len(self.names)):
+            self._offsets[row + 1] += self._offsets[row]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def __eq__(self, other):
+        # 按内容比较，内容相同的两次快照视为同一状态
+        if not isinstance(other, InterfaceTable):
+            return NotImplemented
+        return (self.names == other.names and self.indexes == other.indexes and self.up == other.up
+                and self._addresses == other._addresses and self._prefixes == other._prefixes
+                and self._offsets == other._offsets)
+
+    def rows(self):
+        """
+        导出构建该表的接口列表和地址列表 (与构造函数的参数格式相同)
+
+        Returns:
+            tuple: ([(ifindex, 名称, 是否启用)], [(ifindex, IPv4地址整数, 前缀长度)])
+        """
+        links = [(self.indexes[row], name, bool(self.up[row])) for row, name in enumerate(self.names)]
+        addresses = [(self.indexes[row], self._addresses[i], self._prefixes[i])
+                     for row in range(len(self.names))
+                     for i in range(self._offsets[row], self._offsets[row + 1])]
+        return links, addresses
+
+    def is_up(self, name):
+        """
+        接口是否已启用并处于连接状态 (IFF_UP 和 IFF_RUNNING，与 psutil 的 isup 一致)
+
+        Args:
+            name: 接口名称
+
+        Returns:
+            bool: 接口不存在时返回 False
+        """
+        row = self._rows.get(name)
+        return row is not None and bool(self.up[row])
+
+    def index(self, name):
+        """
+        获取接口索引
+
+        Args:
+            name: 接口名称
+
+        Returns:
+            int: 接口索引，接口不存在时返回 None
+        """
+        row = self._rows.get(name)
+        return None if row is None else self.indexes[row]
+
+    def ipv4(self, name):
+        """
+        获取接口的IPv4地址
+
+        Args:
+            name: 接口名称
+
+        Returns:
+            list: 点分十进制地址列表，接口不存在时返回空列表
+        """
+        row = self._rows.get(name)
+        if row is None:
+            return []
+        return [socket.inet_ntoa(struct.pack('!I', value))
+                for value in self._addresses[self._offsets[row]:self._offsets[row + 1]]]
+
+    def ipv4_prefixes(self, name):
+        """
+        获取接口的IPv4地址及前缀长度
+
+        Args:
+            name: 接口名称
+
+        Returns:
+            list: [(地址, 前缀长度)] 列表
+        """
+        row = self._rows.get(name)
+        if row is None:
+            return []
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return list(zip(self.ipv4(name), self._prefixes[start:end]))
+
+
+def _attributes(data, offset, end):
+    """
+    遍历 netlink 消息中的 rtattr，产生 (类型, 数据)
+    """
+    while offset + _RTATTR.size <= end:
+        length, kind = _RTATTR.unpack_from(data, offset)
+        if length < _RTATTR.size:
+            break
+        yield kind, data[offset + _RTATTR.size:offset + length]
+        offset += (length + 3) & ~3
+
+
+class NetlinkInterfaceBackend:
+    name = 'netlink'
+
+    def __init__(self):
+        """
+        初始化 netlink 接口枚举后端 (仅 Linux)
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError("netlink 仅在 Linux 上可用")
+        self._seq = 0
+
+    def _dump(self, sock, message_type, body, reply_type):
+        self._seq += 1
+        seq = self._seq
+        sock.send(_NLMSGHDR.pack(_NLMSGHDR.size + len(body), message_type, NLM_F_REQUEST | NLM_F_DUMP, seq, 0) + body)
+        while True:
+            data = sock.recv(65536)
+            offset = 0
+            while offset + _NLMSGHDR.size <= len(data):
+                length, kind, _, reply_seq, _ = _NLMSGHDR.unpack_from(data, offset)
+                if length < _NLMSGHDR.size:
+                    return
+                if reply_seq == seq:
+                    if kind == NLMSG_DONE:
+                        return
+                    if kind == NLMSG_ERROR:
+                        error = -struct.unpack_from('=i', data, offset + _NLMSGHDR.size)[0]
+                        if error:
+                            raise OSError(error, os.strerror(error))
+                    elif kind == reply_type:
+                        yield data, offset + _NLMSGHDR.size, offset + length
+                offset += (length + 3) & ~3
+
+    def snapshot(self):
+        """
+        获取所有接口的当前状态
+
+        Returns:
+            InterfaceTable: 接口表
+        """
+        links = []
+        addresses = []
+        with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as sock:
+            sock.bind((0, 0))
+            for data, start, end in self._dump(sock, RTM_GETLINK, _IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0),
+                                               RTM_NEWLINK):
+                _, _, index, flags, _ = _IFINFOMSG.unpack_from(data, start)
+                for kind, value in _attributes(data, start + _IFINFOMSG.size, end):
+                    if kind == IFLA_IFNAME:
+                        name = value.split(b'\0', 1)[0].decode('utf-8', 'replace')
+                        links.append((index, name, flags & IFF_UP and flags & IFF_RUNNING))
+                        break
+            for data, start, end in self._dump(sock, RTM_GETADDR, _IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0),
+                                               RTM_NEWADDR):
+                family, prefix, _, _, index = _IFADDRMSG.unpack_from(data, start)
+                if family != socket.AF_INET:
+                    continue
+                # 点对点接口的 IFA_ADDRESS 是对端地址，本机地址在 IFA_LOCAL 中
+                local = address = None
+                for kind, value in _attributes(data, start + _IFADDRMSG.size, end):
+                    if kind == IFA_LOCAL:
+                        local = value
+                    elif kind == IFA_ADDRESS:
+                        address = value
+                value = local or address
+                if value and len(value) == 4:
+                    addresses.append((index, struct.unpack('!I', value)[0], prefix))
+        return InterfaceTable(links, addresses)
+
+
+class _SockaddrIn(ctypes.Structure):
+    _fields_ = [('sin_family', ctypes.c_ushort), ('sin_port', ctypes.c_uint16), ('sin_addr', ctypes.c_uint8 * 4)]
+
+
+class _SockaddrLl(ctypes.Structure):
+    _fields_ = [('sll_family', ctypes.c_ushort), ('sll_protocol', ctypes.c_uint16), ('sll_ifindex', ctypes.c_int)]
+
+
+class _Ifaddrs(ctypes.Structure):
+    pass
+
+
+_Ifaddrs._fields_ = [('ifa_next', ctypes.POINTER(_Ifaddrs)), ('ifa_name', ctypes.c_char_p),
+                     ('ifa_flags', ctypes.c_uint), ('ifa_addr', ctypes.POINTER(_SockaddrIn)),
+                     ('ifa_netmask', ctypes.POINTER(_SockaddrIn)), ('ifa_ifu', ctypes.c_void_p),
+                     ('ifa_data', ctypes.c_void_p)]
+
+
+class GetifaddrsInterfaceBackend:
+    name = 'getifaddrs'
+
+    def __init__(self):
+        """
+        初始化 getifaddrs 接口枚举后端 (Linux glibc/musl 的结构体布局)
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError("getifaddrs 后端仅支持 Linux 的结构体布局")
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._libc.getifaddrs.argtypes = [ctypes.POINTER(ctypes.POINTER(_Ifaddrs))]
+        self._libc.freeifaddrs.argtypes = [ctypes.POINTER(_Ifaddrs)]
+
+    def snapshot(self):
+        """
+        获取所有接口的当前状态
+
+        Returns:
+            InterfaceTable: 接口表
+        """
+        head = ctypes.POINTER(_Ifaddrs)()
+        if self._libc.getifaddrs(ctypes.byref(head)) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        links = []
+        addresses = []
+        indexes = {}
+        try:
+            entry = head
+            while entry:
+                item = entry.contents
+                name = item.ifa_name.decode('utf-8', 'replace')
+                if item.ifa_addr:
+                    family = item.ifa_addr.contents.sin_family
+                    # 每个接口都有一条 AF_PACKET 记录，即使没有任何地址
+                    if family == socket.AF_PACKET:
+                        index = ctypes.cast(item.ifa_addr, ctypes.POINTER(_SockaddrLl)).contents.sll_ifindex
+                        indexes[name] = index
+                        links.append((index, name, item.ifa_flags & IFF_UP and item.ifa_flags & IFF_RUNNING))
+                    elif family == socket.AF_INET:
+                        value = int.from_bytes(bytes(item.ifa_addr.contents.sin_addr), 'big')
+                        mask = int.from_bytes(bytes(item.ifa_netmask.contents.sin_addr), 'big') if item.ifa_netmask else 0
+                        # IPv4 记录的名称可能是别名 (eth0:1)，归到所属接口
+                        addresses.append((name.split(':', 1)[0], value, bin(mask).count('1')))
+                entry = item.ifa_next
+        finally:
+            self._libc.freeifaddrs(head)
+        return InterfaceTable(links, [(indexes.get(name, 0), value, prefix) for name, value, prefix in addresses])
+
+
+class PsutilInterfaceBackend:
+    name = 'psutil'
+
+    def snapshot(self):
+        """
+        获取所有接口的当前状态
+
+        Returns:
+            InterfaceTable: 接口表
+        """
+        interfaces_stats = psutil.net_if_stats()
+        interfaces_addrs = psutil.net_if_addrs()
+        links = []
+        addresses = []
+        for index, (iface, stats) in enumerate(interfaces_stats.items(), 1):
+            links.append((index, iface, stats.isup))
+            for addr in interfaces_addrs.get(iface, []):
+                if addr.family == socket.AF_INET:
+                    mask = int.from_bytes(socket.inet_aton(addr.netmask), 'big') if addr.netmask else 0
+                    addresses.append((index, int.from_bytes(socket.inet_aton(addr.address), 'big'),
+                                      bin(mask).count('1')))
+        return InterfaceTable(links, addresses)
+
+
+BACKENDS = {
+    NetlinkInterfaceBackend.name: NetlinkInterfaceBackend,
+    GetifaddrsInterfaceBackend.name: GetifaddrsInterfaceBackend,
+    PsutilInterfaceBackend.name: PsutilInterfaceBackend,
+}
+
+
+def get_interface_backend(preferred=None):
+    """
+    选择可用的接口枚举后端
+
+    Args:
+        preferred: 指定后端名称 (netlink / getifaddrs / psutil)，为 None 时按顺序自动选择
+
+    Returns:
+        object: 具有 snapshot() 方法的后端实例
+    """
+    logger = logging.getLogger('interfaces')
+    names = [preferred] if preferred else list(BACKENDS)
+    for name in names:
+        try:
+            backend = BACKENDS[name]()
+            # 实际查询一次，确认在当前环境下可用 (例如 netlink 被沙箱禁止)
+            backend.snapshot()
+            logger.debug(f"使用接口枚举后端: {name}")
+            return backend
+        except Exception as e:
+            logger.debug(f"接口枚举后端 {name} 不可用: {e}")
+    return PsutilInterfaceBackend()
@@ -0,0 +1,382 @@
+"""
+日志存储模块 - 以结构化字段保存日志记录，支持按级别、记录器和关键字快速筛选
+
+内存中的记录按列存放 (时间、级别、记录器、消息)，并为每个级别和每个记录器维护
+记录编号索引。轮转出去的日志文件 (git_proxy_monitor.log.1 等) 只在第一次需要
+搜索历史时才解析，解析结果按文件缓存。
+"""
+import os
+import re
+import time
+import heapq
+import bisect
+import logging
+import threading
+from array import array
+from collections import namedtuple
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_CAPACITY = 200000
+LEVEL_NAMES = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
+
+# 一条日志记录: 时间戳, 记录器名称, 级别数值, 消息
+LogEntry = namedtuple('LogEntry', ['created', 'name', 'levelno', 'message'])
+
+# 与 main.setup_logging 中的文件格式对应: 时间 - 记录器 - 级别 - 消息
+_LINE_PATTERN = re.compile(r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) - (.*?) - '
+                           r'(DEBUG|INFO|WARNING|ERROR|CRITICAL) - (.*)$')
+
+
+class LogRecordStore:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        初始化日志记录存储
+
+        Args:
+            capacity: 最多保留的记录数，超出后丢弃最早的记录；为 None 时不限制
+        """
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._base = 0
+        self._created = array('d')
+        self._levels = array('H')
+        self._loggers = array('I')
+        self._messages = []
+        self._lowered = []
+        self._logger_names = []
+        self._logger_ids = {}
+        self._level_index = {}
+        self._logger_index = {}
+
+    @property
+    def next_id(self):
+        """
+        下一条记录的编号 (编号单调递增，丢弃旧记录后也不会重复)
+        """
+        return self._base + len(self._messages)
+
+    def __len__(self):
+        return len(self._messages)
+
+    def append(self, created, name, levelno, message):
+        """
+        追加一条记录
+
+        Args:
+            created: 时间戳
+            name: 记录器名称
+            levelno: 级别数值
+            message: 消息
+
+        Returns:
+            int: 记录编号
+        """
+        with self._lock:
+            logger_id = self._logger_ids.get(name)
+            if logger_id is None:
+                logger_id = self._logger_ids[name] = len(self._logger_names)
+                self._logger_names.append(name)
+            record_id = self._base + len(self._messages)
+            self._created.append(created)
+            self._levels.append(levelno)
+            self._loggers.append(logger_id)
+            self._messages.append(message)
+            self._lowered.append(message.lower())
+            self._level_index.setdefault(levelno, array('q')).append(record_id)
+            self._logger_index.setdefault(logger_id, array('q')).append(record_id)
+            if self.capacity and len(self._messages) > self.capacity:
+                self._trim(max(self.capacity // 10, 1))
+            return record_id
+
+    def extend_message(self, record_id, text):
+        """
+        为记录追加续行 (例如异常堆栈)
+
+        Args:
+            record_id: 记录编号
+            text: 追加的文本
+        """
+        with self._lock:
+            offset = record_id - self._base
+            if 0 <= offset < len(self._messages):
+                self._messages[offset] += '\n' + text
+                self._lowered[offset] += '\n' + text.lower()
+
+    def get(self, record_id):
+        """
+        获取一条记录
+
+        Args:
+            record_id: 记录编号
+
+        Returns:
+            LogEntry: 记录已被丢弃时返回 None
+        """
+        offset = record_id - self._base
+        if not 0 <= offset < len(self._messages):
+            return None
+        return LogEntry(self._created[offset], self._logger_names[self._loggers[offset]],
+                        self._levels[offset], self._messages[offset])
+
+    def logger_names(self):
+        """
+        获取出现过的记录器名称
+
+        Returns:
+            list: 名称列表
+        """
+        return sorted(self._logger_names)
+
+    def query(self, text='', min_level=0, logger=None, after=-1, limit=None):
+        """
+        按条件筛选记录
+
+        Args:
+            text: 消息中包含的关键字 (不区分大小写)
+            min_level: 最低级别数值
+            logger: 记录器名称 (可选)
+            after: 只返回编号大于该值的记录，用于增量查询
+            limit: 只返回最新的若干条
+
+        Returns:
+            list: 按编号升序排列的记录编号
+        """
+        text = text.lower()
+        with self._lock:
+            base = self._base
+            start = max(after + 1, base)
+            candidates = self._candidates(min_level, logger, start)
+            if candidates is None:
+                return []
+            lowered = self._lowered
+            matches = []
+            # 从最新的记录往前找，达到数量上限即可停止
+            for record_id in candidates:
+                if text and text not in lowered[record_id - base]:
+                    continue
+                matches.append(record_id)
+                if limit and len(matches) >= limit:
+                    break
+        matches.reverse()
+        return matches
+
+    def matches(self, record_id, text='', min_level=0, logger=None):
+        """
+        判断一条记录是否满足条件
+
+        Returns:
+            bool: 是否满足
+        """
+        offset = record_id - self._base
+        if not 0 <= offset < len(self._messages):
+            return False
+        if self._levels[offset] < min_level:
+            return False
+        if logger is not None and self._logger_names[self._loggers[offset]] != logger:
+            return False
+        return not text or text.lower() in self._lowered[offset]
+
+    def _candidates(self, min_level, logger, start):
+        """
+        根据级别和记录器索引，从新到旧逐个给出编号不小于 start 的候选记录
+        """
+        if logger is not None:
+            logger_id = self._logger_ids.get(logger)
+            if logger_id is None:
+                return None
+            index = self._logger_index[logger_id]
+            candidates = reversed(index[bisect.bisect_left(index, start):])
+            if min_level <= 0:
+                return candidates
+            levels, base = self._levels, self._base
+            return (i for i in candidates if levels[i - base] >= min_level)
+        indexes = [index for level, index in self._level_index.items() if level >= min_level]
+        if len(indexes) < len(self._level_index):
+            # 各级别的索引都是有序的，合并时只需取到数量上限为止
+            return heapq.merge(*(reversed(index[bisect.bisect_left(index, start):]) for index in indexes),
+                               reverse=True)
+        return reversed(range(start, self._base + len(self._messages)))
+
+    def _trim(self, count):
+        self._base += count
+        del self._created[:count]
+        del self._levels[:count]
+        del self._loggers[:count]
+        del self._messages[:count]
+        del self._lowered[:count]
+        for index in list(self._level_index.values()) + list(self._logger_index.values()):
+            del index[:bisect.bisect_left(index, self._base)]
+
+
+class LogStoreHandler(logging.Handler):
+    def __init__(self, store, level=logging.NOTSET):
+        """
+        将日志记录写入 LogRecordStore 的处理程序
+
+        Args:
+            store: LogRecordStore 实例
+            level: 处理级别
+        """
+        logging.Handler.__init__(self, level)
+        self.store = store
+        self.last_id = -1
+
+    def emit(self, record):
+        try:
+            message = record.getMessage()
+            if record.exc_info and not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            if record.exc_text:
+                message += '\n' + record.exc_text
+            self.last_id = self.store.append(record.created, record.name, record.levelno, message)
+        except Exception:
+            self.handleError(record)
+
+
+def parse_log_file(path, end=None, before=None, store=None):
+    """
+    将日志文件解析为记录存储
+
+    Args:
+        path: 日志文件路径
+        end: 只解析到该字节偏移 (可选)
+        before: 只保留早于该时间戳的记录 (可选)
+        store: 写入的 LogRecordStore (可选)，默认新建一个不限容量的存储
+
+    Returns:
+        LogRecordStore: 记录存储
+    """
+    store = store if store is not None else LogRecordStore(capacity=None)
+    last_id = None
+    # 同一秒内的记录很多，缓存时间戳的解析结果
+    seconds = {}
+    with open(path, 'rb') as f:
+        data = f.read() if end is None else f.read(end)
+    for line in data.decode('utf-8', 'replace').splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            stamp, millis, name, level, message = match.groups()
+            second = seconds.get(stamp)
+            if second is None:
+                second = seconds[stamp] = time.mktime(time.strptime(stamp, '%Y-%m-%d %H:%M:%S'))
+            created = second + int(millis) / 1000
+            if before is not None and created >= before:
+                last_id = None
+                continue
+            last_id = store.append(created, name, logging.getLevelName(level), message)
+        elif last_id is not None:
+            store.extend_message(last_id, line)
+    return store
+
+
+class LogArchive:
+    def __init__(self, base_filename, backup_count, cutoff=None):
+        """
+        轮转日志文件的延迟索引
+
+        之后的记录已由内存存储保存，只索引 cutoff 之前的部分，避免搜索结果重复:
+        当前日志文件只解析到创建时的大小，其后轮转出去的文件按时间戳过滤。
+
+        Args:
+            base_filename: 当前日志文件路径
+            backup_count: 轮转文件数量
+            cutoff: 时间戳 (可选)，默认为创建时间
+        """
+        self.base_filename = base_filename
+        self.backup_count = backup_count
+        self.cutoff = cutoff if cutoff is not None else time.time()
+        try:
+            stat = os.stat(base_filename)
+            self._active = (stat.st_ino, stat.st_size)
+        except OSError:
+            self._active = None
+        self.logger = logging.getLogger('log_store')
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_root_logger(cls):
+        """
+        根据根日志记录器上的 RotatingFileHandler 创建
+
+        Returns:
+            LogArchive: 没有轮转文件处理程序时返回 None
+        """
+        for handler in logging.getLogger().handlers:
+            if isinstance(handler, RotatingFileHandler):
+                return cls(handler.baseFilename, handler.backupCount)
+        return None
+
+    def segments(self):
+        """
+        按时间从旧到新获取所有日志分段的记录存储，未解析过的分段在此时解析
+
+        Returns:
+            list: LogRecordStore 列表
+        """
+        paths = [f'{self.base_filename}.{i}' for i in range(self.backup_count, 0, -1)] + [self.base_filename]
+        stores = []
+        live_keys = set()
+        with self._lock:
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                end = None
+                if self._active and stat.st_ino == self._active[0] and self._active[0]:
+                    # 创建时的当前日志文件，此后追加的内容都已在内存中
+                    end = self._active[1]
+                elif path == self.base_filename:
+                    # 已轮转过，新的当前日志文件只包含内存中已有的记录
+                    continue
+                # 轮转只是重命名文件，按 inode 缓存可以在轮转后继续使用已解析的结果
+                key = (stat.st_ino or path, stat.st_size, stat.st_mtime_ns, end)
+                live_keys.add(key)
+                store = self._cache.get(key)
+                if store is None:
+                    start = time.perf_counter()
+                    store = parse_log_file(path, end, self.cutoff)
+                    self._cache[key] = store
+                    self.logger.debug(f"已索引日志分段 {os.path.basename(path)}: {len(store)} 条记录，"
+                                      f"耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+                stores.append(store)
+            for key in [k for k in self._cache if k not in live_keys]:
+                del self._cache[key]
+        return stores
+
+
+class LogSearch:
+    def __init__(self, store, archive=None):
+        """
+        在内存记录和轮转日志上执行搜索
+
+        Args:
+            store: 内存中的 LogRecordStore
+            archive: LogArchive 实例 (可选)
+        """
+        self.store = store
+        self.archive = archive
+
+    def search(self, text='', min_level=0, include_history=False, limit=1000):
+        """
+        搜索记录
+
+        Args:
+            text: 关键字
+            min_level: 最低级别数值
+            include_history: 是否包含轮转出去的日志
+            limit: 最多返回的条数 (最新的若干条)
+
+        Returns:
+            list: 按时间升序排列的 LogEntry 列表
+        """
+        results = [self.store.get(i) for i in self.store.query(text, min_level, limit=limit)]
+        if include_history and self.archive and len(results) < limit:
+            for segment in reversed(self.archive.segments()):
+                remaining = limit - len(results)
+                older = [segment.get(i) for i in segment.query(text, min_level, limit=remaining)]
+                results = older + results
+                if len(results) >= limit:
+                    break
+        return [entry for entry in results if entry is not None]
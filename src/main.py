@@ -4,13 +4,33 @@ Git代理IP监视器 - 主程序入口
 import ctypes
 import sys
 import os
+import signal
 import logging
+from logging.handlers import RotatingFileHandler
 
 from src.network import NetworkMonitor
 from src.git_proxy import GitProxyManager
 from src.config import ConfigManager
+from src.profiles import ProfileManager
+from src.system_proxy import SystemProxyManager
+from src.forward_proxy import create_forward_proxy
+from src.proxy_rules import ProxyRuleEngine
+from src.pac_server import create_pac_server
+from src.route_selector import create_route_selector
+from src.profiler import RuntimeProfiler
+from src.failover import create_failover_chain
+from src.runtime import CoreRuntime
+from src.hooks import create_hook_runner
+from src.discovery import create_proxy_discovery
+from src.state_store import StateStore, SnapshotPersister
+from src import tracing
+from src.status_page import create_status_page
 from src.gui import GitProxyMonitorGUI
 
+# 单个日志文件的大小上限和保留的轮转文件数量
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
 def is_admin():
     """
     检查是否具有管理员权限
@@ -26,6 +46,9 @@ def is_admin():
 def setup_logging():
     """
     配置日志记录
+
+    Returns:
+        str: 日志目录
     """
     # 获取脚本所在目录
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -43,39 +66,130 @@ def setup_logging():
     
     # 创建根日志记录器
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
+    # 界面的日志记录存储保留 DEBUG 级别供筛选，日志文件仍只写入 INFO 及以上
+    root_logger.setLevel(logging.DEBUG)
+    # 第三方库 (例如 PIL 解析图标) 的调试输出对排查代理问题没有帮助
+    logging.getLogger('PIL').setLevel(logging.INFO)
     
     # 创建文件处理程序
     try:
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES,
+                                           backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
         file_handler.setLevel(logging.INFO)
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         file_handler.setFormatter(formatter)
         root_logger.addHandler(file_handler)
     except Exception as e:
         print(f"无法创建日志文件: {e}")
+    return log_dir
 
-def main():
+def main(instance=None, profile_duration=None):
     """
     主函数
+    
+    Args:
+        instance: 已获取的单实例锁 (可选)，用于接收后续启动转交的参数
+        profile_duration: 启动后立即进行性能分析的时长 (秒，可选)
     """
     # 配置日志记录
-    setup_logging()
+    log_dir = setup_logging()
     logger = logging.getLogger('main')
     
     logger.info("启动Git代理IP监视器")
     
+    # 核心运行时负责变化检测、写入和各种定时任务
+    runtime = CoreRuntime()
+    runtime.start()
+
     # 初始化组件
     config_manager = ConfigManager()
-    git_proxy_manager = GitProxyManager()
-    network_monitor = NetworkMonitor(callback=None, config_manager=config_manager)
+    # 启用追踪时，每次 IP 变化在各阶段的耗时写入 logs/traces.jsonl
+    tracing.set_tracer(tracing.create_tracer(config_manager, log_dir))
+    rule_engine = ProxyRuleEngine(config_manager)
+    # 状态存储由网络检测和 Git 写入更新，界面只读取和订阅
+    state_store = StateStore()
+    # 有上次保存的快照时直接假定其中的状态成立 (热启动)，由界面在后台验证，
+    # 否则在这里读取一次当前的 Git 代理
+    snapshot_persister = SnapshotPersister(state_store, config_manager, runtime)
+    git_proxy_manager = GitProxyManager(rule_engine=rule_engine, state_store=state_store)
+    if not snapshot_persister.restore():
+        state_store.update(git_proxy=git_proxy_manager.read_proxy())
+    snapshot_persister.start()
+    # 启用状态页时，shell 提示符和构建脚本可以直接从内存映射文件读取当前代理
+    status_page = create_status_page(config_manager, state_store)
+    if status_page:
+        status_page.start()
+    network_monitor = NetworkMonitor(callback=None, config_manager=config_manager, runtime=runtime,
+                                     state_store=state_store)
+    profiler = RuntimeProfiler(log_dir)
+    network_monitor.profile_hook = profiler.checkpoint
+    runtime.set_profiler(profiler)
+    profile_manager = ProfileManager(config_manager)
+    system_proxy_manager = SystemProxyManager(config_manager, runtime=runtime)
+    
+    # 启用本地转发代理时，Git 只需指向本地端口一次
+    forward_proxy = create_forward_proxy(config_manager, runtime=runtime)
+    if forward_proxy:
+        listen_port = forward_proxy.start()
+        if listen_port:
+            git_proxy_manager.apply_proxy('127.0.0.1', listen_port)
+        else:
+            forward_proxy = None
+
+    # 启用 PAC 服务时，浏览器等工具可以从本地获取同样的代理设置
+    pac_server = create_pac_server(config_manager, rule_engine, runtime=runtime)
+    if pac_server and not pac_server.start():
+        pac_server = None
+
+    # 启用故障转移时，由健康检查在检测到的代理、备用代理和直连之间切换
+    failover = create_failover_chain(config_manager, git_proxy_manager, forward_proxy, state_store=state_store)
+    if failover:
+        failover.start(runtime)
+
+    # 启用路由选择时，按测量结果为各主机单独决定直连还是走代理
+    route_selector = create_route_selector(config_manager, git_proxy_manager, failover)
+    if route_selector:
+        route_selector.start(runtime)
+
+    # 配置了钩子时，IP 变化后并行执行用户的命令和入口函数
+    hooks = create_hook_runner(config_manager, runtime=runtime)
+
+    # 启用代理发现时，在本网段中查找实际运行代理的主机
+    discovery = create_proxy_discovery(config_manager, runtime)
     
     # 创建GUI
     try:
-        gui = GitProxyMonitorGUI(network_monitor, git_proxy_manager, config_manager)
+        gui = GitProxyMonitorGUI(network_monitor, git_proxy_manager, config_manager, profile_manager,
+                                 system_proxy_manager, forward_proxy, pac_server, route_selector, profiler, failover,
+                                 runtime, hooks, discovery)
+        if instance:
+            instance.serve(gui.handle_instance_args)
+        # kill -USR1 <pid> 可随时开始或结束性能分析
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.toggle())
+        if profile_duration:
+            profiler.start(profile_duration)
         gui.run()
     except Exception as e:
         logger.error(f"运行GUI时发生错误: {e}", exc_info=True)
+    finally:
+        if failover:
+            failover.stop()
+        if route_selector:
+            route_selector.stop()
+        if hooks:
+            hooks.stop()
+        snapshot_persister.stop()
+        snapshot_persister.save()
+        if status_page:
+            status_page.stop()
+        if pac_server:
+            pac_server.stop()
+        if forward_proxy:
+            forward_proxy.stop()
+        if instance:
+            instance.release()
+        runtime.stop()
         
     logger.info("Git代理IP监视器已退出")
 
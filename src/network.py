@@ -2,27 +2,96 @@
 网络监控模块 - 获取IP地址和监控IP变化
 """
 import socket
-import psutil
 import time
 import threading
 import logging
 
+from src import tracing
+from src.interfaces import get_interface_backend
+from src.adapter_classifier import AdapterClassifier
+from src.state_store import StateStore
+
+# 检查IP变化的间隔 (秒)
+MONITOR_INTERVAL = 5
+# 用于确定默认路由的外部地址 (UDP connect 不会真正发送数据)
+ROUTE_PROBE_ADDRESS = ("8.8.8.8", 80)
+
+
+def lookup_default_route_ip():
+    """
+    通过路由查找确定默认路由使用的本机IP
+
+    Returns:
+        str: 本机IP
+
+    Raises:
+        OSError: 没有默认路由时
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.connect(ROUTE_PROBE_ADDRESS)
+        return s.getsockname()[0]
+
 class NetworkMonitor:
-    def __init__(self, callback=None, config_manager=None):
+    def __init__(self, callback=None, config_manager=None, interface_backend=None, classifier=None,
+                 runtime=None, state_store=None, route_lookup=None):
         """
         初始化网络监控器
         
         Args:
             callback: IP地址变化时的回调函数
             config_manager: 配置管理器实例 (新增)
+            interface_backend: 接口枚举后端 (可选)，默认自动选择
+            classifier: 适配器分类器 (可选)，默认读取 /sys/class/net
+            runtime: 核心运行时 (可选)，提供时由其定时器驱动检测，不再单独创建线程
+            state_store: 状态存储 (可选)，检测结果发布到这里，默认新建一个
+            route_lookup: 返回默认路由本机IP的函数 (可选)，默认为 lookup_default_route_ip，回放时替换为记录的结果
         """
         self.callback = callback
         self.config_manager = config_manager
         self.last_ip = ""
         self.is_monitoring = False
         self.monitor_thread = None
+        self.runtime = runtime
+        self._monitor_timer = None
+        self.profile_hook = None # 性能分析检查点 (可选)，每轮监控调用一次
         self.logger = logging.getLogger('network_monitor')
-        
+        self.interface_backend = interface_backend or get_interface_backend()
+        self.classifier = classifier or AdapterClassifier()
+        self.route_lookup = route_lookup or lookup_default_route_ip
+        self.state_store = state_store or StateStore()
+        # 选定的适配器和端口只在启动时从配置文件读取一次，之后由 select_adapter / set_port 更新
+        if config_manager:
+            self.state_store.update(selected_adapter=config_manager.get_selected_adapter() or '',
+                                    port=config_manager.get_proxy_port())
+        # 从快照恢复的状态尚未验证，先假定其中的IP就是上次使用的IP，检测到相同的IP时不再触发回调
+        state = self.state_store.state
+        if not state.verified and state.ip:
+            self.last_ip = state.ip
+
+    def classify_adapter(self, iface, ifindex=None):
+        """
+        判断适配器类型，优先使用硬件信息，无法获取时按名称关键字猜测
+
+        Args:
+            iface: 适配器名称
+            ifindex: 接口索引 (可选)，用作缓存键
+
+        Returns:
+            str: "虚拟", "无线", "有线" 或 "未知类型"
+        """
+        return self.classifier.classify(iface, ifindex)
+
+    def snapshot_interfaces(self):
+        """
+        获取接口表，并让分类缓存中已删除或改名的接口失效
+
+        Returns:
+            InterfaceTable: 接口表
+        """
+        interfaces = self.interface_backend.snapshot()
+        self.classifier.sync(interfaces)
+        return interfaces
+
     def get_available_adapters(self):
         """
         获取所有可用的、活动的、非虚拟的IPv4网络适配器名称列表
@@ -31,86 +100,56 @@ class NetworkMonitor:
             list: 适配器名称列表
         """
         available_adapters = []
-        interfaces_stats = psutil.net_if_stats()
-        interfaces_addrs = psutil.net_if_addrs()
-        
-        virtual_keywords = ['vmware', 'virtual', 'vethernet', 'docker', 'vbox', 'vmnet', 
-                           'veth', 'virbr', 'containers', 'vpn', 'loopback', 'tunnel', 
-                           'wsltty', 'wsl']
+        interfaces = self.snapshot_interfaces()
 
-        # Keywords for known adapter types
-        wireless_keywords = ['wi', 'wlan', 'wireless', 'wifi']
-        wired_keywords = ['eth', 'realtek', 'broadcom', 'intel', 'nic']
-
-        for iface, stats in interfaces_stats.items():
-            if not stats.isup: # 跳过未启动的接口
+        for iface in interfaces:
+            if not interfaces.is_up(iface): # 跳过未启动的接口
                 continue
             
-            is_virtual = any(vk in iface.lower() for vk in virtual_keywords)
-            if is_virtual: # 跳过虚拟网卡
+            # 只保留有线和无线网卡，跳过虚拟网卡和未知类型的适配器
+            iface_type = self.classify_adapter(iface, interfaces.index(iface))
+            if iface_type not in ("有线", "无线"):
+                self.logger.debug(f"跳过{iface_type}适配器: {iface}")
                 continue
-            
-            # Check if adapter type is known (Wired or Wireless)
-            is_known_type = False
-            if any(wk in iface.lower() for wk in wireless_keywords):
-                is_known_type = True
-            elif any(wk in iface.lower() for wk in wired_keywords):
-                is_known_type = True
-            
-            if not is_known_type:
-                self.logger.debug(f"跳过未知类型的适配器: {iface}")
-                continue # 跳过未知类型的适配器
                 
-            addresses = interfaces_addrs.get(iface, [])
-            for addr in addresses:
-                if addr.family == socket.AF_INET and not addr.address.startswith('127.'): # 仅IPv4且非回环
-                    if iface not in available_adapters: # 避免重复添加同一个接口名称
-                        available_adapters.append(iface)
-                        break # 找到一个IPv4地址就够了，不需要继续遍历该接口的其他地址
+            for address in interfaces.ipv4(iface):
+                if not address.startswith('127.'): # 非回环
+                    available_adapters.append(iface)
+                    break # 找到一个IPv4地址就够了，不需要继续遍历该接口的其他地址
         
         self.logger.info(f"可用的网络适配器 (仅已知类型): {available_adapters}") # 更新日志信息
         return available_adapters
 
-    def get_current_ip(self, selected_adapter_name=None):
+    def get_current_ip(self, selected_adapter_name=None, interfaces=None):
         """
         获取当前IP地址
         
         Args:
             selected_adapter_name (str, optional): 用户选择的适配器名称. Defaults to None.
+            interfaces (InterfaceTable, optional): 已获取的接口表，默认重新枚举
 
         Returns:
             tuple: (ip地址, 适配器名称, 适配器类型描述)
         """
-        interfaces_stats = psutil.net_if_stats()
-        interfaces_addrs = psutil.net_if_addrs()
-        
-        # 在此处唯一定义 virtual_keywords 供函数后续使用
-        virtual_keywords = ['vmware', 'virtual', 'vethernet', 'docker', 'vbox', 'vmnet', 
-                           'veth', 'virbr', 'containers', 'vpn', 'loopback', 'tunnel', 
-                           'wsltty', 'wsl']
+        if interfaces is None:
+            interfaces = self.snapshot_interfaces()
         
         if selected_adapter_name:
             self.logger.info(f"尝试使用指定的适配器: {selected_adapter_name}")
-            if selected_adapter_name in interfaces_addrs and selected_adapter_name in interfaces_stats:
-                if interfaces_stats[selected_adapter_name].isup:
-                    addresses = interfaces_addrs[selected_adapter_name]
-                    for addr in addresses:
-                        if addr.family == socket.AF_INET and not addr.address.startswith('127.'):
-                            # 简单的类型判断
-                            iface_type = "未知类型"
-                            if any(wk in selected_adapter_name.lower() for wk in ['wi', 'wlan', 'wireless', 'wifi']):
-                                iface_type = "无线"
-                            elif any(ek in selected_adapter_name.lower() for ek in ['eth', 'realtek', 'broadcom', 'intel', 'nic']):
-                                iface_type = "有线"
-                                
-                            if iface_type == "未知类型":
-                                self.logger.warning(f"指定的适配器 {selected_adapter_name} 类型未知，将不使用。")
+            if selected_adapter_name in interfaces:
+                if interfaces.is_up(selected_adapter_name):
+                    for address in interfaces.ipv4(selected_adapter_name):
+                        if not address.startswith('127.'):
+                            iface_type = self.classify_adapter(selected_adapter_name,
+                                                               interfaces.index(selected_adapter_name))
+                            if iface_type not in ("有线", "无线"):
+                                self.logger.warning(f"指定的适配器 {selected_adapter_name} 类型为{iface_type}，将不使用。")
                                 # 当类型未知时，不再继续自动选择，而是明确返回无有效IP
                                 # 让调用者知道这个特定选择无效
                                 return None, "未知", "未知" # 修改点1：用户指定未知类型则返回
                                 
-                            self.logger.info(f"从选定适配器 {selected_adapter_name} 获取到 IP: {addr.address}")
-                            return addr.address, selected_adapter_name, iface_type
+                            self.logger.info(f"从选定适配器 {selected_adapter_name} 获取到 IP: {address}")
+                            return address, selected_adapter_name, iface_type
                     self.logger.warning(f"指定的适配器 {selected_adapter_name} 没有找到合适的IPv4地址。")
                 else:
                     self.logger.warning(f"指定的适配器 {selected_adapter_name} 未激活。")
@@ -124,36 +163,35 @@ class NetworkMonitor:
 
         self.logger.info("未指定适配器，执行自动选择逻辑。")
         # 获取网络接口信息
-        # interfaces_stats 和 interfaces_addrs 已经在函数开头获取
+        # interfaces 已经在函数开头获取
         
         physical_interfaces = []  # 物理网卡
         wireless_interfaces = []  # 无线网卡
         # other_interfaces = []     # 其他网卡 - 我们将不再使用这个列表来收集未知类型的适配器
         
         # 遍历所有活动接口
-        for iface, stats in interfaces_stats.items():
+        for iface in interfaces:
             # 跳过未启动的接口
-            if not stats.isup:
+            if not interfaces.is_up(iface):
                 continue
                 
             # 检查是否是虚拟网卡
-            is_virtual = any(vk in iface.lower() for vk in virtual_keywords)
-            if is_virtual:
+            iface_type = self.classify_adapter(iface, interfaces.index(iface))
+            if iface_type == "虚拟":
                 self.logger.debug(f"跳过虚拟网卡: {iface}")
                 continue
                 
-            addresses = interfaces_addrs.get(iface, [])
-            for addr in addresses:
+            for address in interfaces.ipv4(iface):
                 # 只保留IPv4地址，排除回环地址、内网保留地址和多播地址
-                if addr.family == socket.AF_INET and not addr.address.startswith(('127.', '169.254.')):
+                if not address.startswith(('127.', '169.254.')):
                     # 确定接口类型
-                    if any(wk in iface.lower() for wk in ['wi', 'wlan', 'wireless', 'wifi']):
-                        wireless_interfaces.append((iface, addr.address, "无线"))
+                    if iface_type == "无线":
+                        wireless_interfaces.append((iface, address, "无线"))
                     # 以太网/有线接口识别
-                    elif any(ek in iface.lower() for ek in ['eth', 'realtek', 'broadcom', 'intel', 'nic']):
-                        physical_interfaces.append((iface, addr.address, "有线"))
+                    elif iface_type == "有线":
+                        physical_interfaces.append((iface, address, "有线"))
                     # else: # 修改点3：不再将其他类型添加到列表中
-                    #     other_interfaces.append((iface, addr.address, "其他"))
+                    #     other_interfaces.append((iface, address, "其他"))
         
         # 合并所有接口列表，按优先级排序
         all_interfaces = physical_interfaces + wireless_interfaces # 修改点4：不再包含 other_interfaces
@@ -164,16 +202,13 @@ class NetworkMonitor:
         
         # 尝试通过连接外部服务器确定默认路由
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-                # 使用谷歌DNS服务器而不是实际连接
-                s.connect(("8.8.8.8", 80))
-                default_ip = s.getsockname()[0]
-                
-                # 查找匹配的接口
-                for iface, ip, iface_type in all_interfaces:
-                    if ip == default_ip:
-                        self.logger.info(f"使用默认路由接口: {iface} ({ip})")
-                        return ip, iface, f"{iface_type} (默认路由)"
+            default_ip = self.route_lookup()
+
+            # 查找匹配的接口
+            for iface, ip, iface_type in all_interfaces:
+                if ip == default_ip:
+                    self.logger.info(f"使用默认路由接口: {iface} ({ip})")
+                    return ip, iface, f"{iface_type} (默认路由)"
         except Exception as e:
             self.logger.warning(f"无法确定默认网关接口: {e}")
         
@@ -203,9 +238,12 @@ class NetworkMonitor:
             return
             
         self.is_monitoring = True
-        self.monitor_thread = threading.Thread(target=self._monitor_loop)
-        self.monitor_thread.daemon = True
-        self.monitor_thread.start()
+        if self.runtime:
+            self._monitor_timer = self.runtime.every(MONITOR_INTERVAL, self.check_once, name='network_monitor')
+        else:
+            self.monitor_thread = threading.Thread(target=self._monitor_loop)
+            self.monitor_thread.daemon = True
+            self.monitor_thread.start()
         self.logger.info("开始监控IP地址变化")
         
     def stop_monitoring(self):
@@ -216,6 +254,9 @@ class NetworkMonitor:
             return
             
         self.is_monitoring = False
+        if self._monitor_timer:
+            self._monitor_timer.cancel()
+            self._monitor_timer = None
         if self.monitor_thread:
             self.monitor_thread.join(timeout=1)
             self.monitor_thread = None
@@ -226,24 +267,75 @@ class NetworkMonitor:
         监控循环，定期检查IP地址变化
         """
         while self.is_monitoring:
-            selected_adapter = None
-            if self.config_manager: # 如果有配置管理器
-                selected_adapter = self.config_manager.get_selected_adapter()
-                if selected_adapter:
-                    self.logger.debug(f"监控循环将使用已保存的适配器: {selected_adapter}")
-                else:
-                    self.logger.debug("监控循环：未在配置中找到选定适配器，将自动选择。")
-            else:
-                self.logger.debug("监控循环：ConfigManager 未提供，将自动选择适配器。")
+            if self.profile_hook:
+                self.profile_hook('monitor')
+            self.check_once()
+            # 每5秒检查一次IP变化
+            time.sleep(MONITOR_INTERVAL)
 
-            current_ip, adapter_name, adapter_type = self.get_current_ip(selected_adapter_name=selected_adapter)
-            
-            if current_ip and current_ip != self.last_ip:
+    def select_adapter(self, adapter_name):
+        """
+        更新选定的适配器，下次检测时生效
+
+        Args:
+            adapter_name: 适配器名称，空值表示自动选择
+        """
+        self.state_store.update(selected_adapter=adapter_name or '')
+
+    def set_port(self, port):
+        """
+        更新代理端口
+
+        Args:
+            port: 端口号
+        """
+        self.state_store.update(port=str(port))
+
+    def detect(self):
+        """
+        按选定的适配器检测一次IP地址，并将接口表和检测结果发布到状态存储 (不调用回调函数)
+
+        Returns:
+            tuple: (ip地址, 适配器名称, 适配器类型描述)
+        """
+        selected_adapter = self.state_store.state.selected_adapter or None
+        if selected_adapter:
+            self.logger.debug(f"使用选定的适配器: {selected_adapter}")
+        else:
+            self.logger.debug("未选定适配器，将自动选择。")
+
+        interfaces = self.snapshot_interfaces()
+        result = self.get_current_ip(selected_adapter_name=selected_adapter, interfaces=interfaces)
+        current_ip, adapter_name, adapter_type = result
+        self.state_store.update(interfaces=interfaces, ip=current_ip, adapter_name=adapter_name,
+                                adapter_type=adapter_type)
+        return result
+
+    def check_once(self, force=False):
+        """
+        检测一次IP地址，发生变化时调用回调函数
+
+        Args:
+            force: 为 True 时即使IP未变化也调用回调函数
+
+        Returns:
+            tuple: (ip地址, 适配器名称, 适配器类型描述)
+        """
+        detect_start = time.time_ns()
+        result = self.detect()
+        detect_end = time.time_ns()
+        current_ip, adapter_name, adapter_type = result
+        if current_ip and (force or current_ip != self.last_ip):
+            if current_ip != self.last_ip:
                 self.logger.info(f"IP已变化: 从 {self.last_ip} 变为 {current_ip} (适配器: {adapter_name} {adapter_type})")
-                self.last_ip = current_ip
-                
+            old_ip = self.last_ip
+            self.last_ip = current_ip
+
+            # 检测到变化才开始追踪，检测阶段按已记录的时间补入，后续阶段经由上下文挂到同一追踪上
+            with tracing.start_trace('ip_change', detect_start, old_ip=old_ip, ip=current_ip,
+                                     adapter=adapter_name, forced=force):
+                tracing.record_span('detect', detect_start, detect_end)
                 if self.callback:
-                    self.callback(current_ip, adapter_name, adapter_type)
-            
-            # 每5秒检查一次IP变化
-            time.sleep(5) 
\ No newline at end of file
+                    with tracing.span('callback'):
+                        self.callback(current_ip, adapter_name, adapter_type)
+        return result
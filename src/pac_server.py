@@ -0,0 +1,256 @@
+"""
+PAC服务模块 - 根据当前代理和绕过规则生成 PAC 文件并在本地提供下载
+
+生成结果会被缓存，只有代理地址或规则变化时才重新生成；
+响应带有 ETag，客户端用 If-None-Match 重新验证时返回 304。
+有核心运行时时服务运行在其事件循环上，否则使用标准库的 HTTP 服务线程。
+"""
+import json
+import asyncio
+import hashlib
+import ipaddress
+import threading
+import logging
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PAC_PORT = 17891
+PAC_CONTENT_TYPE = 'application/x-ns-proxy-autoconfig'
+
+
+def render_pac(ip, port, matcher=None):
+    """
+    生成 PAC 脚本
+
+    Args:
+        ip: 代理IP地址
+        port: 代理端口
+        matcher: proxy_rules.BypassMatcher 实例 (可选)
+
+    Returns:
+        str: PAC 脚本内容
+    """
+    lines = ['function FindProxyForURL(url, host) {',
+             '    host = host.toLowerCase();']
+    if matcher is not None:
+        if matcher.domains:
+            lines.append(f'    var domains = {json.dumps(sorted(matcher.domains))};')
+            lines.append('    for (var i = 0; i < domains.length; i++) {')
+            lines.append('        if (host == domains[i] || dnsDomainIs(host, "." + domains[i])) return "DIRECT";')
+            lines.append('    }')
+        if matcher.subdomain_only:
+            lines.append(f'    var parents = {json.dumps(sorted(matcher.subdomain_only))};')
+            lines.append('    for (var j = 0; j < parents.length; j++) {')
+            lines.append('        if (dnsDomainIs(host, "." + parents[j])) return "DIRECT";')
+            lines.append('    }')
+        for entry in matcher.entries:
+            entry = entry.strip().lower()
+            if ('*' in entry or '?' in entry) and not (entry.startswith('*.') and '*' not in entry[2:]):
+                lines.append(f'    if (shExpMatch(host, {json.dumps(entry)})) return "DIRECT";')
+        networks = [n for n in matcher.networks if isinstance(n, ipaddress.IPv4Network)]
+        if networks:
+            # 只对 IP 形式的主机检查网段，避免 isInNet 触发 DNS 解析
+            lines.append('    if (/^\\d+\\.\\d+\\.\\d+\\.\\d+$/.test(host)) {')
+            for network in networks:
+                lines.append(f'        if (isInNet(host, "{network.network_address}", "{network.netmask}")) return "DIRECT";')
+            lines.append('    }')
+    lines.append(f'    return "PROXY {ip}:{port}";')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+class PacServer:
+    def __init__(self, rule_engine=None, host='127.0.0.1', port=DEFAULT_PAC_PORT, runtime=None):
+        """
+        初始化 PAC 服务
+
+        Args:
+            rule_engine: 代理规则引擎 (可选)，提供绕过列表
+            host: 监听地址
+            port: 监听端口，0 表示随机端口
+            runtime: 核心运行时 (可选)，提供时在其事件循环上提供服务，不再单独创建线程
+        """
+        self.rule_engine = rule_engine
+        self.host = host
+        self.port = port
+        self.runtime = runtime
+        self._server = None
+        self.logger = logging.getLogger('pac_server')
+        self.stats = {'200': 0, '304': 0}
+        self._proxy = None
+        self._cached = None
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    def update(self, ip, port):
+        """
+        设置当前代理地址，只有地址变化时才使缓存失效
+
+        Args:
+            ip: 代理IP地址
+            port: 代理端口
+        """
+        proxy = (ip, str(port))
+        with self._lock:
+            if proxy != self._proxy:
+                self._proxy = proxy
+                self._cached = None
+
+    def invalidate(self):
+        """
+        使缓存失效 (例如绕过规则被重新加载后)
+        """
+        with self._lock:
+            self._cached = None
+
+    def get_pac(self):
+        """
+        获取 PAC 内容和 ETag，必要时重新生成
+
+        Returns:
+            tuple: (PAC 字节内容, ETag)，尚未设置代理时返回 (None, None)
+        """
+        with self._lock:
+            if self._cached is None and self._proxy is not None:
+                matcher = self.rule_engine.matcher if self.rule_engine else None
+                body = render_pac(self._proxy[0], self._proxy[1], matcher).encode('utf-8')
+                etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                self._cached = (body, etag)
+                self.logger.info(f"PAC 文件已重新生成 (ETag {etag})")
+            return self._cached or (None, None)
+
+    def respond(self, if_none_match=''):
+        """
+        生成一次 GET 请求的响应
+
+        Args:
+            if_none_match: 请求中的 If-None-Match 头
+
+        Returns:
+            tuple: (状态码, 头部列表 [(名称, 值)], 响应体)
+        """
+        body, etag = self.get_pac()
+        if body is None:
+            return 503, [('Content-Type', 'text/plain; charset=utf-8')], b'Proxy not detected yet\n'
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            self.stats['304'] += 1
+            return 304, [('ETag', etag)], b''
+        self.stats['200'] += 1
+        return 200, [('Content-Type', PAC_CONTENT_TYPE), ('ETag', etag), ('Cache-Control', 'no-cache')], body
+
+    def start(self):
+        """
+        启动 HTTP 服务，有核心运行时时运行在其事件循环上，否则在后台线程中运行
+
+        Returns:
+            int: 实际监听的端口，启动失败时返回 None
+        """
+        if self.runtime:
+            try:
+                self.runtime.submit(self._start_server()).result(5)
+            except Exception as e:
+                self.logger.error(f"PAC 服务启动失败: {e}")
+                return None
+            self.logger.info(f"PAC 服务已启动: http://{self.host}:{self.port}/proxy.pac")
+            return self.port
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, headers, body = server.respond(self.headers.get('If-None-Match', ''))
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                if status != 304:
+                    self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                server.logger.debug(format % args)
+
+        try:
+            self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            self.logger.error(f"PAC 服务启动失败: {e}")
+            return None
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, name='pac-server', daemon=True).start()
+        self.logger.info(f"PAC 服务已启动: http://{self.host}:{self.port}/proxy.pac")
+        return self.port
+
+    def stop(self):
+        """
+        停止 HTTP 服务
+        """
+        if self._server:
+            try:
+                self.runtime.submit(self._close_server()).result(2)
+            except Exception as e:
+                self.logger.debug(f"关闭 PAC 服务时出错: {e}")
+            self._server = None
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    async def _start_server(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _close_server(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle_client(self, reader, writer):
+        """
+        处理一个连接上的一次请求，响应后关闭连接
+        """
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5)
+            lines = head.decode('latin-1').split('\r\n')
+            method = lines[0].split(' ', 1)[0]
+            if method != 'GET':
+                status, headers, body = 501, [], b''
+            else:
+                if_none_match = ''
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name.strip().lower() == 'if-none-match':
+                        if_none_match = value.strip()
+                status, headers, body = self.respond(if_none_match)
+            if status != 304:
+                headers.append(('Content-Length', str(len(body))))
+            headers.append(('Connection', 'close'))
+            writer.write((f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n'
+                          + ''.join(f'{name}: {value}\r\n' for name, value in headers) + '\r\n').encode('latin-1'))
+            writer.write(body)
+            await writer.drain()
+            self.logger.debug(f"{lines[0]} -> {status}")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError) as e:
+            self.logger.debug(f"PAC 请求处理失败: {e}")
+        finally:
+            writer.close()
+
+
+def create_pac_server(config_manager, rule_engine=None, filename='pac.json', runtime=None):
+    """
+    根据配置创建 PAC 服务
+
+    配置文件格式: {"enabled": true, "port": 17891}
+
+    Args:
+        config_manager: 配置管理器实例
+        rule_engine: 代理规则引擎 (可选)
+        filename: 配置目录下的配置文件名
+        runtime: 核心运行时 (可选)
+
+    Returns:
+        PacServer: 未启用时返回 None
+    """
+    config = config_manager.load_json(filename, default={}) or {}
+    if not config.get('enabled'):
+        return None
+    return PacServer(rule_engine, port=int(config.get('port', DEFAULT_PAC_PORT)), runtime=runtime)
@@ -0,0 +1,227 @@
+"""
+运行时性能分析模块 - 按需对监控线程和界面线程做 cProfile 采样，并定期拍摄 tracemalloc 快照
+
+关闭时不安装任何跟踪钩子；开启后持续一个时间窗口，结果写入日志目录下的
+profile_<时间> 子目录:
+    - <线程名>.prof / <线程名>.txt    cProfile 原始数据和按累计耗时排序的前 N 项
+    - memory.txt                     相邻 tracemalloc 快照之间增长最多的前 N 个分配位置
+"""
+import os
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import logging
+
+DEFAULT_DURATION = 60
+DEFAULT_TOP_N = 25
+SNAPSHOT_COUNT = 4
+TRACEMALLOC_FRAMES = 10
+# 监控线程每 5 秒才经过一次检查点，结束时最多等待这么久让各线程交回数据
+DETACH_TIMEOUT = 10
+
+
+class RuntimeProfiler:
+    def __init__(self, log_dir, duration=DEFAULT_DURATION, top_n=DEFAULT_TOP_N):
+        """
+        初始化运行时性能分析器
+
+        Args:
+            log_dir: 结果输出目录
+            duration: 默认采样时间窗口 (秒)
+            top_n: 报告中列出的条目数
+        """
+        self.log_dir = log_dir
+        self.duration = duration
+        self.top_n = top_n
+        self.logger = logging.getLogger('profiler')
+        self._lock = threading.Lock()
+        self._active = False
+        self._deadline = 0
+        self._stop_event = threading.Event()
+        self._profiles = {}
+        self._results = {}
+        self._calls = {}
+        self._detached = threading.Condition(self._lock)
+        self._dispatchers = {}
+        self._thread = None
+
+    @property
+    def running(self):
+        """
+        是否正在采样 (包括正在写出结果)
+        """
+        return self._thread is not None
+
+    def add_dispatcher(self, name, call):
+        """
+        注册一个由事件循环驱动的线程，开始和结束时通过 call 让该线程进入或离开采样
+
+        Args:
+            name: 线程名，用作输出文件名
+            call: 形如 call(func, name) 的函数，负责在目标线程中执行 func(name)，例如 Tk 的 root.after(0, ...)
+        """
+        self._dispatchers[name] = call
+
+    def start(self, duration=None):
+        """
+        开始一次采样
+
+        Args:
+            duration: 时间窗口 (秒)，默认使用初始化时的设置
+
+        Returns:
+            bool: 是否已开始 (已有采样在进行时返回 False)
+        """
+        with self._lock:
+            if self._thread is not None:
+                return False
+            duration = duration or self.duration
+            self._active = True
+            self._deadline = time.monotonic() + duration
+            self._stop_event.clear()
+            self._results = {}
+            self._calls = {}
+            self._thread = threading.Thread(target=self._run, args=(duration,), name='profiler', daemon=True)
+            self._thread.start()
+        self.logger.info(f"性能分析已开始，持续 {duration:g} 秒")
+        self._dispatch()
+        return True
+
+    def stop(self):
+        """
+        提前结束当前采样，结果仍会写出
+        """
+        self._stop_event.set()
+
+    def toggle(self, duration=None):
+        """
+        未在采样时开始采样，否则提前结束
+
+        Args:
+            duration: 开始采样时使用的时间窗口 (秒)
+        """
+        if self.running:
+            self.stop()
+        else:
+            self.start(duration)
+
+    def checkpoint(self, name):
+        """
+        在被分析的线程中调用: 采样进行时为当前线程启用 cProfile，采样结束后停用并交回数据
+
+        Args:
+            name: 线程名，用作输出文件名
+        """
+        ident = threading.get_ident()
+        active = self._active and time.monotonic() < self._deadline and not self._stop_event.is_set()
+        if active and ident not in self._profiles:
+            profile = cProfile.Profile()
+            with self._lock:
+                self._profiles[ident] = (name, profile)
+            profile.enable()
+        elif not active and ident in self._profiles:
+            # cProfile 只能在启用它的线程中停用
+            with self._lock:
+                name, profile = self._profiles.pop(ident)
+            profile.disable()
+            with self._lock:
+                self._results[name] = profile
+                self._detached.notify_all()
+
+    def run(self, name, func, *args):
+        """
+        执行一次函数调用，采样进行时单独分析这次调用，结果按名称汇总
+
+        适用于在线程池中执行、不固定在某个线程上的任务。
+
+        Args:
+            name: 任务名，用作输出文件名
+            func: 要执行的函数
+            *args: 函数参数
+
+        Returns:
+            object: 函数的返回值
+        """
+        if not self._active:
+            return func(*args)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            with self._lock:
+                self._calls.setdefault(name, []).append(profile)
+
+    def _dispatch(self):
+        for name, call in list(self._dispatchers.items()):
+            try:
+                call(self.checkpoint, name)
+            except Exception as e:
+                self.logger.debug(f"无法通知线程 {name}: {e}")
+
+    def _run(self, duration):
+        output_dir = os.path.join(self.log_dir, time.strftime('profile_%Y%m%d_%H%M%S'))
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        snapshots = [(0.0, tracemalloc.take_snapshot())]
+        start = time.monotonic()
+        try:
+            interval = duration / SNAPSHOT_COUNT
+            while not self._stop_event.wait(max(0, min(interval, self._deadline - time.monotonic()))):
+                snapshots.append((time.monotonic() - start, tracemalloc.take_snapshot()))
+                if time.monotonic() >= self._deadline:
+                    break
+            if self._stop_event.is_set():
+                snapshots.append((time.monotonic() - start, tracemalloc.take_snapshot()))
+        finally:
+            if started_tracemalloc:
+                tracemalloc.stop()
+            self._active = False
+
+        # 让事件循环线程立即离开采样，轮询线程在下一次检查点离开
+        self._dispatch()
+        with self._lock:
+            self._detached.wait_for(lambda: not self._profiles, timeout=DETACH_TIMEOUT)
+            results = {name: [profile] for name, profile in self._results.items()}
+            for name, profiles in self._calls.items():
+                results.setdefault(name, []).extend(profiles)
+            pending = [name for name, _ in self._profiles.values()]
+        if pending:
+            self.logger.warning(f"以下线程未在 {DETACH_TIMEOUT} 秒内交回分析数据: {', '.join(pending)}")
+
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            for name, profiles in results.items():
+                self._write_profile(output_dir, name, profiles)
+            self._write_memory(output_dir, snapshots)
+            self.logger.info(f"性能分析结果已写入 {output_dir}")
+        except Exception as e:
+            self.logger.error(f"写入性能分析结果失败: {e}")
+        finally:
+            with self._lock:
+                self._thread = None
+
+    def _write_profile(self, output_dir, name, profiles):
+        with open(os.path.join(output_dir, f'{name}.txt'), 'w', encoding='utf-8') as f:
+            stats = pstats.Stats(*profiles, stream=f)
+            stats.dump_stats(os.path.join(output_dir, f'{name}.prof'))
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+
+    def _write_memory(self, output_dir, snapshots):
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                   tracemalloc.Filter(False, __file__),
+                   tracemalloc.Filter(False, '<frozen importlib._bootstrap>')]
+        snapshots = [(offset, snapshot.filter_traces(filters)) for offset, snapshot in snapshots]
+        with open(os.path.join(output_dir, 'memory.txt'), 'w', encoding='utf-8') as f:
+            for (_, previous), (offset, current) in zip(snapshots, snapshots[1:]):
+                total = sum(stat.size for stat in current.statistics('filename'))
+                f.write(f"== {offset:.1f}s: 当前跟踪 {total / 1024:.1f} KiB ==\n")
+                for stat in current.compare_to(previous, 'lineno')[:self.top_n]:
+                    f.write(f"{stat}\n")
+                f.write("\n")
+            if len(snapshots) > 2:
+                f.write("== 整个时间窗口 ==\n")
+                for stat in snapshots[-1][1].compare_to(snapshots[0][1], 'lineno')[:self.top_n]:
+                    f.write(f"{stat}\n")
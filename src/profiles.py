@@ -0,0 +1,267 @@
+"""
+代理方案模块 - 根据网络指纹自动选择代理端口和写入目标
+"""
+import re
+import socket
+import ipaddress
+import platform
+import subprocess
+import logging
+from collections import namedtuple
+
+import psutil
+
+from src.git_proxy import DEFAULT_PROXY_TARGETS
+
+# 网络指纹: 适配器名称, 所在网段 (CIDR), 网关MAC地址, 无线网络SSID；无法获取的字段为 None
+NetworkFingerprint = namedtuple('NetworkFingerprint', ['adapter', 'subnet', 'gateway_mac', 'ssid'])
+
+# 代理方案: 名称, 端口 (None 表示使用界面中的端口), 写入的 Git 配置键 (None 表示默认键)
+ProxyProfile = namedtuple('ProxyProfile', ['name', 'port', 'targets'])
+
+MATCH_FIELDS = NetworkFingerprint._fields
+
+_CREATE_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+
+def _normalize_mac(mac):
+    return mac.strip().lower().replace('-', ':') if mac else None
+
+
+def _run(args):
+    """
+    运行外部命令并返回标准输出，失败时返回空字符串
+    """
+    try:
+        return subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                              timeout=2, creationflags=_CREATE_NO_WINDOW).stdout
+    except Exception:
+        return ''
+
+
+def _get_subnet(ip, adapter_name):
+    for addr in psutil.net_if_addrs().get(adapter_name, []):
+        if addr.family == socket.AF_INET and addr.address == ip and addr.netmask:
+            return str(ipaddress.ip_interface(f"{ip}/{addr.netmask}").network)
+    return None
+
+
+def _get_gateway_mac(ip, adapter_name):
+    if platform.system() == "Linux":
+        gateway = None
+        try:
+            with open('/proc/net/route') as f:
+                for line in f.readlines()[1:]:
+                    fields = line.split()
+                    if fields[0] == adapter_name and fields[1] == '00000000':
+                        gateway = socket.inet_ntoa(int(fields[2], 16).to_bytes(4, 'little'))
+                        break
+            if gateway:
+                with open('/proc/net/arp') as f:
+                    for line in f.readlines()[1:]:
+                        fields = line.split()
+                        if fields[0] == gateway and fields[3] != '00:00:00:00:00:00':
+                            return _normalize_mac(fields[3])
+        except (OSError, IndexError, ValueError):
+            pass
+        return None
+    if platform.system() == "Windows":
+        # 路由表的 Interface 列是该接口的本机地址，只取所选适配器的默认路由
+        match = re.search(rf'^\s*0\.0\.0\.0\s+0\.0\.0\.0\s+(\d+\.\d+\.\d+\.\d+)\s+{re.escape(ip)}\s',
+                          _run(['route', 'print', '-4', '0.0.0.0']), re.M)
+        if match:
+            gateway = match.group(1)
+            mac = re.search(rf'^\s*{re.escape(gateway)}\s+([0-9a-fA-F-]{{17}})',
+                            _run(['arp', '-a', gateway, '-N', ip]), re.M)
+            if mac:
+                return _normalize_mac(mac.group(1))
+    return None
+
+
+def _get_ssid(adapter_name):
+    if platform.system() == "Windows":
+        current_name = None
+        for line in _run(['netsh', 'wlan', 'show', 'interfaces']).splitlines():
+            key, _, value = line.partition(':')
+            key, value = key.strip(), value.strip()
+            if key == 'Name':
+                current_name = value
+            elif key == 'SSID' and current_name == adapter_name:
+                return value or None
+        return None
+    if platform.system() == "Linux":
+        return _run(['iwgetid', adapter_name, '-r']).strip() or None
+    return None
+
+
+def collect_fingerprint(ip, adapter_name):
+    """
+    采集当前网络的指纹
+
+    Args:
+        ip: 当前IP地址
+        adapter_name: 适配器名称
+
+    Returns:
+        NetworkFingerprint: 网络指纹
+    """
+    return NetworkFingerprint(adapter_name, _get_subnet(ip, adapter_name),
+                              _get_gateway_mac(ip, adapter_name), _get_ssid(adapter_name))
+
+
+class ProfileManager:
+    def __init__(self, config_manager, filename='profiles.json'):
+        """
+        初始化代理方案管理器
+
+        配置文件格式::
+
+            {"profiles": [{"name": "校园网", "port": "7890",
+                           "targets": ["http.proxy", "https.proxy"],
+                           "match": {"ssid": "CampusNet"}}]}
+
+        match 中可以使用 adapter、subnet、gateway_mac、ssid 任意组合，
+        条件越多的方案优先级越高，条件数相同时按配置顺序。
+
+        Args:
+            config_manager: 配置管理器实例
+            filename: 配置目录下的方案文件名
+        """
+        self.config_manager = config_manager
+        self.filename = filename
+        self.logger = logging.getLogger('profile_manager')
+        self._table = []
+        self._targets = set()
+        self._cache = {}
+        self.active_profile = None
+        self.reload()
+
+    def reload(self):
+        """
+        重新读取方案配置并编译规则表
+        """
+        data = self.config_manager.load_json(self.filename, default={}) or {}
+        groups = {}
+        # 未匹配和未指定目标的方案写入默认键，切换到自定义目标的方案时也要删除它们
+        targets = set(DEFAULT_PROXY_TARGETS)
+        for entry in data.get('profiles', []):
+            match = entry.get('match') or {}
+            unknown = set(match) - set(MATCH_FIELDS)
+            if unknown or not match:
+                self.logger.warning(f"忽略无效的代理方案 {entry.get('name')}: 匹配条件 {match}")
+                continue
+            profile = ProxyProfile(entry.get('name', ''), entry.get('port'),
+                                   tuple(entry['targets']) if entry.get('targets') else None)
+            targets.update(profile.targets or ())
+            signature = tuple(i for i, field in enumerate(MATCH_FIELDS) if field in match)
+            key = tuple(_normalize_mac(match[MATCH_FIELDS[i]]) if MATCH_FIELDS[i] == 'gateway_mac'
+                        else str(match[MATCH_FIELDS[i]]) for i in signature)
+            # 同一条件组合下先出现的方案优先
+            groups.setdefault(signature, {}).setdefault(key, profile)
+
+        # 条件越多越具体，优先匹配；dict 保持插入顺序，sorted 是稳定排序
+        self._table = sorted(groups.items(), key=lambda item: -len(item[0]))
+        self._targets = targets
+        self._cache = {}
+        self.logger.info(f"已加载 {sum(len(t) for _, t in self._table)} 个代理方案")
+
+    @property
+    def has_profiles(self):
+        return bool(self._table)
+
+    def all_targets(self):
+        """
+        获取所有方案使用过的配置键 (包括默认的 http.proxy 和 https.proxy)
+
+        Returns:
+            set: 配置键集合
+        """
+        return set(self._targets)
+
+    def get(self, name):
+        """
+        按名称获取代理方案
+
+        Args:
+            name: 方案名称
+
+        Returns:
+            ProxyProfile: 找不到时返回 None
+        """
+        for _, rules in self._table:
+            for profile in rules.values():
+                if profile.name == name:
+                    return profile
+        return None
+
+    def select(self, fingerprint):
+        """
+        根据网络指纹选择代理方案
+
+        Args:
+            fingerprint: NetworkFingerprint 实例
+
+        Returns:
+            ProxyProfile: 匹配的方案，没有匹配时返回 None
+        """
+        if fingerprint in self._cache:
+            return self._cache[fingerprint]
+        profile = None
+        for signature, rules in self._table:
+            key = tuple(fingerprint[i] for i in signature)
+            if None not in key and key in rules:
+                profile = rules[key]
+                break
+        if len(self._cache) > 64:
+            self._cache.clear()
+        self._cache[fingerprint] = profile
+        return profile
+
+    def match(self, ip, adapter_name):
+        """
+        采集网络指纹并选择方案，结果同时记录在 active_profile 中
+
+        Args:
+            ip: 当前IP地址
+            adapter_name: 适配器名称
+
+        Returns:
+            ProxyProfile: 匹配的方案，没有匹配时返回 None
+        """
+        if not self.has_profiles:
+            # 没有方案时不必采集指纹 (在 Windows 上需要启动多个外部命令)
+            self.active_profile = None
+            return None
+        fingerprint = collect_fingerprint(ip, adapter_name)
+        profile = self.select(fingerprint)
+        self.active_profile = profile
+        if profile is None:
+            self.logger.info(f"网络 {fingerprint} 未匹配任何代理方案，使用默认设置")
+        else:
+            self.logger.info(f"网络 {fingerprint} 匹配代理方案: {profile.name}")
+        return profile
+
+    def apply(self, ip, adapter_name, default_port, git_proxy_manager, proxy_host=None):
+        """
+        选择与当前网络匹配的方案，并将其端口和目标一次性写入 Git 配置
+
+        Args:
+            ip: 当前IP地址
+            adapter_name: 适配器名称
+            default_port: 没有匹配方案或方案未指定端口时使用的端口
+            git_proxy_manager: Git代理管理器实例
+            proxy_host: 代理所在的主机 (可选)，默认为本机IP；指定时 default_port 是该主机上
+                        实际发现的端口，优先于方案中的端口
+
+        Returns:
+            bool: 是否成功更新代理
+        """
+        host = proxy_host or ip
+        if not self.has_profiles:
+            return git_proxy_manager.update_proxy(host, default_port)
+
+        profile = self.match(ip, adapter_name)
+        if profile is None:
+            return git_proxy_manager.apply_proxy(host, default_port, stale_keys=self._targets)
+        port = default_port if proxy_host else profile.port or default_port
+        return git_proxy_manager.apply_proxy(host, port, profile.targets, stale_keys=self._targets)
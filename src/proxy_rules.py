@@ -0,0 +1,178 @@
+"""
+代理规则模块 - 按远程地址设置代理，内网主机直连
+
+规则写入 Git 的 http.<url>.proxy 键，值为空字符串表示该地址不走代理。
+"""
+import re
+import ipaddress
+import logging
+from urllib.parse import urlsplit
+
+
+class BypassMatcher:
+    def __init__(self, entries):
+        """
+        将绕过列表编译为快速匹配器
+
+        支持的写法:
+            - "gitlab.campus.edu"  该域名及其所有子域名
+            - ".campus.edu"        同上
+            - "*.lan"              仅子域名
+            - "git*.campus.edu"    其他通配符
+            - "10.0.0.0/8"         CIDR 网段 (仅匹配 IP 形式的主机)
+            - "192.168.1.10"       单个 IP
+
+        Args:
+            entries: 绕过列表
+        """
+        self.entries = list(entries)
+        self.domains = set()
+        self.subdomain_only = set()
+        self.networks = []
+        patterns = []
+        for entry in self.entries:
+            entry = entry.strip().lower()
+            if not entry:
+                continue
+            try:
+                self.networks.append(ipaddress.ip_network(entry, strict=False))
+                continue
+            except ValueError:
+                pass
+            if entry.startswith('*.') and '*' not in entry[2:]:
+                self.subdomain_only.add(entry[2:])
+            elif '*' in entry or '?' in entry:
+                patterns.append(re.escape(entry).replace(r'\*', '[^.]*').replace(r'\?', '.'))
+            else:
+                self.domains.add(entry.lstrip('.'))
+        self._pattern = re.compile('^(?:' + '|'.join(patterns) + ')$') if patterns else None
+        self.has_patterns = self._pattern is not None
+
+    def matches(self, host):
+        """
+        判断主机是否应绕过代理
+
+        Args:
+            host: 主机名或 IP 地址
+
+        Returns:
+            bool: 是否绕过代理
+        """
+        host = host.strip('[]').lower().rstrip('.')
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            address = None
+        if address is not None:
+            return host in self.domains or any(address in network for network in self.networks)
+
+        if host in self.domains:
+            return True
+        # 逐级检查父域名，例如 a.b.c -> b.c -> c
+        labels = host.split('.')
+        for i in range(1, len(labels)):
+            suffix = '.'.join(labels[i:])
+            if suffix in self.domains or suffix in self.subdomain_only:
+                return True
+        return bool(self._pattern and self._pattern.match(host))
+
+
+class ProxyRuleEngine:
+    def __init__(self, config_manager, filename='proxy_rules.json', state_filename='proxy_rules_applied.json'):
+        """
+        初始化代理规则引擎
+
+        配置文件格式::
+
+            {"bypass": ["gitlab.campus.edu", "*.lan", "10.0.0.0/8"],
+             "remotes": {"https://10.1.2.3/": "direct",
+                         "https://github.com/": "proxy",
+                         "https://mirror.example.com/": "http://10.0.0.5:3128"}}
+
+        remotes 中列出的地址会单独生成规则；值为 "auto" 时按绕过列表判断，
+        这也是 CIDR 网段生效的方式 (Git 的 URL 匹配不支持网段)。
+
+        Args:
+            config_manager: 配置管理器实例
+            filename: 规则配置文件名
+            state_filename: 记录上次写入了哪些键的文件名
+        """
+        self.config_manager = config_manager
+        self.filename = filename
+        self.state_filename = state_filename
+        self.logger = logging.getLogger('proxy_rules')
+        self.reload()
+
+    def reload(self):
+        """
+        重新读取规则并编译绕过列表
+        """
+        config = self.config_manager.load_json(self.filename, default={}) or {}
+        self.matcher = BypassMatcher(config.get('bypass', []))
+        self.remotes = config.get('remotes', {}) or {}
+
+    @property
+    def has_rules(self):
+        """
+        是否有需要写入或清理的规则
+        """
+        return bool(self.matcher.entries or self.remotes
+                    or self.config_manager.load_json(self.state_filename, default=[]))
+
+    def build_changes(self, proxy):
+        """
+        生成所有规则对应的 Git 配置修改
+
+        Args:
+            proxy: 代理地址，例如 http://1.2.3.4:7890
+
+        Returns:
+            dict: {键: 值}，值为 None 表示删除上次写入但已不再需要的键
+        """
+        rules = self._rules(proxy, warn=True)
+        previous = self.config_manager.load_json(self.state_filename, default=[]) or []
+        changes = {key: None for key in previous if key not in rules}
+        changes.update(rules)
+        return changes
+
+    def owned_keys(self):
+        """
+        获取规则写入的配置键，其他组件 (如路由选择器) 不应再写入这些键
+
+        Returns:
+            set: 配置键集合
+        """
+        return set(self._rules(''))
+
+    def _rules(self, proxy, warn=False):
+        rules = {}
+        for domain in sorted(self.matcher.domains):
+            for scheme in ('https', 'http'):
+                rules[f'http.{scheme}://{domain}.proxy'] = ''
+                rules[f'http.{scheme}://*.{domain}.proxy'] = ''
+        for domain in sorted(self.matcher.subdomain_only):
+            for scheme in ('https', 'http'):
+                rules[f'http.{scheme}://*.{domain}.proxy'] = ''
+        if self.matcher.has_patterns and warn:
+            self.logger.debug("复杂通配符只对 remotes 中列出的地址生效")
+
+        for url, mode in self.remotes.items():
+            host = urlsplit(url).hostname
+            if not host:
+                if warn:
+                    self.logger.warning(f"忽略无效的远程地址: {url}")
+                continue
+            if mode == 'auto':
+                mode = 'direct' if self.matcher.matches(host) else 'proxy'
+            rules[f'http.{url}.proxy'] = '' if mode == 'direct' else proxy if mode == 'proxy' else mode
+        return rules
+
+    def commit(self, changes):
+        """
+        记录已写入的规则键，下次生成时据此删除过期的键
+
+        Args:
+            changes: build_changes 返回并已成功写入的修改
+        """
+        self.config_manager.save_json(self.state_filename,
+                                      sorted(key for key, value in changes.items() if value is not None))
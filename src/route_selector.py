@@ -0,0 +1,342 @@
+"""
+路由选择模块 - 测量直连和经代理访问各 Git 主机的延迟，为每个主机选择更快的路由
+
+TCP 连接和 TLS 握手的耗时分别测量并分别用 EWMA 平滑，按两者之和选择路由，并带有迟滞，
+只有另一条路由明显更快时才切换，切换结果写入 Git 的 http.<url>.proxy 键。
+"""
+import ssl
+import time
+import socket
+import asyncio
+import threading
+import logging
+from urllib.parse import urlsplit
+from collections import namedtuple
+
+from src.failover import DIRECT
+
+ROUTE_DIRECT = 'direct'
+ROUTE_PROXY = 'proxy'
+
+# 一次测量的耗时 (秒): TCP 连接 (经代理时包括 CONNECT 请求), TLS 握手 (http 地址为 0)
+RouteTiming = namedtuple('RouteTiming', ['connect', 'tls'])
+
+
+def _tls_context():
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+async def _connect(address):
+    loop = asyncio.get_running_loop()
+    family, type_, proto, _, sockaddr = (await loop.getaddrinfo(*address, type=socket.SOCK_STREAM))[0]
+    sock = socket.socket(family, type_, proto)
+    sock.setblocking(False)
+    try:
+        await loop.sock_connect(sock, sockaddr)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+async def _proxy_connect(sock, host, port):
+    loop = asyncio.get_running_loop()
+    await loop.sock_sendall(sock, f'CONNECT {host}:{port} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n'.encode())
+    response = b''
+    while b'\r\n\r\n' not in response:
+        data = await loop.sock_recv(sock, 4096)
+        if not data:
+            raise ConnectionError("代理在 CONNECT 完成前关闭了连接")
+        response += data
+    status_line = response.split(b'\r\n', 1)[0]
+    status = status_line.split()
+    if len(status) < 2 or status[1] != b'200':
+        raise ConnectionError(f"代理拒绝 CONNECT: {status_line!r}")
+
+
+async def _measure(url, proxy):
+    parts = urlsplit(url)
+    host = parts.hostname
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    start = time.perf_counter()
+    sock = await _connect(proxy or (host, port))
+    writer = None
+    try:
+        if proxy:
+            await _proxy_connect(sock, host, port)
+        connected = time.perf_counter()
+        if parts.scheme == 'https':
+            # open_connection 在 TLS 握手完成后返回，之后套接字归该连接所有
+            _, writer = await asyncio.open_connection(sock=sock, ssl=_tls_context(), server_hostname=host)
+        return RouteTiming(connected - start, time.perf_counter() - connected)
+    finally:
+        if writer is not None:
+            writer.close()
+        else:
+            sock.close()
+
+
+async def measure_route(url, proxy=None, timeout=3.0):
+    """
+    测量一次访问某主机的 TCP 连接和 TLS 握手耗时 (协程)
+
+    Args:
+        url: 目标地址，例如 https://github.com/
+        proxy: 代理 (ip, port)，为 None 时直连
+        timeout: 超时时间 (秒)
+
+    Returns:
+        RouteTiming: 各阶段耗时，失败时抛出 OSError 或 asyncio.TimeoutError
+    """
+    return await asyncio.wait_for(_measure(url, proxy), timeout)
+
+
+class RouteSelector:
+    def __init__(self, git_proxy_manager, hosts, interval=60.0, alpha=0.3, hysteresis=0.2,
+                 timeout=3.0, min_samples=3, failover=None, config_manager=None,
+                 state_filename='route_selection_applied.json'):
+        """
+        初始化路由选择器
+
+        Args:
+            git_proxy_manager: Git代理管理器实例，用于写入 http.<url>.proxy；
+                               其代理规则引擎中已有规则的地址不再由路由选择器写入
+            hosts: 需要测量的 Git 主机地址列表
+            interval: 测量间隔 (秒)
+            alpha: EWMA 平滑系数
+            hysteresis: 迟滞比例，另一条路由至少快这么多才切换
+            timeout: 单次测量超时 (秒)，失败的测量按该值计入
+            min_samples: 做出第一次选择前需要的测量次数
+            failover: 故障转移链 (可选)，提供时测量和写入都使用链上当前生效的代理
+            config_manager: 配置管理器实例 (可选)，用于记录上次写入了哪些键
+            state_filename: 记录上次写入的键的文件名
+        """
+        self.git_proxy_manager = git_proxy_manager
+        self.failover = failover
+        self.config_manager = config_manager
+        self.state_filename = state_filename
+        self.hosts = list(hosts)
+        self.interval = interval
+        self.alpha = alpha
+        self.hysteresis = hysteresis
+        self.timeout = timeout
+        self.min_samples = min_samples
+        self.logger = logging.getLogger('route_selector')
+        # {(地址, 路由): RouteTiming}，两个阶段分别平滑
+        self.ewma = {}
+        self.samples = {}
+        self.routes = {}
+        self._proxy = None
+        self._git_proxy = None
+        self._fixed_git_proxy = False
+        # 上次写入的 {键: 值}；重启后只知道写过哪些键，值留空以便重新写入
+        self._written = dict.fromkeys(config_manager.load_json(state_filename, default=[]) or []
+                                      if config_manager else [])
+        self._lock = threading.Lock()
+        # set_proxy、故障转移监听器和测量都会改写路由，_written 的读取和更新需要串行
+        self._write_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._timer = None
+        self.runtime = None
+
+    def set_proxy(self, ip, port, git_proxy=None):
+        """
+        设置当前代理地址，选择了代理路由的主机会立即改写为新地址
+
+        Args:
+            ip: 代理IP地址
+            port: 代理端口
+            git_proxy: 写入 Git 的代理地址，默认为 http://ip:port
+        """
+        with self._lock:
+            self._proxy = (ip, int(port))
+            self._git_proxy = git_proxy or f'http://{ip}:{port}'
+            self._fixed_git_proxy = git_proxy is not None
+        self._write_routes()
+
+    def on_failover(self, entry):
+        """
+        故障转移链切换后立即按新的代理改写
+        """
+        self._write_routes()
+
+    def current_proxy(self):
+        """
+        获取当前生效的代理
+
+        Returns:
+            tuple: (测量用的代理 (ip, port) 或 None, 写入 Git 的代理地址；故障转移为直连时为空字符串，
+                   尚未设置代理时为 None)
+        """
+        with self._lock:
+            proxy, git_proxy, fixed = self._proxy, self._git_proxy, self._fixed_git_proxy
+        active = self.failover.active if self.failover else None
+        if git_proxy is None or active is None:
+            return proxy, git_proxy
+        if active == DIRECT:
+            # 所有代理都不可用，选择了代理路由的主机也改为直连
+            return None, ''
+        # 转发代理的地址不变，由故障转移链切换其上游
+        return active, git_proxy if fixed else f'http://{active[0]}:{active[1]}'
+
+    def start(self, runtime=None):
+        """
+        启动后台测量
+
+        Args:
+            runtime: 核心运行时 (可选)，提供时测量在其事件循环上进行，写入经由其写入通道，不再单独创建线程
+        """
+        if self._thread or self._timer or not self.hosts:
+            return
+        if runtime:
+            self.runtime = runtime
+            self._timer = runtime.every(self.interval, self.sample_async, name='route_selector')
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name='route-selector', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止后台测量
+        """
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def sample_once(self):
+        """
+        并行测量所有主机的两条路由并更新 EWMA 和路由选择 (在没有运行事件循环的线程中调用)
+        """
+        self._record(asyncio.run(self._measure_all()))
+        self._write_routes()
+
+    async def sample_async(self):
+        """
+        与 sample_once 相同，但在核心运行时的事件循环上测量，写入经由写入通道执行
+        """
+        self._record(await self._measure_all())
+        await self.runtime.run_write(self._write_routes)
+
+    async def _measure_all(self):
+        proxy = self.current_proxy()[0]
+        keys = [(url, ROUTE_DIRECT) for url in self.hosts]
+        if proxy:
+            keys += [(url, ROUTE_PROXY) for url in self.hosts]
+        results = await asyncio.gather(*(measure_route(url, proxy if route == ROUTE_PROXY else None, self.timeout)
+                                         for url, route in keys), return_exceptions=True)
+        return dict(zip(keys, results))
+
+    def _record(self, results):
+        for key, latency in results.items():
+            if isinstance(latency, BaseException):
+                self.logger.debug(f"测量 {key[0]} ({key[1]}) 失败: {latency!r}")
+                latency = RouteTiming(self.timeout, 0.0)
+            previous = self.ewma.get(key)
+            self.ewma[key] = latency if previous is None else RouteTiming(
+                *(self.alpha * now + (1 - self.alpha) * before for now, before in zip(latency, previous)))
+            self.samples[key] = self.samples.get(key, 0) + 1
+        for url in self.hosts:
+            self._choose(url)
+
+    def _choose(self, url):
+        direct_timing = self.ewma.get((url, ROUTE_DIRECT))
+        proxy_timing = self.ewma.get((url, ROUTE_PROXY))
+        if direct_timing is None or proxy_timing is None:
+            return
+        direct, via_proxy = sum(direct_timing), sum(proxy_timing)
+        if min(self.samples[(url, ROUTE_DIRECT)], self.samples[(url, ROUTE_PROXY)]) < self.min_samples:
+            return
+        current = self.routes.get(url)
+        if current is None:
+            best = ROUTE_DIRECT if direct < via_proxy else ROUTE_PROXY
+        else:
+            current_latency = direct if current == ROUTE_DIRECT else via_proxy
+            other = ROUTE_PROXY if current == ROUTE_DIRECT else ROUTE_DIRECT
+            other_latency = via_proxy if current == ROUTE_DIRECT else direct
+            best = other if other_latency < current_latency * (1 - self.hysteresis) else current
+        if best != current:
+            self.logger.info(f"{url} 路由切换为 {best} (直连 {self._describe(direct_timing)}, "
+                             f"代理 {self._describe(proxy_timing)})")
+            self.routes[url] = best
+
+    def _describe(self, timing):
+        return f"连接 {timing.connect * 1000:.0f}ms + TLS {timing.tls * 1000:.0f}ms"
+
+    def _write_routes(self):
+        with self._write_lock:
+            self._write_routes_locked()
+
+    def _write_routes_locked(self):
+        git_proxy = self.current_proxy()[1]
+        if git_proxy is None:
+            return
+        rule_engine = self.git_proxy_manager.rule_engine
+        owned = rule_engine.owned_keys() if rule_engine else set()
+        desired = {}
+        for url, route in self.routes.items():
+            key = f'http.{url}.proxy'
+            if key in owned:
+                continue
+            desired[key] = '' if route == ROUTE_DIRECT else git_proxy
+        # 仍在配置中但尚未做出选择的主机 (例如刚重启) 保留上次写入的键
+        pending = {f'http.{url}.proxy' for url in self.hosts if url not in self.routes}
+        target = {key: value for key, value in self._written.items() if key in pending and key not in owned}
+        target.update(desired)
+        if target == self._written:
+            return
+        # 不再需要的键 (主机已从配置中删除或改由代理规则管理) 删除；代理规则的键由规则引擎维护
+        changes = {key: None for key in self._written if key not in target and key not in owned}
+        changes.update(desired)
+        if self.git_proxy_manager.apply_settings(changes):
+            self._written = target
+            if self.config_manager:
+                self.config_manager.save_json(self.state_filename, sorted(target))
+
+    def _sample_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.sample_once()
+            except Exception as e:
+                self.logger.error(f"路由测量失败: {e}")
+            self._stop_event.wait(self.interval)
+
+
+def create_route_selector(config_manager, git_proxy_manager, failover=None, filename='route_selection.json'):
+    """
+    根据配置创建路由选择器
+
+    配置文件格式::
+
+        {"enabled": true, "hosts": ["https://github.com/", "https://gitee.com/"],
+         "interval": 60, "alpha": 0.3, "hysteresis": 0.2, "timeout": 3}
+
+    Args:
+        config_manager: 配置管理器实例
+        git_proxy_manager: Git代理管理器实例
+        failover: 故障转移链 (可选)
+        filename: 配置目录下的配置文件名
+
+    Returns:
+        RouteSelector: 未启用时返回 None
+    """
+    config = config_manager.load_json(filename, default={}) or {}
+    if not config.get('enabled') or not config.get('hosts'):
+        return None
+    selector = RouteSelector(git_proxy_manager, config['hosts'],
+                             interval=float(config.get('interval', 60)),
+                             alpha=float(config.get('alpha', 0.3)),
+                             hysteresis=float(config.get('hysteresis', 0.2)),
+                             timeout=float(config.get('timeout', 3)),
+                             failover=failover, config_manager=config_manager)
+    if failover:
+        failover.add_listener(selector.on_failover)
+    return selector
@@ -0,0 +1,245 @@
+"""
+核心运行时模块 - 在独立线程上运行一个 asyncio 事件循环，统一调度后台工作
+
+变化检测、防抖、Git 和配置文件写入、健康检查以及各种定时任务都挂在这个循环上，
+不再各自创建线程:
+    - 阻塞调用通过 run_in_executor 放到共享线程池中执行
+    - 所有写操作经由单线程的写入通道，按提交顺序依次执行
+    - 定时任务和防抖任务由同一个调度器 (scheduler.TimerScheduler) 管理，相近的唤醒会被合并
+    - 需要更新界面时通过 post_ui 交给界面线程 (未设置界面桥接时直接调用，便于无界面测试)
+    - 提交到线程池的函数在提交时的 contextvars 上下文中执行，追踪等上下文可以跨线程传递
+"""
+import asyncio
+import contextvars
+import inspect
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from src.scheduler import TimerScheduler
+
+DEFAULT_WORKERS = 4
+
+
+class CoreRuntime:
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        """
+        初始化核心运行时
+
+        Args:
+            max_workers: 执行阻塞调用的线程池大小
+        """
+        self.logger = logging.getLogger('runtime')
+        self.loop = None
+        self._max_workers = max_workers
+        self._executor = None
+        self._write_executor = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._tasks = set()
+        self.scheduler = TimerScheduler()
+        self._debounced = {}
+        self._debounce_lock = threading.Lock()
+        self._ui_post = None
+        self._profiler = None
+
+    @property
+    def is_running(self):
+        """
+        事件循环是否正在运行
+        """
+        return self._thread is not None
+
+    def start(self):
+        """
+        在后台线程中启动事件循环
+        """
+        if self._thread:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='core-io')
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='core-write')
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='core-runtime', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout=2.0):
+        """
+        取消所有任务并停止事件循环
+
+        Args:
+            timeout: 等待事件循环线程退出的时间 (秒)
+        """
+        if not self._thread:
+            return
+        stats = self.scheduler.get_stats()
+        self.logger.info(f"定时调度: 唤醒 {stats['wakeups']} 次 (每分钟 {stats['wakeups_per_minute']:.1f} 次)")
+        for name, task in stats['tasks'].items():
+            self.logger.info(f"定时任务 {name}: 执行 {task['runs']} 次，平均耗时 {task['avg_ms']:.1f}ms，"
+                             f"最长 {task['max_ms']:.1f}ms，平均延迟 {task['avg_lag_ms']:.1f}ms，失败 {task['errors']} 次")
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_all(), self.loop).result(timeout)
+        except Exception as e:
+            self.logger.debug(f"取消任务时出错: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self._executor.shutdown(wait=False)
+        self._write_executor.shutdown(wait=False)
+
+    def set_ui_bridge(self, post):
+        """
+        设置界面桥接函数
+
+        Args:
+            post: 形如 post(func, *args) 的线程安全函数，负责在界面线程上执行 func(*args)
+        """
+        self._ui_post = post
+
+    def set_profiler(self, profiler):
+        """
+        设置性能分析器，之后定时任务的每次执行都会按任务名汇总分析结果
+
+        Args:
+            profiler: profiler.RuntimeProfiler 实例
+        """
+        self._profiler = profiler
+
+    def post_ui(self, func, *args):
+        """
+        在界面线程上执行函数 (可在任意线程调用)
+
+        Args:
+            func: 要执行的函数
+            *args: 函数参数
+        """
+        if self._ui_post:
+            self._ui_post(func, *args)
+        else:
+            func(*args)
+
+    def submit(self, coro):
+        """
+        从任意线程向事件循环提交协程
+
+        Args:
+            coro: 协程对象
+
+        Returns:
+            concurrent.futures.Future: 可用于等待结果或取消
+        """
+        return asyncio.run_coroutine_threadsafe(self._track(coro), self.loop)
+
+    def call(self, func, *args):
+        """
+        从任意线程提交阻塞函数，在线程池中执行
+
+        Args:
+            func: 阻塞函数
+            *args: 函数参数
+
+        Returns:
+            concurrent.futures.Future: 函数结果
+        """
+        return self.submit(self.run_blocking(func, *args))
+
+    def write(self, func, *args):
+        """
+        从任意线程提交写操作，所有写操作按提交顺序依次执行
+
+        Args:
+            func: 执行写入的阻塞函数
+            *args: 函数参数
+
+        Returns:
+            concurrent.futures.Future: 函数结果
+        """
+        return self.submit(self.run_write(func, *args))
+
+    async def run_blocking(self, func, *args):
+        """
+        在线程池中执行阻塞函数 (在事件循环中 await)
+        """
+        context = contextvars.copy_context()
+        return await self.loop.run_in_executor(self._executor, context.run, func, *args)
+
+    async def run_write(self, func, *args):
+        """
+        在写入通道中执行阻塞函数 (在事件循环中 await)
+        """
+        context = contextvars.copy_context()
+        return await self.loop.run_in_executor(self._write_executor, context.run, func, *args)
+
+    def every(self, interval, func, *args, name=None, initial_delay=0, slack=None, jitter=0.0):
+        """
+        定期执行函数，上一次执行完成后才开始计算下一次的间隔
+
+        Args:
+            interval: 间隔 (秒)
+            func: 阻塞函数或协程函数
+            *args: 函数参数
+            name: 任务名称，用于日志和统计
+            initial_delay: 首次执行前的延迟 (秒)
+            slack: 允许偏移的时间 (秒)，用于与其他任务合并唤醒，默认为间隔的 25% (不超过 1 秒)
+            jitter: 间隔的随机抖动比例 (0~1)
+
+        Returns:
+            ScheduledTask: 调用 cancel() 即可停止
+        """
+        name = name or getattr(func, '__name__', 'timer')
+        return self.scheduler.every(interval, lambda: self._invoke(name, func, *args), name=name,
+                                    initial_delay=initial_delay, slack=slack, jitter=jitter)
+
+    def debounce(self, key, delay, func, *args):
+        """
+        防抖: 同一个 key 在 delay 秒内的多次调用只执行最后一次，执行经由写入通道
+
+        Args:
+            key: 防抖键
+            delay: 延迟 (秒)
+            func: 执行写入的阻塞函数
+            *args: 函数参数
+
+        Returns:
+            ScheduledTask: 被后续调用取代时会被取消
+        """
+        with self._debounce_lock:
+            previous = self._debounced.get(key)
+            if previous is not None:
+                previous.cancel()
+            task = self.scheduler.call_later(delay, self.run_write, func, *args, name=key)
+            self._debounced[key] = task
+        return task
+
+    async def _invoke(self, name, func, *args):
+        if inspect.iscoroutinefunction(func):
+            return await func(*args)
+        if self._profiler:
+            return await self.run_blocking(self._profiler.run, name, func, *args)
+        return await self.run_blocking(func, *args)
+
+    async def _track(self, coro):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            return await coro
+        finally:
+            self._tasks.discard(task)
+
+    async def _cancel_all(self):
+        self.scheduler.cancel_all()
+        tasks = [task for task in self._tasks if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.set_default_executor(self._executor)
+        self.scheduler.attach(self.loop)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
@@ -0,0 +1,323 @@
+"""
+定时调度模块 - 用一个最小堆统一管理所有周期性和延迟任务，合并相近的唤醒
+
+调度器运行在核心运行时的事件循环上，任意时刻只挂一个事件循环定时器 (最早到期的任务)，
+而不是每个任务各自 sleep:
+    - 每个任务有一个允许偏移的时间 (slack)。到期时间按 slack 取整到全局的时间刻度上
+      (最多提前或推迟 slack)，间隔相同或相近的任务会落在同一个刻度，一次唤醒全部执行
+    - 周期任务在上一次执行完成后才计算下一次的到期时间，可以加入随机抖动 (jitter)，
+      避免多个进程同时探测
+    - 任务可以随时取消；每个任务记录执行次数、耗时和相对到期时间的延迟
+"""
+import time
+import heapq
+import random
+import asyncio
+import inspect
+import itertools
+import threading
+import contextvars
+import logging
+
+# 对齐用的时间刻度 (秒)，任务取整到不超过其 slack 两倍的最大刻度
+ALIGNMENT_QUANTA = (2.0, 1.0, 0.5, 0.2, 0.1, 0.05)
+# 周期任务默认允许偏移的比例和上限
+DEFAULT_SLACK_RATIO = 0.25
+MAX_DEFAULT_SLACK = 1.0
+
+
+def default_slack(interval):
+    """
+    周期任务的默认 slack
+
+    Args:
+        interval: 间隔 (秒)
+
+    Returns:
+        float: slack (秒)
+    """
+    return min(interval * DEFAULT_SLACK_RATIO, MAX_DEFAULT_SLACK)
+
+
+def align(due, slack):
+    """
+    将到期时间取整到最近的刻度，偏移不超过 slack
+
+    取整而不是向后对齐: 周期任务的下一次到期时间从执行完成时算起，总会比上一个刻度
+    晚一点，向后对齐会使其逐渐漂移到下一个刻度。
+
+    Args:
+        due: 到期时间 (事件循环时钟)
+        slack: 允许偏移的时间 (秒)
+
+    Returns:
+        float: 对齐后的时间
+    """
+    for quantum in ALIGNMENT_QUANTA:
+        if quantum <= slack * 2:
+            return round(due / quantum) * quantum
+    return due
+
+
+class ScheduledTask:
+    def __init__(self, scheduler, name, callback, args, interval=None, slack=0.0, jitter=0.0):
+        """
+        调度器中的一个任务
+
+        Args:
+            scheduler: 所属的 TimerScheduler
+            name: 任务名称
+            callback: 在事件循环线程上调用的函数，可以返回协程或 Future，完成后才计算下一次到期时间；
+                      在创建任务时的 contextvars 上下文中调用
+            args: 调用参数
+            interval: 周期 (秒)，为 None 时只执行一次
+            slack: 允许偏移的时间 (秒)
+            jitter: 周期的随机抖动比例 (0~1)
+        """
+        self.scheduler = scheduler
+        self.name = name
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.slack = slack
+        self.jitter = jitter
+        self.due = None
+        self.cancelled = False
+        self.runs = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.total_lag = 0.0
+        self.errors = 0
+        self.context = contextvars.copy_context()
+        self._pending = None
+
+    def cancel(self):
+        """
+        取消任务 (可在任意线程调用)；正在执行的协程也会被取消
+
+        Returns:
+            bool: 取消前任务是否仍有效
+        """
+        if self.cancelled:
+            return False
+        self.cancelled = True
+        self.scheduler._discard(self)
+        return True
+
+    def set_interval(self, interval, slack=None):
+        """
+        修改周期任务的间隔，从下一次重新计算到期时间起生效 (可在任意线程调用)
+
+        Args:
+            interval: 新的间隔 (秒)
+            slack: 允许偏移的时间 (秒)，默认为新间隔的 25% (不超过 1 秒)
+        """
+        self.slack = default_slack(interval) if slack is None else slack
+        self.interval = interval
+
+    def next_delay(self):
+        """
+        计算下一次执行前的间隔 (含抖动)
+        """
+        if not self.jitter:
+            return self.interval
+        return max(self.interval * (1 + random.uniform(-self.jitter, self.jitter)), 0.0)
+
+
+class TimerScheduler:
+    def __init__(self):
+        """
+        初始化调度器，调用 attach 绑定事件循环后开始工作
+        """
+        self.logger = logging.getLogger('scheduler')
+        self.loop = None
+        self.wakeups = 0
+        self._heap = []
+        self._counter = itertools.count()
+        self._handle = None
+        self._handle_when = None
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+    def attach(self, loop):
+        """
+        绑定事件循环
+
+        Args:
+            loop: asyncio 事件循环
+        """
+        self.loop = loop
+        self._started = time.monotonic()
+        self.wakeups = 0
+
+    def call_later(self, delay, callback, *args, name=None, slack=0.0):
+        """
+        延迟执行一次
+
+        Args:
+            delay: 延迟 (秒)
+            callback: 在事件循环线程上调用的函数
+            *args: 调用参数
+            name: 任务名称
+            slack: 允许偏移的时间 (秒)，0 表示准时执行
+
+        Returns:
+            ScheduledTask: 任务句柄
+        """
+        task = ScheduledTask(self, name or getattr(callback, '__name__', 'delayed'), callback, args, slack=slack)
+        self._add(task, delay)
+        return task
+
+    def every(self, interval, callback, *args, name=None, initial_delay=0.0, slack=None, jitter=0.0):
+        """
+        周期执行，上一次执行完成后才开始计算下一次的间隔
+
+        Args:
+            interval: 间隔 (秒)
+            callback: 在事件循环线程上调用的函数
+            *args: 调用参数
+            name: 任务名称
+            initial_delay: 首次执行前的延迟 (秒)
+            slack: 允许偏移的时间 (秒)，默认为间隔的 25% (不超过 1 秒)
+            jitter: 间隔的随机抖动比例 (0~1)
+
+        Returns:
+            ScheduledTask: 任务句柄
+        """
+        task = ScheduledTask(self, name or getattr(callback, '__name__', 'timer'), callback, args,
+                             interval=interval, slack=default_slack(interval) if slack is None else slack,
+                             jitter=jitter)
+        self._add(task, initial_delay)
+        return task
+
+    def cancel_all(self):
+        """
+        取消所有任务
+        """
+        with self._lock:
+            tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+
+    def get_stats(self):
+        """
+        获取调度统计
+
+        Returns:
+            dict: 唤醒次数、每分钟唤醒次数，以及 {任务名称: 执行次数、平均和最长耗时、平均延迟 (毫秒)、错误次数}
+        """
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        with self._lock:
+            tasks = sorted(self._tasks, key=lambda t: t.name)
+        return {
+            'wakeups': self.wakeups,
+            'wakeups_per_minute': self.wakeups / elapsed * 60,
+            'tasks': {task.name: {
+                'runs': task.runs,
+                'avg_ms': task.total_time / task.runs * 1000 if task.runs else 0.0,
+                'max_ms': task.max_time * 1000,
+                'avg_lag_ms': task.total_lag / task.runs * 1000 if task.runs else 0.0,
+                'errors': task.errors,
+            } for task in tasks if task.interval is not None},
+        }
+
+    def _in_loop(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def _add(self, task, delay):
+        with self._lock:
+            self._tasks.add(task)
+        if self._in_loop():
+            self._push(task, delay)
+        else:
+            self.loop.call_soon_threadsafe(self._push, task, delay)
+
+    def _discard(self, task):
+        with self._lock:
+            self._tasks.discard(task)
+        pending = task._pending
+        if pending is not None and self.loop is not None:
+            # 堆中的条目在到期时跳过，这里只需取消正在执行的部分
+            if self._in_loop():
+                pending.cancel()
+            else:
+                self.loop.call_soon_threadsafe(pending.cancel)
+
+    def _push(self, task, delay):
+        if task.cancelled:
+            return
+        task.due = self.loop.time() + delay
+        when = align(task.due, task.slack)
+        heapq.heappush(self._heap, (when, next(self._counter), task))
+        self._arm()
+
+    def _arm(self):
+        """
+        确保事件循环定时器指向堆顶的到期时间
+        """
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            if self._handle:
+                self._handle.cancel()
+                self._handle = self._handle_when = None
+            return
+        when = self._heap[0][0]
+        if self._handle is not None and self._handle_when <= when:
+            return
+        if self._handle:
+            self._handle.cancel()
+        self._handle_when = when
+        self._handle = self.loop.call_at(when, self._wake, when)
+
+    def _wake(self, when):
+        self._handle = self._handle_when = None
+        self.wakeups += 1
+        # 事件循环可能按时钟精度略早触发
+        now = max(self.loop.time(), when)
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        # 唤醒时把已到期的任务一起执行 (包括尚未到达对齐刻度、但已过其原始到期时间的任务)
+        while self._heap and self._heap[0][2].due <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        for task in due:
+            if not task.cancelled:
+                self._run(task, now)
+        self._arm()
+
+    def _run(self, task, now):
+        start = time.perf_counter()
+        task.total_lag += max(now - task.due, 0.0)
+        try:
+            result = task.context.run(task.callback, *task.args)
+        except Exception as e:
+            task.errors += 1
+            self.logger.error(f"定时任务 {task.name} 失败: {e}")
+            result = None
+        if inspect.isawaitable(result):
+            task._pending = task.context.run(asyncio.ensure_future, result)
+            task._pending.add_done_callback(lambda future: self._finished(task, start, future))
+        else:
+            self._finished(task, start, None)
+
+    def _finished(self, task, start, future):
+        task._pending = None
+        elapsed = time.perf_counter() - start
+        task.runs += 1
+        task.total_time += elapsed
+        task.max_time = max(task.max_time, elapsed)
+        if future is not None and not future.cancelled() and future.exception() is not None:
+            task.errors += 1
+            self.logger.error(f"定时任务 {task.name} 失败: {future.exception()}")
+        if task.cancelled:
+            return
+        if task.interval is None:
+            with self._lock:
+                self._tasks.discard(task)
+            return
+        self._push(task, task.next_delay())
@@ -0,0 +1,350 @@
+"""
+服务模块 - 以系统服务方式运行一个网络监控器，一次更新所有登记用户的 Git 代理设置
+
+共享的实验室机器上不再需要每个用户各自运行一份界面轮询同样的网卡:
+    - 中央配置 service.json 登记用户，并可为每个用户单独指定端口、代理方案或写入目标
+    - IP 变化时用原生解析器并行写入各用户的全局 gitconfig，每个文件使用与 git 相同的
+      "<文件>.lock" 锁，避免与用户同时执行的 git config 冲突
+    - 每个文件缓存上次写入的内容和文件状态，内容没有变化且文件未被改动时不再读写
+
+运行方式 (通常需要 root 权限才能写入其他用户的主目录)::
+
+    python run.py --service [--config 配置目录]
+"""
+import os
+import sys
+import json
+import time
+import signal
+import subprocess
+import threading
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config import ConfigManager
+from src.gitconfig import global_config_path
+from src.gitconfig_writer import EXIT_CHANGED, EXIT_UNCHANGED, LOCK_TIMEOUT, write_gitconfig
+from src.git_proxy import DEFAULT_PROXY_TARGETS
+from src.network import NetworkMonitor
+from src.profiles import ProfileManager
+from src.runtime import CoreRuntime
+from src.state_store import StateStore
+from src.status_page import create_status_page
+
+DEFAULT_WORKERS = 8
+# 写入子进程的超时，包括等待文件锁的时间
+WRITER_TIMEOUT = LOCK_TIMEOUT + 10.0
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 登记的用户: 名称, 主目录, 端口 (None 表示使用默认端口), 代理方案名称 (None 表示按网络指纹选择),
+# 写入的 Git 配置键 (None 表示使用方案或默认的键)
+ServiceUser = namedtuple('ServiceUser', ['name', 'home', 'port', 'profile', 'targets'])
+
+
+def resolve_home(name):
+    """
+    获取用户的主目录
+
+    Args:
+        name: 用户名
+
+    Returns:
+        str: 主目录，找不到用户时返回 None
+    """
+    try:
+        import pwd
+        return pwd.getpwnam(name).pw_dir
+    except ImportError:
+        home = os.path.expanduser(f'~{name}')
+        return None if home.startswith('~') else home
+    except KeyError:
+        return None
+
+
+class MultiUserUpdater:
+    def __init__(self, users, default_port, profile_manager=None, max_workers=DEFAULT_WORKERS):
+        """
+        初始化多用户更新器
+
+        Args:
+            users: ServiceUser 列表
+            default_port: 默认端口
+            profile_manager: 代理方案管理器 (可选)
+            max_workers: 并行写入的线程数
+        """
+        self.users = list(users)
+        self.default_port = default_port
+        self.profile_manager = profile_manager
+        self.logger = logging.getLogger('service')
+        self._pool = ThreadPoolExecutor(max_workers=max(min(max_workers, len(self.users)), 1),
+                                        thread_name_prefix='service-write')
+        # 多个用户可能共用同一个文件，同一进程内也需要按文件串行
+        self._file_locks = {}
+        self._file_locks_guard = threading.Lock()
+        # {文件路径: (文件状态, 上次写入的修改)}
+        self._diff_cache = {}
+        # 最近一次写入的代理地址 (按默认端口或匹配的方案，不含用户单独指定的端口)
+        self.proxy = None
+
+    def plan(self, ip, adapter_name):
+        """
+        计算每个用户需要写入的修改
+
+        Args:
+            ip: IP地址
+            adapter_name: 适配器名称
+
+        Returns:
+            list: [(ServiceUser, gitconfig 路径, {键: 值})]
+        """
+        matched = None
+        stale_keys = set()
+        if self.profile_manager and self.profile_manager.has_profiles:
+            stale_keys = self.profile_manager.all_targets()
+            if any(user.profile is None for user in self.users):
+                # 网络指纹对所有用户相同，只采集一次
+                matched = self.profile_manager.match(ip, adapter_name)
+
+        self.proxy = f'http://{ip}:{(matched.port if matched else None) or self.default_port}'
+        plans = []
+        for user in self.users:
+            profile = matched
+            if user.profile is not None:
+                profile = self.profile_manager.get(user.profile) if self.profile_manager else None
+                if profile is None:
+                    self.logger.warning(f"用户 {user.name} 指定的代理方案不存在: {user.profile}")
+            port = user.port or (profile.port if profile else None) or self.default_port
+            targets = user.targets or (profile.targets if profile else None) or DEFAULT_PROXY_TARGETS
+            proxy = f'http://{ip}:{port}'
+            changes = {key: None for key in stale_keys if key not in targets}
+            changes.update({key: proxy for key in targets})
+            plans.append((user, global_config_path(user.home), changes))
+        return plans
+
+    def update(self, ip, adapter_name):
+        """
+        并行更新所有用户的 gitconfig
+
+        Args:
+            ip: IP地址
+            adapter_name: 适配器名称
+
+        Returns:
+            dict: {用户名: 'updated' | 'unchanged' | 'failed'}
+        """
+        if not ip:
+            return {}
+        start = time.perf_counter()
+        plans = self.plan(ip, adapter_name)
+        results = dict(zip([user.name for user, _, _ in plans],
+                           self._pool.map(lambda plan: self._write(*plan), plans)))
+        counts = {state: list(results.values()).count(state) for state in ('updated', 'unchanged', 'failed')}
+        self.logger.info(f"已为 {len(results)} 个用户更新代理 {ip}: 修改 {counts['updated']}，"
+                         f"无变化 {counts['unchanged']}，失败 {counts['failed']}，"
+                         f"耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+        return results
+
+    def stop(self):
+        """
+        停止写入线程池
+        """
+        self._pool.shutdown(wait=True)
+
+    def _file_lock(self, path):
+        with self._file_locks_guard:
+            return self._file_locks.setdefault(path, threading.Lock())
+
+    def _write(self, user, path, changes):
+        try:
+            with self._file_lock(path):
+                cached = self._diff_cache.get(path)
+                if cached and cached[1] == changes and cached[0] == _file_state(path):
+                    return 'unchanged'
+                changed = _run_as(_user_ids(user), path, changes)
+                self._diff_cache[path] = (_file_state(path), changes)
+            if changed:
+                self.logger.info(f"已更新用户 {user.name} 的 Git 配置: {path}")
+            return 'updated' if changed else 'unchanged'
+        except Exception as e:
+            self.logger.error(f"更新用户 {user.name} 的 Git 配置失败: {e}")
+            return 'failed'
+
+
+def _file_state(path):
+    try:
+        stat_result = os.lstat(path)
+        return (stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+    except OSError:
+        return None
+
+
+def _user_ids(user):
+    """
+    获取登记用户的 uid 和 gid: 按用户名查找，找不到时使用主目录的所有者
+
+    Returns:
+        tuple: (uid, gid)，都无法获取时返回 None
+    """
+    try:
+        import pwd
+        entry = pwd.getpwnam(user.name)
+        return entry.pw_uid, entry.pw_gid
+    except (ImportError, KeyError):
+        pass
+    try:
+        stat_result = os.stat(user.home)
+        return stat_result.st_uid, stat_result.st_gid
+    except OSError:
+        return None
+
+
+def _writer_command():
+    if getattr(sys, 'frozen', False):
+        # 打包后的程序没有独立的 Python 解释器，由 run.py 的 --write-gitconfig 进入写入模块
+        return [sys.executable, '--write-gitconfig']
+    return [sys.executable, '-m', 'src.gitconfig_writer']
+
+
+def _run_as(ids, path, changes):
+    """
+    以登记用户的身份执行写入
+
+    以 root 运行时，用户可以把 ~/.gitconfig 或其所在目录换成指向任意位置的符号链接，
+    所以用该用户的 uid 和 gid (不带附加组) 启动写入子进程，写入只能到达该用户自己有权限的文件，
+    新建的文件也直接属于该用户；不是 root 时直接在当前进程中执行。
+    服务进程中有多个线程，不能直接 fork 后继续运行 Python 代码 (子进程可能卡在其他线程持有的锁上)，
+    subprocess 在创建子进程后立即 exec 新的解释器。
+
+    Args:
+        ids: (uid, gid)
+        path: 配置文件路径
+        changes: {键: 值}
+
+    Returns:
+        bool: 内容是否发生变化
+
+    Raises:
+        PermissionError: 以 root 运行但无法确定用户身份
+        OSError: 子进程中的写入失败
+    """
+    if not hasattr(os, 'geteuid') or os.geteuid() != 0:
+        return write_gitconfig(path, changes)
+    if ids is None:
+        raise PermissionError("无法确定用户的 uid，拒绝以 root 身份写入")
+    if ids[0] == 0:
+        return write_gitconfig(path, changes)
+    result = subprocess.run(_writer_command(), input=json.dumps({'path': path, 'changes': changes}),
+                            capture_output=True, text=True, cwd=PROJECT_DIR, timeout=WRITER_TIMEOUT,
+                            user=ids[0], group=ids[1], extra_groups=[])
+    if result.returncode not in (EXIT_CHANGED, EXIT_UNCHANGED):
+        raise OSError(result.stderr.strip() or f"写入进程异常退出 ({result.returncode})")
+    return result.returncode == EXIT_CHANGED
+
+
+def load_users(config):
+    """
+    从服务配置中读取登记的用户
+
+    Args:
+        config: service.json 的内容
+
+    Returns:
+        list: ServiceUser 列表 (找不到主目录的用户会被忽略)
+    """
+    logger = logging.getLogger('service')
+    users = []
+    for entry in config.get('users', []):
+        if isinstance(entry, str):
+            entry = {'name': entry}
+        name = entry.get('name')
+        home = entry.get('home') or (resolve_home(name) if name else None)
+        if not name or not home:
+            logger.warning(f"忽略无效的用户: {entry}")
+            continue
+        targets = tuple(entry['targets']) if entry.get('targets') else None
+        users.append(ServiceUser(name, home, entry.get('port'), entry.get('profile'), targets))
+    return users
+
+
+def create_multi_user_updater(config_manager, profile_manager=None, filename='service.json'):
+    """
+    根据中央配置创建多用户更新器
+
+    配置文件格式::
+
+        {"port": "7890", "max_workers": 8,
+         "users": ["alice",
+                   {"name": "bob", "port": "7891"},
+                   {"name": "carol", "home": "/data/carol", "profile": "校园网"},
+                   {"name": "dave", "targets": ["http.https://github.com.proxy"]}]}
+
+    Args:
+        config_manager: 配置管理器实例
+        profile_manager: 代理方案管理器 (可选)
+        filename: 配置目录下的配置文件名
+
+    Returns:
+        MultiUserUpdater: 没有登记任何用户时返回 None
+    """
+    config = config_manager.load_json(filename, default={}) or {}
+    users = load_users(config)
+    if not users:
+        return None
+    default_port = str(config.get('port') or config_manager.get_proxy_port())
+    return MultiUserUpdater(users, default_port, profile_manager,
+                            max_workers=int(config.get('max_workers', DEFAULT_WORKERS)))
+
+
+def main(config_dir='config'):
+    """
+    服务入口: 运行一个网络监控器，IP 变化时更新所有登记用户的 Git 配置，直到收到终止信号
+
+    Args:
+        config_dir: 中央配置目录
+
+    Returns:
+        int: 退出码
+    """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('service')
+
+    config_manager = ConfigManager(config_dir)
+    profile_manager = ProfileManager(config_manager)
+    updater = create_multi_user_updater(config_manager, profile_manager)
+    if not updater:
+        logger.error(f"{os.path.join(config_dir, 'service.json')} 中没有登记任何用户")
+        return 1
+
+    runtime = CoreRuntime()
+    runtime.start()
+    state_store = StateStore()
+
+    def on_ip_change(ip, adapter_name, adapter_type):
+        results = updater.update(ip, adapter_name)
+        if any(result != 'failed' for result in results.values()):
+            state_store.update(git_proxy=(updater.proxy, updater.proxy))
+
+    network_monitor = NetworkMonitor(callback=on_ip_change, config_manager=config_manager, runtime=runtime,
+                                     state_store=state_store)
+    status_page = create_status_page(config_manager, state_store)
+    if status_page:
+        status_page.start()
+    stop_event = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop_event.set())
+
+    logger.info(f"服务模式已启动，登记用户 {len(updater.users)} 个")
+    network_monitor.start_monitoring()
+    try:
+        while not stop_event.wait(1):
+            pass
+    finally:
+        network_monitor.stop_monitoring()
+        runtime.stop()
+        updater.stop()
+        if status_page:
+            status_page.stop()
+    logger.info("服务模式已退出")
+    return 0
+
@@ -0,0 +1,165 @@
+"""
+单实例模块 - 保证同时只运行一个监视器，并把后续启动的参数转交给正在运行的实例
+
+该模块只依赖标准库中的轻量模块，第二次启动时无需加载界面即可退出。
+"""
+import os
+import sys
+import json
+import socket
+import threading
+import logging
+
+DEFAULT_INSTANCE_NAME = 'ggpm-python'
+
+
+class SingleInstance:
+    def __init__(self, name=DEFAULT_INSTANCE_NAME, lock_dir=None):
+        """
+        初始化单实例锁
+
+        Linux 上使用抽象 Unix 套接字 (进程退出时由内核自动释放)，
+        其他平台使用文件锁加本地 TCP 端口。
+
+        Args:
+            name: 实例名称
+            lock_dir: 锁文件目录，默认为项目的 config 目录
+        """
+        if lock_dir is None:
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            lock_dir = os.path.join(base_dir, 'config')
+        self.name = name
+        self.lock_path = os.path.join(lock_dir, f'{name}.lock')
+        self.port_path = os.path.join(lock_dir, f'{name}.port')
+        self.logger = logging.getLogger('single_instance')
+        self._server = None
+        self._accept_thread = None
+        self._lock_file = None
+        self._use_abstract = sys.platform.startswith('linux')
+
+    def _abstract_address(self):
+        return f'\0{self.name}-{os.getuid()}'
+
+    def acquire(self):
+        """
+        尝试成为主实例
+
+        Returns:
+            bool: 成功返回 True，已有实例在运行时返回 False
+        """
+        if self._use_abstract:
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                server.bind(self._abstract_address())
+            except OSError:
+                server.close()
+                return False
+        else:
+            if not self._lock():
+                return False
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.bind(('127.0.0.1', 0))
+            with open(self.port_path, 'w') as f:
+                f.write(str(server.getsockname()[1]))
+        server.listen(4)
+        self._server = server
+        return True
+
+    def _lock(self):
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        self._lock_file = open(self.lock_path, 'a+')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+
+    def send(self, args, timeout=2.0):
+        """
+        将命令行参数发送给正在运行的主实例
+
+        Args:
+            args: 参数列表，例如 ['--show'] 或 ['--refresh']
+            timeout: 超时时间 (秒)
+
+        Returns:
+            bool: 主实例是否确认收到
+        """
+        try:
+            if self._use_abstract:
+                client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                address = self._abstract_address()
+            else:
+                with open(self.port_path, 'r') as f:
+                    address = ('127.0.0.1', int(f.read().strip()))
+                client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            with client:
+                client.settimeout(timeout)
+                client.connect(address)
+                client.sendall(json.dumps({'args': list(args)}).encode('utf-8') + b'\n')
+                return client.makefile('rb').readline().strip() == b'ok'
+        except (OSError, ValueError) as e:
+            self.logger.error(f"无法连接正在运行的实例: {e}")
+            return False
+
+    def serve(self, handler):
+        """
+        在后台线程中接收其他启动传来的参数
+
+        Args:
+            handler: 收到参数时调用的函数，参数为参数列表 (在后台线程中调用)
+        """
+        server = self._server
+        if server is None:
+            return
+
+        def accept_loop():
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except OSError:
+                    break
+                with conn:
+                    try:
+                        conn.settimeout(2.0)
+                        message = json.loads(conn.makefile('rb').readline().decode('utf-8'))
+                        conn.sendall(b'ok\n')
+                        self.logger.info(f"收到新启动实例的参数: {message.get('args')}")
+                        handler(message.get('args') or [])
+                    except Exception as e:
+                        self.logger.error(f"处理实例消息失败: {e}")
+
+        self._accept_thread = threading.Thread(target=accept_loop, name='single-instance', daemon=True)
+        self._accept_thread.start()
+
+    def release(self):
+        """
+        释放单实例锁
+        """
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                # 唤醒阻塞在 accept() 中的线程；只 close() 不会唤醒它，套接字名称也不会被释放
+                server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                # Windows 上监听套接字不支持 shutdown，close() 即可唤醒 accept()
+                pass
+            server.close()
+        thread, self._accept_thread = self._accept_thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            for path in (self.port_path, self.lock_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,207 @@
+"""
+状态存储模块 - 保存当前网络和代理状态的唯一来源，支持订阅变化
+
+状态是不可变的 AppState 对象，每次修改都会生成带有新版本号的新对象，读取方
+无需加锁即可拿到一份一致的快照。状态只由检测流程 (网络监控器和代理写入) 更新，
+界面和其他组件读取或订阅这里的状态，不再各自枚举网卡、调用 git 或读取配置文件。
+
+状态还会保存为快照 (state_snapshot.json)，下次启动时先假定快照中的状态成立，
+再在后台验证，实现热启动。
+"""
+import time
+import threading
+import logging
+from collections import namedtuple
+
+# 应用状态: 版本号, 接口表快照, 选定的适配器 ('' 表示自动选择), 当前IP, 适配器名称, 适配器类型描述,
+# 代理端口, Git 代理 (http.proxy, https.proxy), 代理健康状态 (HEALTH_*), 是否已验证 (从快照恢复、尚未确认时
+# 为 False), 更新时间
+AppState = namedtuple('AppState', ['version', 'interfaces', 'selected_adapter', 'ip', 'adapter_name',
+                                   'adapter_type', 'port', 'git_proxy', 'health', 'verified', 'updated'])
+
+# 代理健康状态: 未检查 (未启用故障转移), 使用检测到的代理, 使用备用代理, 所有代理不可用已改为直连
+HEALTH_UNKNOWN = ''
+HEALTH_OK = 'ok'
+HEALTH_BACKUP = 'backup'
+HEALTH_DIRECT = 'direct'
+
+INITIAL_STATE = AppState(0, None, '', None, '', '', '', (None, None), HEALTH_UNKNOWN, True, 0.0)
+
+# 写入快照的字段
+SNAPSHOT_FIELDS = ('selected_adapter', 'ip', 'adapter_name', 'adapter_type', 'port', 'git_proxy')
+SNAPSHOT_DELAY = 1.0
+
+
+class StateStore:
+    def __init__(self, initial=INITIAL_STATE):
+        """
+        初始化状态存储
+
+        Args:
+            initial: 初始状态
+        """
+        self.logger = logging.getLogger('state_store')
+        self._state = initial
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._next_token = 0
+
+    @property
+    def state(self):
+        """
+        当前状态 (不可变对象，可以直接在任意线程读取)
+        """
+        return self._state
+
+    def update(self, **changes):
+        """
+        修改状态字段，有字段发生变化时生成新版本并通知订阅者
+
+        Args:
+            **changes: 要修改的字段
+
+        Returns:
+            AppState: 修改后的状态
+        """
+        with self._lock:
+            old = self._state
+            changed = {key: value for key, value in changes.items() if getattr(old, key) != value}
+            if not changed:
+                return old
+            new = old._replace(version=old.version + 1, updated=time.time(), **changed)
+            self._state = new
+            subscribers = list(self._subscribers.values())
+        # 在锁外通知，订阅者可以读取状态或再次更新
+        for callback, fields in subscribers:
+            if fields is None or not fields.isdisjoint(changed):
+                try:
+                    callback(new, old)
+                except Exception as e:
+                    self.logger.error(f"状态订阅者处理失败: {e}")
+        return new
+
+    def subscribe(self, callback, fields=None):
+        """
+        订阅状态变化
+
+        Args:
+            callback: callback(新状态, 旧状态)，在更新状态的线程中调用
+            fields: 只关心的字段名 (可选)，这些字段都没有变化时不通知
+
+        Returns:
+            int: 订阅标识，用于取消订阅
+        """
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._subscribers[token] = (callback, frozenset(fields) if fields else None)
+        return token
+
+    def unsubscribe(self, token):
+        """
+        取消订阅
+
+        Args:
+            token: subscribe 返回的订阅标识
+        """
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+
+def load_snapshot(config_manager, filename='state_snapshot.json'):
+    """
+    读取上次保存的状态快照
+
+    Args:
+        config_manager: 配置管理器实例
+        filename: 配置目录下的快照文件名
+
+    Returns:
+        tuple: (状态字段字典, 保存时间)，没有有效快照时返回 (None, None)
+    """
+    data = config_manager.load_json(filename, default=None)
+    if not isinstance(data, dict) or not data.get('ip'):
+        return None, None
+    snapshot = {field: data.get(field) or '' for field in SNAPSHOT_FIELDS}
+    snapshot['port'] = str(snapshot['port'])
+    git_proxy = data.get('git_proxy') or [None, None]
+    snapshot['git_proxy'] = (git_proxy[0], git_proxy[1])
+    return snapshot, data.get('timestamp')
+
+
+class SnapshotPersister:
+    def __init__(self, store, config_manager, runtime=None, filename='state_snapshot.json', delay=SNAPSHOT_DELAY):
+        """
+        将已验证的状态保存为快照，并在启动时恢复
+
+        Args:
+            store: StateStore 实例
+            config_manager: 配置管理器实例
+            runtime: 核心运行时 (可选)，提供时经由其写入通道防抖写入
+            filename: 配置目录下的快照文件名
+            delay: 防抖延迟 (秒)
+        """
+        self.store = store
+        self.config_manager = config_manager
+        self.runtime = runtime
+        self.filename = filename
+        self.delay = delay
+        self.logger = logging.getLogger('state_store')
+        self._saved = None
+        self._token = None
+
+    def restore(self):
+        """
+        读取快照并作为未验证的状态放入状态存储
+
+        Returns:
+            bool: 是否恢复了快照
+        """
+        snapshot, timestamp = load_snapshot(self.config_manager, self.filename)
+        if snapshot is None:
+            return False
+        self.store.update(verified=False, **snapshot)
+        self._saved = snapshot
+        age = f"，保存于 {time.time() - timestamp:.0f} 秒前" if timestamp else ""
+        self.logger.info(f"已从快照恢复状态: {snapshot['ip']} ({snapshot['adapter_name']}){age}")
+        return True
+
+    def start(self):
+        """
+        开始在状态变化后保存快照
+        """
+        if self._token is None:
+            self._token = self.store.subscribe(self._on_change, fields=SNAPSHOT_FIELDS + ('verified',))
+
+    def stop(self):
+        """
+        停止保存快照
+        """
+        if self._token is not None:
+            self.store.unsubscribe(self._token)
+            self._token = None
+
+    def save(self):
+        """
+        立即保存当前状态 (未验证的状态不保存)
+
+        Returns:
+            bool: 是否写入了快照
+        """
+        state = self.store.state
+        snapshot = {field: getattr(state, field) for field in SNAPSHOT_FIELDS}
+        if not state.verified or not state.ip or snapshot == self._saved:
+            return False
+        data = dict(snapshot, git_proxy=list(snapshot['git_proxy']), timestamp=time.time())
+        if not self.config_manager.save_json(self.filename, data):
+            return False
+        self._saved = snapshot
+        return True
+
+    def _on_change(self, state, old):
+        if not state.verified:
+            return
+        if self.runtime:
+            self.runtime.debounce('state_snapshot', self.delay, self.save)
+        else:
+            self.save()
@@ -0,0 +1,226 @@
+"""
+状态页模块 - 将当前状态发布到固定布局的内存映射文件，其他进程无需调用 git 或连接界面即可读取
+
+布局和读取方法见 status_reader 模块。发布器订阅状态存储，IP、端口、适配器、Git 代理或
+健康状态变化时按 seqlock 协议更新状态页，一次更新只是几次内存写入。
+"""
+import os
+import stat
+import time
+import mmap
+import threading
+import logging
+
+from src.status_reader import (MAGIC, LAYOUT_VERSION, PAGE_SIZE, HEADER, SEQUENCE, BODY, SEQUENCE_OFFSET,
+                               BODY_OFFSET, HEALTH_NAMES, default_status_path)
+
+# 触发发布的状态字段
+PUBLISHED_FIELDS = ('ip', 'port', 'adapter_name', 'git_proxy', 'health')
+
+
+class StatusPageWriter:
+    def __init__(self, path):
+        """
+        打开 (必要时创建) 状态页并映射到内存
+
+        状态页原地复用而不是替换，已经映射了它的读取方在监控器重启后仍能读到新状态。
+
+        Args:
+            path: 状态页路径
+
+        Raises:
+            OSError: 无法创建或打开状态页
+            ValueError: 路径是符号链接、不是普通文件、不属于当前用户或有其他硬链接
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        # 不跟随符号链接: 其他用户可能预先在共享目录中放置指向受害文件的链接
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_BINARY', 0)
+        self._fd = os.open(path, flags, 0o644)
+        try:
+            _check_page_file(self._fd, path)
+            if os.fstat(self._fd).st_size < PAGE_SIZE:
+                os.ftruncate(self._fd, PAGE_SIZE)
+            self._map = mmap.mmap(self._fd, PAGE_SIZE)
+        except Exception:
+            os.close(self._fd)
+            raise
+        magic, layout, _ = HEADER.unpack_from(self._map, 0)
+        sequence = SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0]
+        if magic != MAGIC or layout != LAYOUT_VERSION:
+            self._map[:] = bytes(PAGE_SIZE)
+            HEADER.pack_into(self._map, 0, MAGIC, LAYOUT_VERSION, 0)
+            sequence = 0
+        # 上一个写入者可能在写入中途退出，从下一个偶数继续
+        self._sequence = sequence + (sequence & 1)
+
+    def publish(self, version, ip, port, adapter, health, proxy, last_change, pid=None):
+        """
+        写入一份状态
+
+        Args:
+            version: 状态版本
+            ip: IP地址
+            port: 端口号
+            adapter: 适配器名称
+            health: 健康状态名称 (HEALTH_NAMES 之一)
+            proxy: Git 代理地址
+            last_change: 最后变化时间
+            pid: 写入进程 PID，默认为当前进程，0 表示监控器已退出
+        """
+        body = BODY.pack(version, last_change, os.getpid() if pid is None else pid, _port(port),
+                         HEALTH_NAMES.index(health) if health in HEALTH_NAMES else 0,
+                         _encode(ip, 46), _encode(adapter, 64), _encode(proxy, 96))
+        with self._lock:
+            if self._map is None:
+                return
+            # 序号为奇数期间读取方会重试
+            self._sequence += 1
+            SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self._sequence)
+            self._map[BODY_OFFSET:BODY_OFFSET + BODY.size] = body
+            self._sequence += 1
+            SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self._sequence)
+
+    def close(self):
+        """
+        解除映射并关闭文件
+        """
+        with self._lock:
+            if self._map is None:
+                return
+            self._map.close()
+            self._map = None
+            os.close(self._fd)
+
+
+def _check_page_file(fd, path):
+    """
+    确认打开的状态页是当前用户拥有、只有一个链接的普通文件
+    """
+    stat_result = os.fstat(fd)
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise ValueError(f"状态页不是普通文件: {path}")
+    if hasattr(os, 'geteuid') and stat_result.st_uid != os.geteuid():
+        raise ValueError(f"状态页不属于当前用户 (uid {stat_result.st_uid}): {path}")
+    if stat_result.st_nlink != 1:
+        raise ValueError(f"状态页有多个硬链接: {path}")
+
+
+def ensure_private_directory(directory):
+    """
+    确认默认状态页所在的目录是当前用户私有的 (不是符号链接，属于当前用户，其他用户无权限)
+
+    Args:
+        directory: 目录路径，不存在时以 0700 权限创建
+
+    Raises:
+        ValueError: 目录不是私有的
+    """
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    stat_result = os.lstat(directory)
+    if not stat.S_ISDIR(stat_result.st_mode):
+        raise ValueError(f"状态页目录不是目录 (可能是符号链接): {directory}")
+    if hasattr(os, 'geteuid') and (stat_result.st_uid != os.geteuid() or stat_result.st_mode & 0o077):
+        raise ValueError(f"状态页目录不是当前用户私有的: {directory}")
+
+
+def _port(port):
+    try:
+        return min(max(int(port), 0), 65535)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _encode(text, size):
+    """
+    编码为 UTF-8 并截断到字段长度 (不截断在多字节字符中间)
+    """
+    data = (text or '').encode('utf-8')
+    if len(data) > size:
+        data = data[:size].decode('utf-8', 'ignore').encode('utf-8')
+    return data
+
+
+class StatusPagePublisher:
+    def __init__(self, store, writer):
+        """
+        订阅状态存储并发布到状态页
+
+        Args:
+            store: StateStore 实例
+            writer: StatusPageWriter 实例
+        """
+        self.store = store
+        self.writer = writer
+        self.logger = logging.getLogger('status_page')
+        self._token = None
+
+    def start(self):
+        """
+        发布当前状态并开始跟随变化
+        """
+        if self._token is None:
+            self._token = self.store.subscribe(lambda state, old: self.publish(state), fields=PUBLISHED_FIELDS)
+            self.publish(self.store.state)
+            self.logger.info(f"状态页已发布到 {self.writer.path}")
+
+    def stop(self):
+        """
+        停止发布，并将状态页标记为监控器已退出
+        """
+        if self._token is not None:
+            self.store.unsubscribe(self._token)
+            self._token = None
+        self.publish(self.store.state, pid=0)
+        self.writer.close()
+
+    def publish(self, state, pid=None):
+        """
+        将一份状态写入状态页
+
+        Args:
+            state: AppState
+            pid: 写入进程 PID (可选)
+        """
+        http_proxy, https_proxy = state.git_proxy
+        try:
+            self.writer.publish(state.version, state.ip, state.port, state.adapter_name, state.health,
+                                http_proxy or https_proxy, state.updated or time.time(), pid)
+        except Exception as e:
+            self.logger.error(f"发布状态页失败: {e}")
+
+
+def create_status_page(config_manager, state_store, filename='status_page.json'):
+    """
+    根据配置创建状态页发布器
+
+    配置文件格式::
+
+        {"enabled": true, "path": "/run/user/1000/ggpm-status"}
+
+    Args:
+        config_manager: 配置管理器实例
+        state_store: 状态存储
+        filename: 配置目录下的配置文件名
+
+    Returns:
+        StatusPagePublisher: 未启用或无法创建状态页时返回 None
+    """
+    config = config_manager.load_json(filename, default={}) or {}
+    if not config.get('enabled'):
+        return None
+    path = config.get('path') or default_status_path()
+    try:
+        if not config.get('path'):
+            ensure_private_directory(os.path.dirname(path))
+        writer = StatusPageWriter(path)
+    except (OSError, ValueError) as e:
+        logging.getLogger('status_page').error(f"无法创建状态页 {path}: {e}")
+        return None
+    return StatusPagePublisher(state_store, writer)
@@ -0,0 +1,151 @@
+"""
+状态页读取模块 - 从监控器发布的内存映射状态页中读取当前代理，供 shell 提示符和构建脚本使用
+
+状态页是固定布局的小文件 (见下方的 LAYOUT)，监控器按 seqlock 协议更新:
+写入前把序号加一 (变为奇数)，写完后再加一 (变为偶数)。读取方无需加锁，
+只要读取前后的序号相同且为偶数，读到的就是一份一致的快照，否则重试。
+除第一次 mmap 外，读取不产生任何系统调用。
+
+本模块只依赖标准库，可以单独复制使用::
+
+    from src.status_reader import StatusReader
+    reader = StatusReader()
+    status = reader.read()          # StatusSnapshot，监控器从未运行时为 None
+    python -m src.status_reader     # 打印当前代理地址，也可指定字段，如 ip、port、health
+"""
+import os
+import sys
+import mmap
+import struct
+import getpass
+from collections import namedtuple
+
+MAGIC = b'GGPM'
+LAYOUT_VERSION = 1
+PAGE_SIZE = 256
+MAX_READ_RETRIES = 1000
+
+# LAYOUT (小端):
+#   0  头部: 魔数 4s, 布局版本 H, 保留 H
+#   8  序号 Q (奇数表示正在写入)
+#   16 内容: 状态版本 Q, 最后变化时间 d, 写入进程 PID I (0 表示监控器已退出), 端口 H, 健康状态 B, 保留 x,
+#            IP 46s, 适配器 64s, Git 代理 96s (UTF-8，以 0 填充)
+HEADER = struct.Struct('<4sHH')
+SEQUENCE = struct.Struct('<Q')
+BODY = struct.Struct('<QdIHBx46s64s96s')
+SEQUENCE_OFFSET = HEADER.size
+BODY_OFFSET = SEQUENCE_OFFSET + SEQUENCE.size
+
+# 健康状态编码，与 state_store 中的 HEALTH_* 对应
+HEALTH_NAMES = ('', 'ok', 'backup', 'direct')
+
+# 一份状态: 状态版本, IP, 端口 (0 表示未设置), 适配器名称, 健康状态, Git 代理, 最后变化时间, 写入进程 PID
+StatusSnapshot = namedtuple('StatusSnapshot', ['version', 'ip', 'port', 'adapter', 'health', 'proxy',
+                                               'last_change', 'pid'])
+
+
+def default_status_path():
+    """
+    获取状态页的默认路径 (每个用户一份)
+
+    Returns:
+        str: $XDG_RUNTIME_DIR/ggpm-status，没有该变量时为临时目录下私有目录 ggpm-<用户名> 中的 status
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'ggpm-status')
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = 'default'
+    temp_dir = os.environ.get('TMPDIR') or os.environ.get('TEMP') or ('/tmp' if os.name != 'nt' else '.')
+    return os.path.join(temp_dir, f'ggpm-{user}', 'status')
+
+
+def _text(raw):
+    return raw.split(b'\0', 1)[0].decode('utf-8', 'replace')
+
+
+class StatusReader:
+    def __init__(self, path=None):
+        """
+        初始化状态页读取器
+
+        Args:
+            path: 状态页路径 (可选)，默认为 default_status_path()
+        """
+        self.path = path or default_status_path()
+        self._map = None
+
+    def _open(self):
+        try:
+            with open(self.path, 'rb') as f:
+                page = mmap.mmap(f.fileno(), PAGE_SIZE, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        magic, layout, _ = HEADER.unpack_from(page, 0)
+        if magic != MAGIC or layout != LAYOUT_VERSION:
+            page.close()
+            return None
+        self._map = page
+        return page
+
+    def read(self):
+        """
+        读取一份一致的状态快照
+
+        Returns:
+            StatusSnapshot: 状态页不存在、布局不兼容或尚未发布过状态时返回 None
+        """
+        page = self._map or self._open()
+        if page is None:
+            return None
+        for _ in range(MAX_READ_RETRIES):
+            sequence = SEQUENCE.unpack_from(page, SEQUENCE_OFFSET)[0]
+            if sequence & 1:
+                continue
+            body = page[BODY_OFFSET:BODY_OFFSET + BODY.size]
+            if SEQUENCE.unpack_from(page, SEQUENCE_OFFSET)[0] != sequence:
+                continue
+            if sequence == 0:
+                return None
+            version, last_change, pid, port, health, ip, adapter, proxy = BODY.unpack(body)
+            return StatusSnapshot(version, _text(ip), port, _text(adapter),
+                                  HEALTH_NAMES[health] if health < len(HEALTH_NAMES) else '',
+                                  _text(proxy), last_change, pid)
+        return None
+
+    def close(self):
+        """
+        释放映射
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def main(argv=None):
+    """
+    命令行入口: 打印当前状态的一个字段
+
+    Args:
+        argv: 参数列表 [字段名]，字段名为 StatusSnapshot 的字段之一，默认为 proxy
+
+    Returns:
+        int: 退出码，监控器未运行或字段为空时为 1
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    field = argv[0] if argv else 'proxy'
+    if field not in StatusSnapshot._fields:
+        print(f"未知字段: {field} (可用: {', '.join(StatusSnapshot._fields)})", file=sys.stderr)
+        return 2
+    status = StatusReader().read()
+    if status is None or not status.pid:
+        return 1
+    value = getattr(status, field)
+    print(value)
+    return 0 if value not in ('', 0, None) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
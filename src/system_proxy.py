@@ -0,0 +1,286 @@
+"""
+系统代理模块 - 将代理地址同步到桌面环境、环境变量文件和 WinINet 设置
+
+每个后端先读取当前值并与目标值比较，只有存在差异时才执行一次批量写入；
+多个后端在线程池中并发应用。
+"""
+import os
+import abc
+import json
+import shutil
+import platform
+import subprocess
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JsonFileStore:
+    def __init__(self, path):
+        """
+        以 JSON 文件保存键值的替身存储，用于在任意平台上测试各个后端
+
+        Args:
+            path: JSON 文件路径
+        """
+        self.path = path
+
+    def read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def write(self, changes):
+        data = self.read()
+        data.update(changes)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class EnvFileStore:
+    def __init__(self, path):
+        """
+        /etc/environment 风格的 KEY="value" 文件
+
+        Args:
+            path: 环境变量文件路径
+        """
+        self.path = path
+
+    def _read_lines(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return f.readlines()
+        except FileNotFoundError:
+            return []
+
+    def read(self):
+        values = {}
+        for line in self._read_lines():
+            key, sep, value = line.strip().partition('=')
+            if sep and not key.startswith('#'):
+                values[key.strip()] = value.strip().strip('"\'')
+        return values
+
+    def write(self, changes):
+        remaining = dict(changes)
+        lines = []
+        for line in self._read_lines():
+            key = line.partition('=')[0].strip()
+            if key in remaining:
+                lines.append(f'{key}="{remaining.pop(key)}"\n')
+            else:
+                lines.append(line if line.endswith('\n') else line + '\n')
+        lines.extend(f'{key}="{value}"\n' for key, value in remaining.items())
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        if os.path.exists(self.path):
+            shutil.copymode(self.path, tmp_path)
+        os.replace(tmp_path, self.path)
+
+
+class DconfStore:
+    def __init__(self, base='/system/proxy/'):
+        """
+        GNOME 代理设置 (通过 dconf 一次性导入所有键)
+
+        Args:
+            base: dconf 路径前缀
+        """
+        self.base = base
+
+    def read(self):
+        output = subprocess.run(['dconf', 'dump', self.base], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True, timeout=5).stdout
+        values = {}
+        section = ''
+        for line in output.splitlines():
+            line = line.strip()
+            if line.startswith('[') and line.endswith(']'):
+                section = '' if line == '[/]' else line[1:-1] + '/'
+            elif '=' in line:
+                key, _, value = line.partition('=')
+                if value.startswith("'"):
+                    value = value.strip("'")
+                elif value.isdigit():
+                    value = int(value)
+                values[section + key] = value
+        return values
+
+    def write(self, changes):
+        sections = {}
+        for key, value in changes.items():
+            section, _, name = key.rpartition('/')
+            text = str(value) if isinstance(value, int) else "'" + str(value).replace("'", "\\'") + "'"
+            sections.setdefault(section or '/', []).append(f'{name}={text}')
+        keyfile = ''.join(f'[{section}]\n' + '\n'.join(entries) + '\n\n' for section, entries in sections.items())
+        subprocess.run(['dconf', 'load', self.base], input=keyfile, text=True, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=5)
+
+
+class RegistryStore:
+    KEY_PATH = r"Software\Microsoft\Windows\CurrentVersion\Internet Settings"
+
+    def read(self):
+        import winreg
+        values = {}
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.KEY_PATH) as key:
+            for name in ('ProxyEnable', 'ProxyServer'):
+                try:
+                    values[name] = winreg.QueryValueEx(key, name)[0]
+                except FileNotFoundError:
+                    pass
+        return values
+
+    def write(self, changes):
+        import winreg
+        import ctypes
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, self.KEY_PATH, 0, winreg.KEY_SET_VALUE) as key:
+            for name, value in changes.items():
+                value_type = winreg.REG_DWORD if isinstance(value, int) else winreg.REG_SZ
+                winreg.SetValueEx(key, name, 0, value_type, value)
+        # 通知 WinINet 重新读取设置 (INTERNET_OPTION_SETTINGS_CHANGED, INTERNET_OPTION_REFRESH)
+        internet_set_option = ctypes.windll.wininet.InternetSetOptionW
+        internet_set_option(0, 39, 0, 0)
+        internet_set_option(0, 37, 0, 0)
+
+
+class ProxyBackend(abc.ABC):
+    def __init__(self, name, store):
+        """
+        初始化系统代理后端
+
+        Args:
+            name: 后端名称
+            store: 提供 read() 和 write(changes) 的存储对象
+        """
+        self.name = name
+        self.store = store
+
+    @abc.abstractmethod
+    def desired(self, ip, port):
+        """
+        计算目标键值
+
+        Returns:
+            dict: {键: 值}
+        """
+
+    def apply(self, ip, port):
+        """
+        与当前值比较，存在差异时一次性写入
+
+        Returns:
+            str: "unchanged" 或 "updated"
+        """
+        desired = self.desired(ip, port)
+        current = self.store.read()
+        changes = {key: value for key, value in desired.items() if current.get(key) != value}
+        if not changes:
+            return "unchanged"
+        self.store.write(changes)
+        return "updated"
+
+
+class GnomeProxyBackend(ProxyBackend):
+    def __init__(self, store=None):
+        super().__init__('gnome', store or DconfStore())
+
+    def desired(self, ip, port):
+        return {'mode': 'manual', 'http/host': ip, 'http/port': int(port),
+                'https/host': ip, 'https/port': int(port)}
+
+
+class EnvFileBackend(ProxyBackend):
+    def __init__(self, path):
+        super().__init__('env_file', EnvFileStore(path))
+
+    def desired(self, ip, port):
+        proxy = f'http://{ip}:{port}'
+        return {'http_proxy': proxy, 'https_proxy': proxy, 'HTTP_PROXY': proxy, 'HTTPS_PROXY': proxy}
+
+
+class WinINetBackend(ProxyBackend):
+    def __init__(self, store=None):
+        super().__init__('wininet', store or RegistryStore())
+
+    def desired(self, ip, port):
+        return {'ProxyEnable': 1, 'ProxyServer': f'{ip}:{port}'}
+
+
+class SystemProxyManager:
+    def __init__(self, config_manager, filename='system_proxy.json', runtime=None):
+        """
+        初始化系统代理管理器
+
+        配置文件格式::
+
+            {"enabled": true, "gnome": true, "wininet": true,
+             "env_file": "/etc/environment", "stand_in_dir": null}
+
+        设置 stand_in_dir 后，GNOME 和 WinINet 后端改为写入该目录下的 JSON 文件，
+        环境变量文件也写到该目录中，便于在 Linux 上测试。
+
+        Args:
+            config_manager: 配置管理器实例
+            filename: 配置目录下的配置文件名
+            runtime: 核心运行时 (可选)，提供时各后端在其共享线程池中执行
+        """
+        self.logger = logging.getLogger('system_proxy')
+        self.runtime = runtime
+        config = config_manager.load_json(filename, default={}) or {}
+        self.enabled = bool(config.get('enabled'))
+        self.backends = self._create_backends(config) if self.enabled else []
+        # 未启用、没有可用后端或使用核心运行时的线程池时不创建线程池
+        self._pool = None
+        if self.backends and not runtime:
+            self._pool = ThreadPoolExecutor(max_workers=len(self.backends), thread_name_prefix='system-proxy')
+
+    def _create_backends(self, config):
+        stand_in_dir = config.get('stand_in_dir')
+        backends = []
+        if config.get('gnome', True):
+            if stand_in_dir:
+                backends.append(GnomeProxyBackend(JsonFileStore(os.path.join(stand_in_dir, 'gnome.json'))))
+            elif platform.system() == "Linux" and shutil.which('dconf'):
+                backends.append(GnomeProxyBackend())
+        if config.get('wininet', True):
+            if stand_in_dir:
+                backends.append(WinINetBackend(JsonFileStore(os.path.join(stand_in_dir, 'wininet.json'))))
+            elif platform.system() == "Windows":
+                backends.append(WinINetBackend())
+        env_file = config.get('env_file')
+        if env_file:
+            if stand_in_dir:
+                env_file = os.path.join(stand_in_dir, os.path.basename(env_file))
+            backends.append(EnvFileBackend(env_file))
+        return backends
+
+    def apply(self, ip, port):
+        """
+        并发地将代理地址应用到所有后端
+
+        Args:
+            ip: IP地址
+            port: 端口号
+
+        Returns:
+            dict: {后端名称: "unchanged" | "updated" | "failed"}
+        """
+        if not self.backends or not ip:
+            return {}
+        submit = self.runtime.call if self.runtime else self._pool.submit
+        futures = {backend.name: submit(backend.apply, ip, port) for backend in self.backends}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                self.logger.error(f"更新系统代理 ({name}) 失败: {e}")
+                results[name] = "failed"
+        self.logger.info(f"系统代理已同步为 {ip}:{port}: {results}")
+        return results
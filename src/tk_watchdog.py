@@ -0,0 +1,201 @@
+"""
+界面看门狗模块 - 测量 Tk 事件循环的响应延迟
+
+以固定的高频率调度 after 定时器，实际触发时间与预期时间之差即事件循环的延迟。
+提供界面任务执行器时不再单独调度定时器，改为测量执行器每次轮询的延迟。
+延迟记录在直方图和最近样本中，用于计算 p95/p99；另有一个后台检查 (核心运行时的
+定时任务或单独的线程) 监视心跳，主线程卡住超过阈值时记录其调用栈 (卡住期间定时器
+无法触发，只能从其他线程观察)。后台检查平时以较慢的间隔运行，发现心跳迟到 (疑似卡住)
+时才加快，直到心跳恢复或记录了调用栈。
+"""
+import sys
+import time
+import bisect
+import threading
+import traceback
+import logging
+from collections import deque
+
+TICK_INTERVAL_MS = 20
+STALL_THRESHOLD = 0.25
+# 后台检查心跳的间隔 (秒)；心跳迟到超过 SUSPECT_LAG 时改为卡顿阈值的一半
+CHECK_INTERVAL = 1.0
+SUSPECT_LAG = 0.05
+SAMPLE_WINDOW = 10000
+# 直方图的桶上界 (毫秒)，最后一个桶收集所有更大的延迟
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000, 2000)
+
+
+class TkWatchdog:
+    def __init__(self, root, interval_ms=TICK_INTERVAL_MS, stall_threshold=STALL_THRESHOLD, executor=None):
+        """
+        初始化界面看门狗
+
+        Args:
+            root: Tk 根窗口
+            interval_ms: 定时器间隔 (毫秒)
+            stall_threshold: 主线程卡住多久 (秒) 后记录调用栈
+            executor: 界面任务执行器 (可选)，提供时借用其轮询测量延迟，不再单独调度定时器
+        """
+        self.root = root
+        self.interval_ms = interval_ms
+        self.executor = executor
+        self.stall_threshold = stall_threshold
+        self.logger = logging.getLogger('tk_watchdog')
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._lock = threading.Lock()
+        self._expected = None
+        self._last_tick = None
+        self._after_id = None
+        self._main_thread_id = threading.main_thread().ident
+        self._stop_event = threading.Event()
+        self._sentinel = None
+        self._timer = None
+        self._started = False
+        self._tick_interval = interval_ms / 1000
+        self._reported_tick = None
+        self._check_interval = CHECK_INTERVAL
+
+    def start(self, runtime=None):
+        """
+        开始测量 (须在主线程调用)
+
+        Args:
+            runtime: 核心运行时 (可选)，提供时由其定时器检查心跳，不再单独创建线程
+        """
+        if self._started:
+            return
+        self._started = True
+        self._main_thread_id = threading.get_ident()
+        self._stop_event.clear()
+        self._last_tick = time.monotonic()
+        if self.executor:
+            self.executor.add_tick_listener(self._record)
+        else:
+            self._schedule()
+        self._check_interval = CHECK_INTERVAL
+        if runtime:
+            self._timer = runtime.every(self._check_interval, self.check_stall, name='tk_watchdog')
+        else:
+            self._sentinel = threading.Thread(target=self._watch, name='tk-watchdog', daemon=True)
+            self._sentinel.start()
+
+    def stop(self):
+        """
+        停止测量
+        """
+        self._stop_event.set()
+        self._started = False
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def reset(self):
+        """
+        清空已记录的数据
+        """
+        with self._lock:
+            self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+            self.samples.clear()
+            self.max_lag = 0.0
+            self.stalls = 0
+
+    def percentile(self, p):
+        """
+        计算最近样本中的延迟百分位数
+
+        Args:
+            p: 百分位 (0-100)
+
+        Returns:
+            float: 延迟 (秒)，没有样本时返回 0
+        """
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def get_stats(self):
+        """
+        获取统计信息
+
+        Returns:
+            dict: 样本数、p50/p95/p99、最大延迟 (毫秒)、卡顿次数和直方图
+        """
+        with self._lock:
+            labels = [f'<={bound}ms' for bound in HISTOGRAM_BOUNDS_MS] + [f'>{HISTOGRAM_BOUNDS_MS[-1]}ms']
+            histogram = dict(zip(labels, self.histogram))
+            count = len(self.samples)
+            max_lag = self.max_lag
+            stalls = self.stalls
+        return {
+            'samples': count,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': max_lag * 1000,
+            'stalls': stalls,
+            'histogram': histogram,
+        }
+
+    def _schedule(self):
+        self._expected = time.monotonic() + self.interval_ms / 1000
+        self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        self._record(max(time.monotonic() - self._expected, 0.0), self.interval_ms / 1000)
+        if not self._stop_event.is_set():
+            self._schedule()
+
+    def _record(self, lag, interval):
+        if self._stop_event.is_set():
+            return
+        with self._lock:
+            self.samples.append(lag)
+            self.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, lag * 1000)] += 1
+            if lag > self.max_lag:
+                self.max_lag = lag
+        self._tick_interval = interval
+        self._last_tick = time.monotonic()
+
+    def _watch(self):
+        while not self._stop_event.wait(self._check_interval):
+            self.check_stall()
+
+    def check_stall(self):
+        """
+        检查主线程的心跳，卡住超过阈值时记录其调用栈 (在其他线程调用)
+        """
+        if self._stop_event.is_set():
+            return
+        last_tick = self._last_tick
+        stalled_for = time.monotonic() - last_tick - self._tick_interval
+        reported = last_tick == self._reported_tick
+        if stalled_for >= self.stall_threshold and not reported:
+            # 每次卡顿只记录一次调用栈
+            self._reported_tick = last_tick
+            reported = True
+            frame = sys._current_frames().get(self._main_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else '(无法获取主线程调用栈)\n'
+            with self._lock:
+                self.stalls += 1
+            self.logger.warning(f"界面主线程已卡住 {stalled_for * 1000:.0f}ms，当前调用栈:\n{stack.rstrip()}")
+        suspected = stalled_for >= SUSPECT_LAG and not reported
+        self._set_check_interval(self.stall_threshold / 2 if suspected else CHECK_INTERVAL)
+
+    def _set_check_interval(self, interval):
+        if interval == self._check_interval:
+            return
+        self._check_interval = interval
+        if self._timer:
+            self._timer.set_interval(interval)
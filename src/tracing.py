@@ -0,0 +1,383 @@
+"""
+追踪模块 - 为每次检测到的 IP 变化生成追踪，记录其在更新流程中各阶段的耗时
+
+一次 IP 变化从检测开始，依次经过监控回调、防抖后的代理写入 (发现、Git、配置文件)
+和界面更新。每个阶段是一个带起止时间的跨度 (span)，同属一个追踪编号 (trace ID)。
+当前跨度保存在 contextvars 中，核心运行时和界面执行器在切换线程时会携带上下文，
+各阶段只需调用 span() 即可挂到所属的追踪上；没有启用追踪或追踪未被采样时 span()
+几乎没有开销。
+
+结束的跨度以 OTLP/JSON 的 resourceSpans 结构逐行追加到本地 JSONL 文件，可以直接
+导入兼容 OTLP 的工具，也可以用内置的汇总命令查看最慢的阶段::
+
+    python run.py --trace-summary [logs/traces.jsonl]
+"""
+import os
+import sys
+import json
+import time
+import random
+import threading
+import contextvars
+import logging
+from collections import defaultdict
+
+DEFAULT_SAMPLE_RATE = 1.0
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+SERVICE_NAME = 'git-proxy-monitor'
+SCOPE_NAME = 'ggpm.tracing'
+
+# OTLP 的跨度类型和状态码
+SPAN_KIND_INTERNAL = 1
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar('ggpm_current_span', default=None)
+_tracer = None
+
+
+class Span:
+    def __init__(self, tracer, name, trace_id, parent_id=None, start_ns=None, attributes=None):
+        """
+        一个计时的跨度
+
+        Args:
+            tracer: 所属的 Tracer
+            name: 跨度名称 (阶段名称)
+            trace_id: 追踪编号 (32 位十六进制)
+            parent_id: 父跨度编号 (可选)
+            start_ns: 开始时间 (纳秒时间戳)，默认为当前时间
+            attributes: 属性字典 (可选)
+        """
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        """
+        设置属性
+
+        Args:
+            key: 属性名
+            value: 属性值
+        """
+        self.attributes[key] = value
+
+    def end(self, end_ns=None):
+        """
+        结束跨度并写出 (重复调用无效)
+
+        Args:
+            end_ns: 结束时间 (纳秒时间戳)，默认为当前时间
+        """
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        self.tracer.export(self)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.end()
+        return False
+
+    def to_otlp(self):
+        """
+        转换为 OTLP/JSON 的跨度结构
+
+        Returns:
+            dict: 跨度
+        """
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error else {'code': STATUS_UNSET},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """
+    未启用追踪或追踪未被采样时使用的空跨度
+    """
+    def set_attribute(self, key, value):
+        pass
+
+    def end(self, end_ns=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': '' if value is None else str(value)}
+    return {'key': key, 'value': typed}
+
+
+class Tracer:
+    def __init__(self, path, sample_rate=DEFAULT_SAMPLE_RATE, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        初始化追踪器
+
+        Args:
+            path: JSONL 输出文件路径
+            sample_rate: 采样率 (0~1)，按追踪决定是否记录
+            max_bytes: 文件超过该大小时轮转为 <文件>.1
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger('tracing')
+        self._lock = threading.Lock()
+        self._resource = {'attributes': [_otlp_attribute('service.name', SERVICE_NAME),
+                                         _otlp_attribute('process.pid', os.getpid())]}
+
+    def start_trace(self, name, start_ns=None, **attributes):
+        """
+        开始一个新的追踪，按采样率决定是否记录
+
+        Args:
+            name: 根跨度名称
+            start_ns: 开始时间 (纳秒时间戳，可选)
+            **attributes: 根跨度的属性
+
+        Returns:
+            Span: 根跨度 (用作上下文管理器)，未被采样时返回空跨度
+        """
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return NOOP_SPAN
+        return Span(self, name, '%032x' % random.getrandbits(128), start_ns=start_ns, attributes=attributes)
+
+    def export(self, span):
+        """
+        将结束的跨度追加到输出文件
+
+        Args:
+            span: 已结束的 Span
+        """
+        line = json.dumps({'resourceSpans': [{
+            'resource': self._resource,
+            'scopeSpans': [{'scope': {'name': SCOPE_NAME}, 'spans': [span.to_otlp()]}],
+        }]}, ensure_ascii=False)
+        with self._lock:
+            try:
+                if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                    os.replace(self.path, self.path + '.1')
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                self.logger.debug(f"写入追踪失败: {e}")
+
+
+def set_tracer(tracer):
+    """
+    设置全局追踪器
+
+    Args:
+        tracer: Tracer 实例，为 None 时关闭追踪
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def start_trace(name, start_ns=None, **attributes):
+    """
+    用全局追踪器开始一个新的追踪
+
+    Returns:
+        Span: 根跨度，未启用追踪或未被采样时返回空跨度
+    """
+    if _tracer is None:
+        return NOOP_SPAN
+    return _tracer.start_trace(name, start_ns, **attributes)
+
+
+def span(name, **attributes):
+    """
+    在当前追踪中开始一个子跨度
+
+    Args:
+        name: 跨度名称
+        **attributes: 属性
+
+    Returns:
+        Span: 子跨度 (用作上下文管理器)，当前没有追踪时返回空跨度
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.tracer, name, parent.trace_id, parent.span_id, attributes=attributes)
+
+
+def record_span(name, start_ns, end_ns, **attributes):
+    """
+    在当前追踪中记录一个已经完成的阶段 (例如开始追踪之前的检测)
+
+    Args:
+        name: 跨度名称
+        start_ns: 开始时间 (纳秒时间戳)
+        end_ns: 结束时间 (纳秒时间戳)
+        **attributes: 属性
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        Span(parent.tracer, name, parent.trace_id, parent.span_id, start_ns, attributes).end(end_ns)
+
+
+def create_tracer(config_manager, log_dir, filename='tracing.json'):
+    """
+    根据配置创建追踪器
+
+    配置文件格式::
+
+        {"enabled": true, "sample_rate": 0.2, "path": "traces.jsonl", "max_bytes": 10485760}
+
+    Args:
+        config_manager: 配置管理器实例
+        log_dir: 日志目录，相对的输出路径以此为基准
+        filename: 配置目录下的配置文件名
+
+    Returns:
+        Tracer: 未启用时返回 None
+    """
+    config = config_manager.load_json(filename, default={}) or {}
+    if not config.get('enabled'):
+        return None
+    path = os.path.join(log_dir, config.get('path') or 'traces.jsonl')
+    sample_rate = min(max(float(config.get('sample_rate', DEFAULT_SAMPLE_RATE)), 0.0), 1.0)
+    return Tracer(path, sample_rate, int(config.get('max_bytes', DEFAULT_MAX_BYTES)))
+
+
+def load_spans(path):
+    """
+    读取 JSONL 文件中的所有跨度
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        list: OTLP/JSON 跨度字典列表
+    """
+    spans = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            for resource_spans in data.get('resourceSpans', []):
+                for scope_spans in resource_spans.get('scopeSpans', []):
+                    spans.extend(scope_spans.get('spans', []))
+    return spans
+
+
+def summarize(spans, top=10):
+    """
+    按阶段汇总跨度耗时，并找出端到端最慢的追踪
+
+    Args:
+        spans: OTLP/JSON 跨度字典列表
+        top: 列出的最慢追踪数量
+
+    Returns:
+        tuple: ([(阶段名称, 次数, 平均毫秒, p95 毫秒, 最长毫秒, 错误数)] 按总耗时降序,
+                [(追踪编号, 端到端毫秒, 最慢阶段名称, 该阶段毫秒)])
+    """
+    stages = defaultdict(list)
+    errors = defaultdict(int)
+    traces = defaultdict(list)
+    for item in spans:
+        duration = (int(item['endTimeUnixNano']) - int(item['startTimeUnixNano'])) / 1e6
+        stages[item['name']].append(duration)
+        if item.get('status', {}).get('code') == STATUS_ERROR:
+            errors[item['name']] += 1
+        traces[item['traceId']].append((item, duration))
+
+    stage_rows = []
+    for name, durations in stages.items():
+        durations.sort()
+        p95 = durations[min(int(len(durations) * 0.95), len(durations) - 1)]
+        stage_rows.append((name, len(durations), sum(durations) / len(durations), p95, durations[-1],
+                           errors[name], sum(durations)))
+    stage_rows.sort(key=lambda row: row[-1], reverse=True)
+
+    trace_rows = []
+    for trace_id, items in traces.items():
+        start = min(int(item['startTimeUnixNano']) for item, _ in items)
+        end = max(int(item['endTimeUnixNano']) for item, _ in items)
+        # 根跨度包含其他阶段，最慢阶段只在子跨度中找
+        children = [(item, duration) for item, duration in items if item.get('parentSpanId')] or items
+        slowest, slowest_ms = max(children, key=lambda pair: pair[1])
+        trace_rows.append((trace_id, (end - start) / 1e6, slowest['name'], slowest_ms))
+    trace_rows.sort(key=lambda row: row[1], reverse=True)
+    return [row[:-1] for row in stage_rows], trace_rows[:top]
+
+
+def main(argv=None):
+    """
+    汇总命令入口: 打印各阶段的耗时统计和最慢的追踪
+
+    Args:
+        argv: 参数列表 [JSONL 文件路径]，默认为 logs/traces.jsonl
+
+    Returns:
+        int: 退出码
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = argv[0] if argv else os.path.join(base_dir, 'logs', 'traces.jsonl')
+    try:
+        spans = load_spans(path)
+    except OSError as e:
+        print(f"无法读取追踪文件: {e}")
+        return 1
+    if not spans:
+        print(f"{path} 中没有追踪记录")
+        return 0
+
+    stage_rows, trace_rows = summarize(spans)
+    print(f"{path}: {len({item['traceId'] for item in spans})} 个追踪，{len(spans)} 个跨度\n")
+    print(f"{'阶段':<28}{'次数':>8}{'平均ms':>10}{'p95ms':>10}{'最长ms':>10}{'错误':>6}")
+    for name, count, avg, p95, longest, error_count in stage_rows:
+        print(f"{name:<28}{count:>8}{avg:>10.1f}{p95:>10.1f}{longest:>10.1f}{error_count:>6}")
+    print("\n最慢的追踪:")
+    for trace_id, total, slowest, slowest_ms in trace_rows:
+        print(f"  {trace_id}  {total:>9.1f}ms  最慢阶段 {slowest} ({slowest_ms:.1f}ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
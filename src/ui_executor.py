@@ -0,0 +1,238 @@
+"""
+界面任务执行器模块 - 将阻塞操作移出Tk主线程并监测事件处理耗时
+
+主线程按轮询拉取后台任务的结果和跨线程提交的调用。有后台任务在执行或刚处理过其结果时
+快速轮询，空闲一段时间后逐渐放慢，减少空闲时的唤醒次数。跨线程提交的调用 (例如定时的
+视图刷新) 不会使轮询加快，否则每秒一次的刷新就会让轮询一直停留在最快的间隔。
+"""
+import time
+import queue
+import logging
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# 一帧的时间预算 (秒)，任何在主线程上运行的处理函数都不应超过该值
+FRAME_BUDGET = 0.016
+# 主线程拉取后台任务结果的间隔 (毫秒)
+POLL_INTERVAL_MS = 15
+# 空闲时逐渐放慢到的最大轮询间隔 (毫秒)，跨线程提交的调用最多等待这么久
+IDLE_POLL_INTERVAL_MS = 250
+# 多久没有任务后开始放慢 (秒)
+IDLE_AFTER = 1.0
+
+
+class UITaskExecutor:
+    def __init__(self, root, max_workers=4, frame_budget=FRAME_BUDGET):
+        """
+        初始化界面任务执行器
+
+        Args:
+            root: Tk 根窗口
+            max_workers: 后台线程池大小
+            frame_budget: 主线程单次处理的时间预算 (秒)
+        """
+        self.root = root
+        self.frame_budget = frame_budget
+        self.logger = logging.getLogger('ui_executor')
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ui-task')
+        self._results = queue.Queue()
+        self._calls = queue.Queue()
+        self._busy_counts = {}
+        self._pending = 0
+        self._is_running = True
+        self._interval_ms = POLL_INTERVAL_MS
+        self._last_activity = time.monotonic()
+        self._tick_listeners = []
+        self.polls = 0
+        self._started = time.monotonic()
+        self._schedule_drain()
+
+    def add_tick_listener(self, listener):
+        """
+        注册每次轮询时在主线程上调用的函数，可用于测量事件循环延迟而无需另设定时器
+
+        Args:
+            listener: listener(延迟秒数, 本次轮询间隔秒数)
+        """
+        self._tick_listeners.append(listener)
+
+    def get_stats(self):
+        """
+        获取轮询统计
+
+        Returns:
+            dict: 轮询次数、每分钟轮询次数和当前间隔 (毫秒)
+        """
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return {'polls': self.polls, 'polls_per_minute': self.polls / elapsed * 60,
+                'interval_ms': self._interval_ms}
+
+    def submit(self, func, *args, on_done=None, on_error=None, busy_widgets=(), name=None):
+        """
+        在后台线程池中运行阻塞函数，完成后在主线程上回调
+
+        Args:
+            func: 要在后台运行的函数
+            *args: 传给 func 的参数
+            on_done: 成功时在主线程上调用的函数，参数为 func 的返回值
+            on_error: 失败时在主线程上调用的函数，参数为异常对象
+            busy_widgets: 任务运行期间需要禁用的控件
+            name: 任务名称，用于日志
+
+        Returns:
+            Future: 后台任务的 Future 对象
+        """
+        name = name or getattr(func, '__name__', 'task')
+        self._set_busy(busy_widgets, True)
+        future = self._pool.submit(contextvars.copy_context().run, func, *args)
+        future.add_done_callback(lambda f: self._results.put((f, name, on_done, on_error, busy_widgets)))
+        return future
+
+    def post(self, func, *args):
+        """
+        从任意线程提交一个在主线程上执行的调用 (线程安全的界面桥接)
+
+        Args:
+            func: 要在主线程上执行的函数
+            *args: 函数参数
+        """
+        # 在提交方的上下文中执行，追踪等上下文可以传到界面线程
+        self._calls.put((contextvars.copy_context(), func, args))
+
+    def instrument(self, handler, name=None):
+        """
+        包装事件处理函数，记录超出帧预算的调用
+
+        Args:
+            handler: 在主线程上运行的处理函数
+            name: 处理函数名称，用于日志
+
+        Returns:
+            callable: 包装后的处理函数
+        """
+        name = name or getattr(handler, '__name__', 'handler')
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                if elapsed > self.frame_budget:
+                    self.logger.warning(f"界面处理函数 {name} 耗时 {elapsed * 1000:.1f}ms，"
+                                        f"超出帧预算 {self.frame_budget * 1000:.0f}ms")
+        return wrapper
+
+    def after(self, delay_ms, func, *args):
+        """
+        与 Tk 的 after 相同，但回调会被计时
+
+        Args:
+            delay_ms: 延迟 (毫秒)
+            func: 回调函数
+            *args: 回调参数
+
+        Returns:
+            str: after 标识符
+        """
+        return self.root.after(delay_ms, self.instrument(func), *args)
+
+    def shutdown(self):
+        """
+        停止拉取结果并关闭线程池
+        """
+        self._is_running = False
+        self._pool.shutdown(wait=False)
+
+    def _set_busy(self, widgets, busy):
+        """
+        设置或恢复忙碌指示 (禁用控件并切换鼠标指针)
+        """
+        self._pending += 1 if busy else -1
+        for widget in widgets:
+            count = self._busy_counts.get(widget, 0) + (1 if busy else -1)
+            self._busy_counts[widget] = count
+            try:
+                if busy and count == 1:
+                    widget.state(['disabled'])
+                elif not busy and count == 0:
+                    widget.state(['!disabled'])
+            except Exception as e:
+                self.logger.debug(f"设置控件忙碌状态失败: {e}")
+            if count == 0:
+                del self._busy_counts[widget]
+        try:
+            self.root.config(cursor='watch' if self._pending else '')
+        except Exception:
+            pass
+
+    def _drain(self):
+        """
+        在主线程上处理已完成的后台任务，单次处理不超过帧预算
+
+        超出预算时剩余的结果和调用留到下一轮，并立即安排下一轮而不是等待轮询间隔，
+        使 Tk 能在两批之间处理输入事件。单个回调出错只记录日志，不会中断轮询。
+        """
+        if not self._is_running:
+            return
+        backlog = False
+        try:
+            backlog = self._drain_once()
+        finally:
+            self._schedule_drain(0 if backlog else None)
+
+    def _drain_once(self):
+        """
+        处理一轮结果和调用
+
+        Returns:
+            bool: 是否因超出帧预算而留有未处理的项目
+        """
+        now = time.monotonic()
+        self.polls += 1
+        for listener in self._tick_listeners:
+            try:
+                listener(max(now - self._expected, 0.0), self._interval_ms / 1000)
+            except Exception as e:
+                self.logger.error(f"轮询监听函数 {getattr(listener, '__name__', listener)} 失败: {e}")
+        results = 0
+        deadline = time.perf_counter() + self.frame_budget
+        while time.perf_counter() < deadline:
+            try:
+                future, name, on_done, on_error, busy_widgets = self._results.get_nowait()
+            except queue.Empty:
+                break
+            results += 1
+            self._set_busy(busy_widgets, False)
+            error = future.exception()
+            try:
+                if error is not None:
+                    self.logger.error(f"后台任务 {name} 失败: {error}")
+                    if on_error:
+                        self.instrument(on_error, f"{name}.on_error")(error)
+                elif on_done:
+                    self.instrument(on_done, f"{name}.on_done")(future.result())
+            except Exception as e:
+                self.logger.error(f"后台任务 {name} 的回调失败: {e}")
+        while time.perf_counter() < deadline:
+            try:
+                context, func, args = self._calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                context.run(self.instrument(func), *args)
+            except Exception as e:
+                self.logger.error(f"界面回调 {getattr(func, '__name__', func)} 失败: {e}")
+        if results or self._pending:
+            self._last_activity = now
+            self._interval_ms = POLL_INTERVAL_MS
+        elif now - self._last_activity > IDLE_AFTER:
+            self._interval_ms = min(self._interval_ms * 2, IDLE_POLL_INTERVAL_MS)
+        return not (self._results.empty() and self._calls.empty())
+
+    def _schedule_drain(self, delay_ms=None):
+        delay_ms = self._interval_ms if delay_ms is None else delay_ms
+        self._expected = time.monotonic() + delay_ms / 1000
+        self.root.after(delay_ms, self._drain)
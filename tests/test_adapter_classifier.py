@@ -0,0 +1,78 @@
+"""
+适配器分类的测试 (使用伪造的 /sys/class/net 目录树)
+"""
+import os
+
+import pytest
+
+from src.adapter_classifier import AdapterClassifier
+from src.interfaces import InterfaceTable
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    """
+    返回创建伪造接口目录的函数
+    """
+    root = tmp_path / 'net'
+    root.mkdir()
+    devices = tmp_path / 'devices'
+    devices.mkdir()
+
+    def add(name, arp_type=1, device=False, devtype=None, dirs=(), files=()):
+        path = root / name
+        path.mkdir()
+        (path / 'type').write_text(f'{arp_type}\n')
+        (path / 'uevent').write_text(f'INTERFACE={name}\n' + (f'DEVTYPE={devtype}\n' if devtype else ''))
+        if device:
+            (devices / name).mkdir()
+            os.symlink(str(devices / name), str(path / 'device'))
+        for directory in dirs:
+            (path / directory).mkdir()
+        for file in files:
+            (path / file).write_text('')
+
+    add.root = str(root)
+    return add
+
+
+@pytest.mark.parametrize('name, attributes, expected', [
+    ('enp3s0', {'device': True}, '有线'),
+    ('wlp2s0', {'device': True, 'dirs': ['wireless']}, '无线'),
+    ('wlan1', {'device': True, 'devtype': 'wlan'}, '无线'),
+    ('mon0', {'arp_type': 803}, '无线'),
+    ('br0', {'dirs': ['bridge']}, '虚拟'),
+    ('bond0', {'dirs': ['bonding']}, '虚拟'),
+    ('tap0', {'files': ['tun_flags']}, '虚拟'),
+    ('vlan10', {'devtype': 'vlan'}, '虚拟'),
+    ('lo', {'arp_type': 772}, '虚拟'),
+    ('veth1a2b', {}, '虚拟'),
+    # 没有 device 链接的 wwan 按 DEVTYPE 判断
+    ('ppp-modem', {'devtype': 'wwan'}, '无线'),
+    ('cell0', {'arp_type': 65534, 'devtype': 'wwan'}, '无线'),
+    # 没有 device 链接、DEVTYPE 未知或 type 为 ARPHRD_NONE 时按名称猜测
+    ('eth-gadget', {'devtype': 'gadget'}, '有线'),
+    ('rmnet_data0', {'arp_type': 65534}, '未知类型'),
+    ('wwan0', {'arp_type': 65534}, '无线'),
+])
+def test_classify_by_sysfs_attributes(sysfs, name, attributes, expected):
+    sysfs(name, **attributes)
+    assert AdapterClassifier(sysfs.root).classify(name) == expected
+
+
+def test_falls_back_to_name_without_sysfs_entry(sysfs):
+    classifier = AdapterClassifier(sysfs.root)
+    assert classifier.classify('Wi-Fi') == '无线'
+    assert classifier.classify('VMware Network Adapter VMnet8') == '虚拟'
+
+
+def test_sync_drops_entries_of_removed_interfaces(sysfs):
+    sysfs('eth0', device=True)
+    classifier = AdapterClassifier(sysfs.root)
+    assert classifier.classify('eth0', 2) == '有线'
+
+    # 同一个索引改名成了网桥: 旧条目失效，新名称重新读取 sysfs
+    sysfs('br0', dirs=['bridge'])
+    classifier.sync(InterfaceTable([(2, 'br0', True)], []))
+    assert (2, 'eth0') not in classifier._cache
+    assert classifier.classify('br0', 2) == '虚拟'
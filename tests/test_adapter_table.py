@@ -0,0 +1,105 @@
+"""
+适配器表的测试 (使用替身网络监控器、替身计数器和替身时钟)
+"""
+from collections import namedtuple
+
+import pytest
+
+from src import adapter_table
+from src.adapter_table import AdapterRow, AdapterTableModel, AdapterTableWorker, round_rate
+from src.interfaces import InterfaceTable
+
+Counters = namedtuple('Counters', ['bytes_recv', 'bytes_sent'])
+
+
+def row(name, rx_rate=0.0):
+    return AdapterRow(name, '有线', ('10.0.0.5',), True, True, rx_rate, 0.0)
+
+
+class StandInMonitor:
+    def __init__(self, names):
+        self.interfaces = InterfaceTable([(index, name, True) for index, name in enumerate(names, 1)], [])
+
+    def snapshot_interfaces(self):
+        return self.interfaces
+
+    def classify_adapter(self, iface, ifindex=None):
+        return '有线'
+
+
+class StandInClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_round_rate_keeps_two_significant_digits():
+    assert round_rate(0.0) == round_rate(60.0) == 0.0
+    assert round_rate(1234.0) == 1200.0
+    assert round_rate(1249.0) == round_rate(1151.0)
+    assert round_rate(987654.0) == 990000.0
+
+
+def test_removed_entries_are_trimmed_once_every_viewer_has_synced():
+    model = AdapterTableModel()
+    for name in ('eth0', 'eth1', 'eth2'):
+        model.upsert(row(name))
+    version, _, _ = model.diff_since(0, viewer='table')
+    slow_version, _, _ = model.diff_since(0, viewer='tray')
+
+    model.retain({'eth0'})
+    assert model.diff_since(version, viewer='table')[2] == ['eth1', 'eth2']
+    # 另一个视图还没有同步到删除之后的版本，删除记录需要保留
+    assert len(model._removed) == 2
+    assert model.diff_since(slow_version, viewer='tray')[2] == ['eth1', 'eth2']
+
+    latest = model.version
+    model.diff_since(latest, viewer='table')
+    model.diff_since(latest, viewer='tray')
+    assert model._removed == {}
+
+
+def test_removals_are_not_kept_without_viewers():
+    model = AdapterTableModel()
+    for index in range(100):
+        model.upsert(row(f'veth{index}'))
+        model.retain(set())
+    assert model._removed == {}
+    assert model.diff_since(0) == (model.version, [], [])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = StandInClock()
+    monkeypatch.setattr(adapter_table, 'time', clock)
+    return clock
+
+
+def test_rate_jitter_does_not_produce_a_diff(monkeypatch, clock):
+    counters = {'eth0': Counters(0, 0), 'eth1': Counters(0, 0)}
+    monkeypatch.setattr(adapter_table.psutil, 'net_io_counters', lambda pernic: dict(counters))
+    model = AdapterTableModel()
+    worker = AdapterTableWorker(model, StandInMonitor(['eth0', 'eth1']))
+    worker.refresh_once()
+    version, _, _ = model.diff_since(0)
+
+    # eth0 约 1.2 MB/s 并有小幅波动，eth1 只有零星的后台报文
+    for received in (1200000, 2401000, 3598000):
+        clock.now += 1.0
+        counters['eth0'] = Counters(received, 0)
+        counters['eth1'] = Counters(counters['eth1'].bytes_recv + 40, 0)
+        worker.refresh_once()
+        if received == 1200000:
+            version, changed, _ = model.diff_since(version)
+            assert [r.name for r in changed] == ['eth0']
+            assert changed[0].rx_rate == 1200000.0
+        else:
+            assert model.diff_since(version) == (version, [], [])
+
+    clock.now += 1.0
+    counters['eth0'] = Counters(3598000 + 300000, 0)
+    worker.refresh_once()
+    _, changed, _ = model.diff_since(version)
+    assert [(r.name, r.rx_rate) for r in changed] == [('eth0', 300000.0)]
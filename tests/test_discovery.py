@@ -0,0 +1,116 @@
+"""
+代理发现的测试 (使用回环别名地址上的替身代理和替身 mDNS 应答器)
+"""
+import time
+import socket
+import struct
+import asyncio
+import threading
+
+import pytest
+
+from src.discovery import ProxyDiscovery, browse_mdns, build_mdns_query, parse_mdns_response, scan_subnet
+
+SUBNET = '127.0.5'
+
+
+def listen(host, port=0):
+    try:
+        return socket.create_server((host, port))
+    except OSError:
+        pytest.skip(f'无法监听回环别名地址 {host}')
+
+
+@pytest.fixture
+def proxies():
+    """
+    同一网段中两台 "主机" 上使用相同端口的替身代理，只接受连接
+    """
+    first = listen(f'{SUBNET}.10')
+    port = first.getsockname()[1]
+    second = listen(f'{SUBNET}.20', port)
+    servers = {f'{SUBNET}.10': first, f'{SUBNET}.20': second}
+    yield port, servers
+    for server in servers.values():
+        server.close()
+
+
+def discovery(**kwargs):
+    return ProxyDiscovery([], mdns=False, fingerprint=lambda ip, adapter_name: ('lab', adapter_name), **kwargs)
+
+
+def test_scan_finds_listeners_in_subnet_quickly(proxies):
+    port, servers = proxies
+    hosts = [f'{SUBNET}.{i}' for i in range(1, 255)]
+    start = time.perf_counter()
+    candidates = asyncio.run(scan_subnet(hosts, [port], timeout=0.5))
+    assert time.perf_counter() - start < 2.0
+    assert sorted(c.host for c in candidates) == sorted(servers)
+    assert all(c.port == port and c.source == 'scan' and c.latency >= 0 for c in candidates)
+
+
+def test_discover_ranks_by_latency_and_verifies_cache(proxies):
+    port, servers = proxies
+    finder = discovery()
+    candidates = finder.discover(f'{SUBNET}.1', 'lo', port)
+    assert sorted(c.host for c in candidates) == sorted(servers)
+    assert [c.latency for c in candidates] == sorted(c.latency for c in candidates)
+
+    # 同一网络再次出现时只验证缓存的候选，已下线的主机被剔除
+    servers.pop(f'{SUBNET}.10').close()
+    assert [c.host for c in finder.discover(f'{SUBNET}.1', 'lo', port)] == [f'{SUBNET}.20']
+    assert finder.best(f'{SUBNET}.1', 'lo', port) == (f'{SUBNET}.20', port)
+
+
+def test_discover_rescans_when_cached_candidates_are_gone(proxies):
+    port, servers = proxies
+    finder = discovery()
+    finder.discover(f'{SUBNET}.1', 'lo', port)
+    for server in servers.values():
+        server.close()
+    servers.clear()
+    servers[f'{SUBNET}.30'] = listen(f'{SUBNET}.30', port)
+    assert finder.best(f'{SUBNET}.1', 'lo', port) == (f'{SUBNET}.30', port)
+
+
+def encode_name(name):
+    return b''.join(bytes([len(label)]) + label.encode() for label in name.split('.')) + b'\0'
+
+
+def record(name, rtype, rdata):
+    return encode_name(name) + struct.pack('!2HIH', rtype, 1, 120, len(rdata)) + rdata
+
+
+def announcement(instance, target, port, address):
+    service = instance.split('.', 1)[1]
+    records = [record(service, 12, encode_name(instance)),
+               record(instance, 33, struct.pack('!3H', 0, 0, port) + encode_name(target)),
+               record(target, 1, socket.inet_aton(address))]
+    return struct.pack('!6H', 0, 0x8400, 0, 2, 0, 1) + b''.join(records)
+
+
+def test_parse_mdns_response_reads_srv_and_address():
+    data = announcement('lab-proxy._http-proxy._tcp.local', 'proxyhost.local', 3128, '10.0.0.8')
+    assert parse_mdns_response(data) == [('proxyhost.local', 3128, '10.0.0.8')]
+    assert parse_mdns_response(data, ['_socks._tcp.local']) == []
+
+
+def test_browse_mdns_collects_unicast_replies():
+    responder = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    responder.bind(('127.0.0.1', 0))
+    queries = []
+
+    def answer():
+        data, addr = responder.recvfrom(4096)
+        queries.append(data)
+        responder.sendto(announcement('lab-proxy._http-proxy._tcp.local', 'proxyhost.local', 3128, '10.0.0.8'),
+                         addr)
+
+    thread = threading.Thread(target=answer, daemon=True)
+    thread.start()
+    try:
+        found = asyncio.run(browse_mdns(duration=0.3, target=responder.getsockname()))
+    finally:
+        responder.close()
+    assert queries == [build_mdns_query(['_http-proxy._tcp.local'])]
+    assert found == [('10.0.0.8', 3128)]
@@ -0,0 +1,165 @@
+"""
+本地转发代理的测试 (使用本机回环地址上的替身上游)
+"""
+import socket
+import threading
+
+import pytest
+
+from src.forward_proxy import ForwardProxy
+from src.runtime import CoreRuntime
+
+
+class StandInUpstream:
+    def __init__(self, handler):
+        """
+        回环地址上的替身上游，每个连接在单独的线程中由 handler(连接, 读取文件, 连接序号) 处理
+        """
+        self.handler = handler
+        self.connections = 0
+        self.server = socket.create_server(('127.0.0.1', 0))
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn, self.connections), daemon=True).start()
+
+    def _serve(self, conn, number):
+        with conn, conn.makefile('rb') as f:
+            self.handler(conn, f, number)
+
+    def close(self):
+        self.server.close()
+
+
+def read_request(f):
+    head = []
+    while True:
+        line = f.readline()
+        if line in (b'\r\n', b''):
+            return head if line else None
+        head.append(line)
+
+
+def read_body(f, head):
+    length = [line for line in head if line.lower().startswith(b'content-length')]
+    return f.read(int(length[0].split(b':')[1])) if length else b''
+
+
+def read_response(f):
+    status = f.readline()
+    headers = {}
+    while True:
+        line = f.readline()
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode().partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = f.read(int(headers.get('content-length', 0)))
+    return status.split()[1].decode(), body
+
+
+def response(body):
+    return b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body)
+
+
+@pytest.fixture(params=['thread', 'runtime'])
+def proxy(request):
+    runtime = CoreRuntime() if request.param == 'runtime' else None
+    if runtime:
+        runtime.start()
+    forward_proxy = ForwardProxy(listen_port=0, runtime=runtime)
+    assert forward_proxy.start()
+    yield forward_proxy
+    forward_proxy.stop(drain_timeout=0.5)
+    if runtime:
+        runtime.stop()
+
+
+def connect(forward_proxy):
+    client = socket.create_connection(('127.0.0.1', forward_proxy.listen_port), timeout=5)
+    return client, client.makefile('rb')
+
+
+def test_interim_response_is_relayed_before_final(proxy):
+    def handler(conn, f, number):
+        while True:
+            head = read_request(f)
+            if head is None:
+                return
+            body = read_body(f, head)
+            if head[0].startswith(b'POST'):
+                conn.sendall(b'HTTP/1.1 100 Continue\r\n\r\n')
+                conn.sendall(response(b'posted ' + body))
+            else:
+                conn.sendall(response(b'got'))
+
+    upstream = StandInUpstream(handler)
+    proxy.set_upstream('127.0.0.1', upstream.port)
+    client, f = connect(proxy)
+    try:
+        client.sendall(b'POST http://h/receive HTTP/1.1\r\nHost: h\r\nContent-Length: 4\r\n\r\ndata')
+        assert read_response(f) == ('100', b'')
+        assert read_response(f) == ('200', b'posted data')
+        client.sendall(b'GET http://h/next HTTP/1.1\r\nHost: h\r\n\r\n')
+        assert read_response(f) == ('200', b'got')
+    finally:
+        client.close()
+        upstream.close()
+
+
+def test_request_is_retried_when_pooled_connection_closes(proxy):
+    def handler(conn, f, number):
+        head = read_request(f)
+        conn.sendall(response(b'first' if number == 1 else b'retried'))
+        if number == 1:
+            # 第一个连接在下一个请求到达时关闭 (例如上游的空闲超时)，不返回响应
+            read_request(f)
+
+    upstream = StandInUpstream(handler)
+    proxy.set_upstream('127.0.0.1', upstream.port)
+    client, f = connect(proxy)
+    try:
+        client.sendall(b'GET http://h/a HTTP/1.1\r\nHost: h\r\n\r\n')
+        assert read_response(f) == ('200', b'first')
+        client.sendall(b'POST http://h/b HTTP/1.1\r\nHost: h\r\nContent-Length: 3\r\n\r\nabc')
+        assert read_response(f) == ('200', b'retried')
+        assert upstream.connections == 2
+    finally:
+        client.close()
+        upstream.close()
+
+
+def test_chunked_request_body_is_forwarded(proxy):
+    received = []
+
+    def handler(conn, f, number):
+        read_request(f)
+        body = b''
+        while True:
+            size = int(f.readline().split(b';')[0], 16)
+            if size == 0:
+                f.readline()
+                break
+            body += f.read(size)
+            f.read(2)
+        received.append(body)
+        conn.sendall(response(b'ok'))
+
+    upstream = StandInUpstream(handler)
+    proxy.set_upstream('127.0.0.1', upstream.port)
+    client, f = connect(proxy)
+    try:
+        client.sendall(b'POST http://h/push HTTP/1.1\r\nHost: h\r\nTransfer-Encoding: chunked\r\n\r\n'
+                       b'3\r\nabc\r\n4\r\ndefg\r\n0\r\n\r\n')
+        assert read_response(f) == ('200', b'ok')
+        assert received == [b'abcdefg']
+    finally:
+        client.close()
+        upstream.close()
@@ -0,0 +1,53 @@
+"""
+钩子执行的测试 (命令钩子运行当前的 Python 解释器)
+"""
+import sys
+
+import pytest
+
+from src.hooks import Hook, HookRunner, expand_args
+from src.runtime import CoreRuntime
+
+CONTEXT = {'old_ip': '10.0.0.1', 'new_ip': '10.0.0.2', 'old_adapter': 'eth0', 'adapter': 'wlan0',
+           'old_port': '7890', 'port': '7891'}
+
+
+def test_expand_args_keeps_unrelated_braces():
+    assert expand_args(['{new_ip}:{port}', '{print $1}', '{"ip": "{new_ip}"}', '{unknown}', '}{'], CONTEXT) == [
+        '10.0.0.2:7891', '{print $1}', '{"ip": "10.0.0.2"}', '{unknown}', '}{']
+
+
+@pytest.fixture(params=['thread', 'runtime'])
+def runtime(request):
+    if request.param == 'thread':
+        yield None
+        return
+    core = CoreRuntime()
+    core.start()
+    yield core
+    core.stop()
+
+
+def test_command_hook_receives_arguments_and_environment(tmp_path, runtime):
+    out = tmp_path / 'out.txt'
+    script = 'import os, sys; open(sys.argv[1], "w").write(" ".join(sys.argv[2:] + [os.environ["GGPM_NEW_IP"]]))'
+    runner = HookRunner([Hook('write', [sys.executable, '-c', script, str(out), '{old_ip}', '{print $1}'])],
+                        runtime=runtime)
+    try:
+        result, = [future.result(10) for future in runner.notify('10.0.0.2', 'wlan0', '7891')]
+        assert result.ok and result.returncode == 0
+        assert out.read_text() == ' {print $1} 10.0.0.2'
+        assert runner.notify('10.0.0.2', 'wlan0', '7891') == []
+    finally:
+        runner.stop()
+
+
+def test_slow_command_hook_times_out(runtime):
+    runner = HookRunner([Hook('slow', [sys.executable, '-c', 'import time; time.sleep(5)'], timeout=0.3)],
+                        runtime=runtime)
+    try:
+        result, = [future.result(10) for future in runner.notify('10.0.0.2', 'wlan0', '7891')]
+        assert result.timed_out and not result.ok
+        assert result.elapsed < 3
+    finally:
+        runner.stop()
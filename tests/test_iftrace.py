@@ -0,0 +1,46 @@
+"""
+接口轨迹回放的测试: 用仓库中的轨迹驱动网络监控器，校验写入 gitconfig 的代理序列
+"""
+import os
+
+import pytest
+
+from src.gitconfig import GitConfigFile
+from src.iftrace import TraceReplay, check_updates
+
+TRACE = os.path.join(os.path.dirname(__file__), 'data', 'iftrace_switch.jsonl')
+# 有线 -> 拔掉网线改用无线 (其间无线短暂失去默认路由，不应更新) -> 插回网线并获得新地址
+EXPECTED = ['10.0.0.5', '192.168.1.9', '10.0.0.7']
+
+
+def test_replay_writes_expected_proxies(tmp_path):
+    gitconfig = str(tmp_path / 'gitconfig')
+    updates, polls, _ = TraceReplay(TRACE).run(speed=None, port='8080', gitconfig_path=gitconfig)
+
+    assert polls == 121
+    assert [(update.t, update.ip, update.adapter) for update in updates] == [
+        (0.0, '10.0.0.5', 'eth0'), (120.0, '192.168.1.9', 'wlan0'), (420.0, '10.0.0.7', 'eth0')]
+    assert check_updates(updates, EXPECTED, port='8080') == []
+    final = GitConfigFile(gitconfig)
+    assert final.get('http.proxy') == final.get('https.proxy') == 'http://10.0.0.7:8080'
+
+
+def test_expected_updates_follow_recorded_selection():
+    assert TraceReplay(TRACE).expected_updates() == EXPECTED
+
+
+def test_check_updates_reports_wrong_port():
+    updates, _, _ = TraceReplay(TRACE).run(speed=None, port='7890')
+    problems = check_updates(updates, EXPECTED, port='8080')
+    assert len(problems) == len(EXPECTED)
+
+
+def test_accelerated_replay_is_paced():
+    updates, _, elapsed = TraceReplay(TRACE).run(speed=1000)
+    assert [update.ip for update in updates] == EXPECTED
+    assert elapsed >= 0.6 * 0.9
+
+
+def test_speed_is_limited():
+    with pytest.raises(ValueError):
+        TraceReplay(TRACE).run(speed=5000)
@@ -0,0 +1,18 @@
+"""
+代理方案选择的测试
+"""
+import pytest
+
+from src import profiles
+from src.config import ConfigManager
+from src.profiles import ProfileManager
+
+
+def test_match_without_profiles_skips_fingerprint(tmp_path, monkeypatch):
+    def collect(ip, adapter_name):
+        pytest.fail('没有方案时不应采集网络指纹')
+
+    monkeypatch.setattr(profiles, 'collect_fingerprint', collect)
+    manager = ProfileManager(ConfigManager(str(tmp_path)))
+    assert manager.match('10.0.0.1', 'eth0') is None
+    assert manager.active_profile is None
@@ -0,0 +1,128 @@
+"""
+路由选择的测试 (使用本机回环地址上的替身 TLS 服务器和替身 CONNECT 代理)
+"""
+import ssl
+import time
+import shutil
+import socket
+import asyncio
+import threading
+import subprocess
+
+import pytest
+
+from src.gitconfig import GitConfigFile
+from src.git_proxy import GitProxyManager
+from src.route_selector import ROUTE_DIRECT, ROUTE_PROXY, RouteSelector, measure_route
+
+pytestmark = pytest.mark.skipif(not shutil.which('openssl'), reason='需要 openssl 生成测试证书')
+
+
+def serve(server, handler):
+    def accept():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=handler, args=(conn,), daemon=True).start()
+    threading.Thread(target=accept, daemon=True).start()
+
+
+@pytest.fixture(scope='module')
+def tls_server(tmp_path_factory):
+    """
+    完成 TLS 握手后即关闭连接的替身服务器，返回其端口
+    """
+    directory = tmp_path_factory.mktemp('cert')
+    cert, key = str(directory / 'cert.pem'), str(directory / 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=localhost',
+                    '-keyout', key, '-out', cert], check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+
+    def handler(conn):
+        try:
+            with context.wrap_socket(conn, server_side=True):
+                pass
+        except (OSError, ssl.SSLError):
+            conn.close()
+
+    server = socket.create_server(('127.0.0.1', 0))
+    serve(server, handler)
+    yield server.getsockname()[1]
+    server.close()
+
+
+@pytest.fixture
+def connect_proxy(tls_server):
+    """
+    替身 CONNECT 代理: 延迟 delay 秒后应答，并把所有隧道都接到替身 TLS 服务器
+    """
+    state = {'delay': 0.0}
+
+    def pipe(source, target):
+        try:
+            while True:
+                data = source.recv(65536)
+                if not data:
+                    break
+                target.sendall(data)
+        except OSError:
+            pass
+        finally:
+            target.close()
+
+    def handler(conn):
+        head = b''
+        while b'\r\n\r\n' not in head:
+            data = conn.recv(4096)
+            if not data:
+                conn.close()
+                return
+            head += data
+        time.sleep(state['delay'])
+        upstream = socket.create_connection(('127.0.0.1', tls_server))
+        conn.sendall(b'HTTP/1.1 200 Connection established\r\n\r\n')
+        threading.Thread(target=pipe, args=(upstream, conn), daemon=True).start()
+        pipe(conn, upstream)
+
+    server = socket.create_server(('127.0.0.1', 0))
+    serve(server, handler)
+    state['port'] = server.getsockname()[1]
+    yield state
+    server.close()
+
+
+def closed_port():
+    with socket.create_server(('127.0.0.1', 0)) as server:
+        return server.getsockname()[1]
+
+
+def test_connect_and_tls_are_timed_separately(tls_server, connect_proxy):
+    url = f'https://127.0.0.1:{tls_server}/'
+    direct = asyncio.run(measure_route(url))
+    assert direct.tls > 0
+
+    connect_proxy['delay'] = 0.1
+    via_proxy = asyncio.run(measure_route(url, ('127.0.0.1', connect_proxy['port'])))
+    assert via_proxy.connect >= 0.1
+    assert 0 < via_proxy.tls < 0.1
+
+
+def test_faster_route_is_written_per_host(tmp_path, tls_server, connect_proxy):
+    fast = f'https://127.0.0.1:{tls_server}/'
+    # 直连不可达的主机只能经代理访问 (替身代理把隧道接到替身服务器)
+    unreachable = f'https://127.0.0.1:{closed_port()}/'
+    gitconfig = str(tmp_path / 'gitconfig')
+    connect_proxy['delay'] = 0.05
+    selector = RouteSelector(GitProxyManager(config_path=gitconfig), [fast, unreachable], timeout=1.0,
+                             min_samples=2)
+    selector.set_proxy('127.0.0.1', connect_proxy['port'])
+    for _ in range(2):
+        selector.sample_once()
+
+    assert selector.routes == {fast: ROUTE_DIRECT, unreachable: ROUTE_PROXY}
+    written = GitConfigFile(gitconfig)
+    assert written.get(f'http.{fast}.proxy') == ''
+    assert written.get(f'http.{unreachable}.proxy') == f'http://127.0.0.1:{connect_proxy["port"]}'
@@ -0,0 +1,152 @@
+"""
+服务模式多用户更新的测试 (使用临时主目录)
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+import pytest
+
+from src import profiles, service
+from src.config import ConfigManager
+from src.gitconfig import GitConfigFile
+from src.profiles import NetworkFingerprint, ProfileManager
+from src.service import MultiUserUpdater, ServiceUser
+
+
+@pytest.fixture
+def homes(tmp_path):
+    paths = {}
+    for name in ('alice', 'bob'):
+        home = tmp_path / 'home' / name
+        home.mkdir(parents=True)
+        paths[name] = str(home)
+    return paths
+
+
+@pytest.fixture
+def profile_manager(tmp_path, monkeypatch):
+    config_dir = tmp_path / 'config'
+    config_dir.mkdir()
+    (config_dir / 'profiles.json').write_text(json.dumps({'profiles': [
+        {'name': 'lab', 'port': '8080', 'targets': ['http.https://github.com.proxy'], 'match': {'ssid': 'Lab'}},
+    ]}), encoding='utf-8')
+    ssid = {'value': None}
+    monkeypatch.setattr(profiles, 'collect_fingerprint',
+                        lambda ip, adapter_name: NetworkFingerprint(adapter_name, None, None, ssid['value']))
+    manager = ProfileManager(ConfigManager(str(config_dir)))
+    manager.ssid = ssid
+    return manager
+
+
+def read(home):
+    return dict(GitConfigFile(os.path.join(home, '.gitconfig')).items())
+
+
+def test_update_writes_each_user(homes):
+    updater = MultiUserUpdater([ServiceUser('alice', homes['alice'], None, None, None),
+                                ServiceUser('bob', homes['bob'], '7891', None, None)], '7890')
+    try:
+        assert updater.update('10.0.0.1', 'eth0') == {'alice': 'updated', 'bob': 'updated'}
+        assert read(homes['alice'])['http.proxy'] == 'http://10.0.0.1:7890'
+        assert read(homes['bob'])['https.proxy'] == 'http://10.0.0.1:7891'
+        assert updater.update('10.0.0.1', 'eth0') == {'alice': 'unchanged', 'bob': 'unchanged'}
+    finally:
+        updater.stop()
+
+
+def test_plan_removes_default_keys_for_targeted_profile(homes, profile_manager):
+    updater = MultiUserUpdater([ServiceUser('alice', homes['alice'], None, None, None)], '7890', profile_manager)
+    try:
+        updater.update('10.0.0.1', 'eth0')
+        assert read(homes['alice']) == {'http.proxy': 'http://10.0.0.1:7890',
+                                        'https.proxy': 'http://10.0.0.1:7890'}
+
+        profile_manager.ssid['value'] = 'Lab'
+        (_, _, changes), = updater.plan('10.0.0.2', 'wlan0')
+        assert changes == {'http.proxy': None, 'https.proxy': None,
+                           'http.https://github.com.proxy': 'http://10.0.0.2:8080'}
+        updater.update('10.0.0.2', 'wlan0')
+        assert read(homes['alice']) == {'http.https://github.com.proxy': 'http://10.0.0.2:8080'}
+
+        profile_manager.ssid['value'] = None
+        updater.update('10.0.0.3', 'eth0')
+        assert read(homes['alice']) == {'http.proxy': 'http://10.0.0.3:7890',
+                                        'https.proxy': 'http://10.0.0.3:7890'}
+    finally:
+        updater.stop()
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='需要符号链接')
+def test_update_refuses_symlinked_gitconfig(tmp_path, homes):
+    target = tmp_path / 'elsewhere'
+    os.symlink(str(target), os.path.join(homes['alice'], '.gitconfig'))
+    updater = MultiUserUpdater([ServiceUser('alice', homes['alice'], None, None, None)], '7890')
+    try:
+        assert updater.update('10.0.0.1', 'eth0') == {'alice': 'failed'}
+        assert not target.exists()
+    finally:
+        updater.stop()
+
+
+def unprivileged_user():
+    try:
+        import pwd
+        entry = pwd.getpwnam('nobody')
+    except (ImportError, KeyError):
+        return None
+    return entry if hasattr(os, 'geteuid') and os.geteuid() == 0 else None
+
+
+def interpreter_for(user):
+    """
+    找一个该用户可以运行的 Python 解释器 (当前解释器可能装在 /root 下)
+    """
+    for executable in (sys.executable, shutil.which('python3', path='/usr/local/bin:/usr/bin:/bin')):
+        try:
+            subprocess.run([executable, '-c', ''], user=user.pw_uid, group=user.pw_gid, extra_groups=[],
+                           capture_output=True, check=True)
+            return executable
+        except (OSError, TypeError, subprocess.CalledProcessError):
+            continue
+    return None
+
+
+@pytest.mark.skipif(unprivileged_user() is None, reason='需要以 root 运行且存在 nobody 用户')
+def test_update_as_root_writes_with_user_ids(monkeypatch):
+    nobody = unprivileged_user()
+    executable = interpreter_for(nobody)
+    if executable is None:
+        pytest.skip('nobody 用户无法运行任何 Python 解释器')
+    monkeypatch.setattr(sys, 'executable', executable)
+    # 测试目录和项目目录可能位于其他用户无法进入的位置 (例如 /root)，
+    # 把写入模块复制到所有人可读的目录，主目录也放在 /tmp 下
+    project = tempfile.mkdtemp(prefix='ggpm-writer-')
+    home = tempfile.mkdtemp(prefix='ggpm-home-')
+    try:
+        os.chmod(project, 0o755)
+        os.mkdir(os.path.join(project, 'src'), 0o755)
+        for name in ('__init__.py', 'gitconfig.py', 'gitconfig_writer.py'):
+            shutil.copy(os.path.join(service.PROJECT_DIR, 'src', name), os.path.join(project, 'src', name))
+        monkeypatch.setattr(service, 'PROJECT_DIR', project)
+        os.chown(home, nobody.pw_uid, nobody.pw_gid)
+
+        updater = MultiUserUpdater([ServiceUser('nobody', home, None, None, None)], '7890')
+        try:
+            assert updater.update('10.0.0.1', 'eth0') == {'nobody': 'updated'}
+            gitconfig = os.path.join(home, '.gitconfig')
+            assert read(home)['http.proxy'] == 'http://10.0.0.1:7890'
+            assert (os.stat(gitconfig).st_uid, os.stat(gitconfig).st_gid) == (nobody.pw_uid, nobody.pw_gid)
+
+            # 换成 root 拥有的文件后，以用户身份运行的子进程拒绝写入
+            os.chown(gitconfig, 0, 0)
+            assert updater.update('10.0.0.2', 'eth0') == {'nobody': 'failed'}
+            assert read(home)['http.proxy'] == 'http://10.0.0.1:7890'
+        finally:
+            updater.stop()
+    finally:
+        shutil.rmtree(project, ignore_errors=True)
+        shutil.rmtree(home, ignore_errors=True)
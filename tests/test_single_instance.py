@@ -0,0 +1,56 @@
+"""
+单实例锁的测试 (每个测试使用独立的实例名称和锁目录)
+"""
+import os
+import time
+import threading
+
+import pytest
+
+from src.single_instance import SingleInstance
+
+
+@pytest.fixture
+def name(request):
+    return f'ggpm-test-{os.getpid()}-{request.node.name}'
+
+
+def test_acquire_after_release(tmp_path, name):
+    first = SingleInstance(name, str(tmp_path))
+    assert first.acquire()
+    handled = threading.Event()
+    first.serve(lambda args: handled.set())
+    second = SingleInstance(name, str(tmp_path))
+    assert not second.acquire()
+    # 确认接收线程已经在运行，并在处理完消息后回到 accept()
+    assert second.send(['--show']) and handled.wait(2)
+    time.sleep(0.05)
+
+    first.release()
+    again = SingleInstance(name, str(tmp_path))
+    try:
+        assert again.acquire()
+    finally:
+        again.release()
+
+
+def test_second_launch_hands_off_arguments(tmp_path, name):
+    received = []
+    handled = threading.Event()
+
+    def handler(args):
+        received.append(args)
+        handled.set()
+
+    primary = SingleInstance(name, str(tmp_path))
+    assert primary.acquire()
+    primary.serve(handler)
+    try:
+        second = SingleInstance(name, str(tmp_path))
+        assert not second.acquire()
+        assert second.send(['--show'])
+        assert handled.wait(2)
+        assert received == [['--show']]
+    finally:
+        primary.release()
+    assert not SingleInstance(name, str(tmp_path)).send(['--show'], timeout=0.5)
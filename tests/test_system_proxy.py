@@ -0,0 +1,108 @@
+"""
+系统代理同步的测试 (各后端使用 stand_in_dir 下的文件替身)
+"""
+import os
+import json
+import stat
+
+import pytest
+
+from src.config import ConfigManager
+from src.runtime import CoreRuntime
+from src.system_proxy import EnvFileBackend, SystemProxyManager
+
+
+class StandInStore:
+    def __init__(self, values=None, error=None):
+        """
+        记录写入次数的内存存储，可以设置为写入时抛出异常
+        """
+        self.values = dict(values or {})
+        self.error = error
+        self.writes = []
+
+    def read(self):
+        return dict(self.values)
+
+    def write(self, changes):
+        if self.error:
+            raise self.error
+        self.writes.append(dict(changes))
+        self.values.update(changes)
+
+
+@pytest.fixture
+def stand_in_dir(tmp_path):
+    directory = tmp_path / 'stand_in'
+    directory.mkdir()
+    (directory / 'environment').write_text('# 系统环境变量\nPATH="/usr/bin:/bin"\nhttp_proxy="http://old:1"\n',
+                                           encoding='utf-8')
+    os.chmod(directory / 'environment', 0o644)
+    return directory
+
+
+def create_manager(tmp_path, stand_in_dir, runtime=None, **config):
+    config_dir = tmp_path / 'config'
+    config_dir.mkdir(exist_ok=True)
+    config = dict({'enabled': True, 'env_file': '/etc/environment', 'stand_in_dir': str(stand_in_dir)}, **config)
+    (config_dir / 'system_proxy.json').write_text(json.dumps(config), encoding='utf-8')
+    return SystemProxyManager(ConfigManager(str(config_dir)), runtime=runtime)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_apply_writes_every_stand_in_once(tmp_path, stand_in_dir):
+    manager = create_manager(tmp_path, stand_in_dir)
+    assert manager.apply('10.0.0.5', '7890') == {'gnome': 'updated', 'wininet': 'updated', 'env_file': 'updated'}
+
+    assert load(stand_in_dir / 'gnome.json') == {'mode': 'manual', 'http/host': '10.0.0.5', 'http/port': 7890,
+                                                 'https/host': '10.0.0.5', 'https/port': 7890}
+    assert load(stand_in_dir / 'wininet.json') == {'ProxyEnable': 1, 'ProxyServer': '10.0.0.5:7890'}
+    environment = (stand_in_dir / 'environment').read_text(encoding='utf-8')
+    assert environment.splitlines() == ['# 系统环境变量', 'PATH="/usr/bin:/bin"', 'http_proxy="http://10.0.0.5:7890"',
+                                        'https_proxy="http://10.0.0.5:7890"', 'HTTP_PROXY="http://10.0.0.5:7890"',
+                                        'HTTPS_PROXY="http://10.0.0.5:7890"']
+    assert stat.S_IMODE(os.stat(stand_in_dir / 'environment').st_mode) == 0o644
+
+    assert manager.apply('10.0.0.5', '7890') == {'gnome': 'unchanged', 'wininet': 'unchanged',
+                                                 'env_file': 'unchanged'}
+
+
+def test_apply_writes_only_changed_keys():
+    store = StandInStore()
+    backend = EnvFileBackend(os.devnull)
+    backend.store = store
+    assert backend.apply('10.0.0.5', 7890) == 'updated'
+    assert backend.apply('10.0.0.5', 7890) == 'unchanged'
+    store.values['HTTP_PROXY'] = 'http://other:1'
+    assert backend.apply('10.0.0.5', 7890) == 'updated'
+    assert store.writes[-1] == {'HTTP_PROXY': 'http://10.0.0.5:7890'}
+
+
+def test_failing_backend_does_not_block_others(tmp_path, stand_in_dir):
+    manager = create_manager(tmp_path, stand_in_dir)
+    manager.backends[0].store = StandInStore(error=OSError('dconf 不可用'))
+    results = manager.apply('10.0.0.5', '7890')
+    assert results == {'gnome': 'failed', 'wininet': 'updated', 'env_file': 'updated'}
+
+
+def test_apply_on_runtime_pool(tmp_path, stand_in_dir):
+    runtime = CoreRuntime()
+    runtime.start()
+    try:
+        manager = create_manager(tmp_path, stand_in_dir, runtime=runtime, gnome=False, wininet=False)
+        assert manager._pool is None
+        assert manager.apply('10.0.0.6', 8080) == {'env_file': 'updated'}
+    finally:
+        runtime.stop()
+    assert 'https_proxy="http://10.0.0.6:8080"' in (stand_in_dir / 'environment').read_text(encoding='utf-8')
+
+
+def test_disabled_manager_does_nothing(tmp_path, stand_in_dir):
+    manager = create_manager(tmp_path, stand_in_dir, enabled=False)
+    assert manager.backends == [] and manager._pool is None
+    assert manager.apply('10.0.0.5', '7890') == {}
+    assert not (stand_in_dir / 'gnome.json').exists()
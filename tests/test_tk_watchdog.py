@@ -0,0 +1,58 @@
+"""
+界面看门狗心跳检查的测试 (用替身执行器提供心跳，不需要 Tk)
+"""
+import time
+
+import pytest
+
+from src.runtime import CoreRuntime
+from src.tk_watchdog import CHECK_INTERVAL, TkWatchdog
+
+
+class StandInExecutor:
+    def __init__(self):
+        self.listeners = []
+
+    def add_tick_listener(self, listener):
+        self.listeners.append(listener)
+
+    def tick(self, interval=0.1):
+        for listener in self.listeners:
+            listener(0.0, interval)
+
+
+@pytest.fixture
+def watchdog():
+    runtime = CoreRuntime()
+    runtime.start()
+    executor = StandInExecutor()
+    dog = TkWatchdog(None, stall_threshold=0.25, executor=executor)
+    dog.start(runtime)
+    yield dog, executor
+    dog.stop()
+    runtime.stop()
+
+
+def test_check_tightens_only_while_stall_is_suspected(watchdog):
+    dog, executor = watchdog
+    executor.tick()
+    dog.check_stall()
+    assert dog._timer.interval == CHECK_INTERVAL
+
+    # 心跳迟到但尚未超过阈值: 加快检查
+    dog._last_tick = time.monotonic() - 0.1 - 0.1
+    dog.check_stall()
+    assert dog._timer.interval == 0.125
+    assert dog.stalls == 0
+
+    # 超过阈值: 记录一次调用栈后恢复慢速检查
+    dog._last_tick = time.monotonic() - 0.1 - 0.3
+    dog.check_stall()
+    assert dog.stalls == 1
+    assert dog._timer.interval == CHECK_INTERVAL
+    dog.check_stall()
+    assert dog.stalls == 1
+
+    executor.tick()
+    dog.check_stall()
+    assert dog._timer.interval == CHECK_INTERVAL
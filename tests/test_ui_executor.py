@@ -0,0 +1,61 @@
+"""
+界面任务执行器的测试 (用记录 after 调用的替身根窗口代替 Tk)
+"""
+import time
+
+import pytest
+
+from src.ui_executor import UITaskExecutor
+
+
+class StandInRoot:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay_ms, func, *args):
+        self.scheduled.append((delay_ms, func))
+
+    def config(self, **kwargs):
+        pass
+
+    def run_next(self):
+        _, func = self.scheduled.pop(0)
+        func()
+
+
+@pytest.fixture
+def executor():
+    root = StandInRoot()
+    ui_executor = UITaskExecutor(root, max_workers=1, frame_budget=0.005)
+    yield ui_executor
+    ui_executor.shutdown()
+
+
+def test_failing_callback_does_not_stop_polling(executor):
+    ran = []
+
+    def broken():
+        raise RuntimeError('boom')
+
+    executor.add_tick_listener(lambda lag, interval: 1 / 0)
+    executor.post(broken)
+    executor.post(ran.append, 'after')
+    executor.submit(lambda: 1, on_done=lambda result: 1 / 0).result()
+    executor.root.run_next()
+
+    assert ran == ['after']
+    assert len(executor.root.scheduled) == 1
+
+
+def test_backlog_beyond_frame_budget_is_deferred(executor):
+    ran = []
+    for i in range(5):
+        executor.post(lambda i=i: (time.sleep(0.003), ran.append(i)))
+    executor.root.run_next()
+
+    assert 0 < len(ran) < 5
+    assert executor.root.scheduled[-1][0] == 0
+    while len(ran) < 5:
+        executor.root.run_next()
+    assert ran == [0, 1, 2, 3, 4]
+    assert executor.root.scheduled[-1][0] > 0